@@ -56,12 +56,18 @@ import pygame
 import random
 import math
 import sys
+import os
 import time
+import bisect
 from collections import defaultdict
+from operator import attrgetter
 
 # ═══════════════════════════════════════════════════════════════
 #  INITIALIZATION
 # ═══════════════════════════════════════════════════════════════
+if "--selftest" in sys.argv or "--bench" in sys.argv:  # Run headless
+    os.environ.setdefault("SDL_VIDEODRIVER", "dummy")
+    os.environ.setdefault("SDL_AUDIODRIVER", "dummy")
 pygame.init()
 pygame.mixer.init(frequency=22050, size=-16, channels=2, buffer=512)
 
@@ -426,6 +432,179 @@ class Entity:
         self.y = float(y)
         self.dead = False
 
+# ═══════════════════════════════════════════════════════════════
+#  LAWN INDEXES
+# ═══════════════════════════════════════════════════════════════
+ZOMBIE_INDEX = True  # Plants find targets by bisecting per-row zombie lists (False: scan every zombie)
+
+class ZombieIndex:
+    """Live zombies bucketed by row and sorted by x for plant targeting.
+
+    rebuild() runs once a tick before the plants update and only marks the
+    rows stale; the first query of the tick refills them. Zombies enter at
+    the right edge and walk left, so the zombie list is already close to x
+    order and sorting each row takes about linear time.
+    """
+    def __init__(self):
+        self.rows = [[] for _ in range(ROWS)]
+        self.xs = [[] for _ in range(ROWS)]
+        self.zombies = []
+        self.stale = False
+        self.builds = 0
+
+    def rebuild(self, zombies):
+        self.zombies = zombies
+        self.stale = True
+
+    def _build(self):
+        rows = [[] for _ in range(ROWS)]
+        for z in self.zombies:
+            if not z.dead:
+                rows[z.row].append(z)
+        x = attrgetter("x")
+        for r, row in enumerate(rows):
+            row.sort(key=x)
+            self.xs[r] = list(map(x, row))
+        self.rows = rows
+        self.stale = False
+        self.builds += 1
+
+    def move(self, z, old_row):
+        """Re-file a zombie that was pushed into another row mid-tick."""
+        if not ZOMBIE_INDEX or self.stale: return
+        i = self.rows[old_row].index(z)
+        del self.rows[old_row][i]
+        del self.xs[old_row][i]
+        i = bisect.bisect_right(self.xs[z.row], z.x)
+        self.rows[z.row].insert(i, z)
+        self.xs[z.row].insert(i, z.x)
+
+    def between(self, row, x0, x1):
+        """Live zombies in row with x0 < x < x1."""
+        if not ZOMBIE_INDEX:
+            return [z for z in self.zombies if z.row == row and x0 < z.x < x1 and not z.dead]
+        if not 0 <= row < ROWS: return []
+        if self.stale: self._build()
+        zs, xs = self.rows[row], self.xs[row]
+        i = bisect.bisect_right(xs, x0)
+        j = bisect.bisect_left(xs, x1, i)
+        return [z for z in zs[i:j] if not z.dead]
+
+    def near(self, row, x, reach):
+        """Live zombies in row less than reach from x."""
+        if not ZOMBIE_INDEX:
+            return [z for z in self.zombies if z.row == row and abs(z.x - x) < reach and not z.dead]
+        return [z for z in self.between(row, x - reach - 1, x + reach + 1) if abs(z.x - x) < reach]
+
+    def any_between(self, row, x0, x1):
+        """Whether between() would find anyone, without building the list."""
+        if not ZOMBIE_INDEX:
+            return any(z.row == row and x0 < z.x < x1 and not z.dead for z in self.zombies)
+        if not 0 <= row < ROWS: return False
+        if self.stale: self._build()
+        zs, xs = self.rows[row], self.xs[row]
+        i = bisect.bisect_right(xs, x0)
+        while i < len(xs) and xs[i] < x1:
+            if not zs[i].dead: return True
+            i += 1
+        return False
+
+    def first_right_of(self, row, x):
+        """Nearest live zombie in row right of x, or None."""
+        found = self.between(row, x, float("inf"))
+        if not ZOMBIE_INDEX:
+            return min(found, key=lambda z: z.x, default=None)
+        return found[0] if found else None
+
+PLANT_GRID = True  # Tile lookups read a rows x cols grid of plants (False: scan every plant)
+
+class PlantGrid:
+    """Plants filed by lawn tile, oldest first.
+
+    A tile's list stacks its lily pad or flower pot under the plant it
+    carries (pumpkin armour lives on the plant it covers; a lone pumpkin is
+    the tile's plant). Lookups return candidates in planting order, the
+    order of game.plants, and callers keep their own tests, so they pick
+    the same plant a scan would. A leaping squash leaves its tile and is
+    listed as drifting until it lands.
+    """
+    def __init__(self, plants):
+        self.plants = plants
+        self.cells = [[[] for _ in range(COLS)] for _ in range(ROWS)]
+        self.order = {}
+        self.drifting = []
+        self.planted = 0
+
+    def clear(self):
+        for row in self.cells:
+            for cell in row: cell.clear()
+        self.order.clear()
+        self.drifting.clear()
+
+    def add(self, p):
+        self.order[p] = self.planted
+        self.planted += 1
+        self.cells[p.row][p.col].append(p)
+
+    def drift(self, p):
+        if p not in self.drifting: self.drifting.append(p)
+
+    def prune(self, plants):
+        """Forget plants that died this tick; plants is the list of survivors."""
+        self.plants = plants
+        for row in self.cells:
+            for c, cell in enumerate(row):
+                if any(p.dead for p in cell):
+                    for p in cell:
+                        if p.dead: del self.order[p]
+                    row[c] = [p for p in cell if not p.dead]
+        self.drifting = [p for p in self.drifting if not p.dead]
+
+    def _gather(self, row, c0, c1):
+        cells = self.cells[row]
+        found, filled = [], 0
+        for c in range(max(0, c0), min(COLS, c1)):
+            if cells[c]:
+                found += cells[c]
+                filled += 1
+        for p in self.drifting:
+            if p.row == row and not c0 <= p.col < c1:
+                found.append(p)
+                filled += 1
+        if filled > 1:
+            found.sort(key=self.order.__getitem__)
+        return found
+
+    def at(self, row, col):
+        """Plants on one tile."""
+        if not PLANT_GRID: return self.plants
+        if not (0 <= row < ROWS and 0 <= col < COLS): return ()
+        return self.cells[row][col]
+
+    def in_row(self, row, c0=0, c1=COLS):
+        """Plants on tiles c0 <= col < c1 of a row."""
+        if not PLANT_GRID: return self.plants
+        if not 0 <= row < ROWS: return ()
+        return self._gather(row, c0, c1)
+
+    def in_col(self, col):
+        """Plants on every tile of a column."""
+        if not PLANT_GRID: return self.plants
+        if not 0 <= col < COLS: return ()
+        return sorted((p for row in self.cells for p in row[col]), key=self.order.__getitem__)
+
+    def near(self, row, x, reach):
+        """Plants in a row that might be less than reach from x."""
+        if not PLANT_GRID: return self.plants
+        if not 0 <= row < ROWS: return ()
+        # Plants stand at tile centres, so only tiles whose centre is in reach matter
+        offset = x - GRID_X - CELL_W // 2
+        c0 = int((offset - reach - 1) // CELL_W) + 1
+        c1 = int((offset + reach + 1) // CELL_W) + 1
+        if c1 - c0 == 1 and not self.drifting:
+            return self.cells[row][c0] if 0 <= c0 < COLS else ()
+        return self._gather(row, c0, c1)
+
 # ═══════════════════════════════════════════════════════════════
 #  PLANT ENTITY
 # ═══════════════════════════════════════════════════════════════
@@ -480,10 +659,7 @@ class Plant(Entity):
 
                 fired = False
                 for r in rows_to_shoot:
-                    has_target = any(
-                        z.row == r and self.x < z.x < self.x + rng and not z.dead
-                        for z in game.zombies
-                    )
+                    has_target = game.zombie_index.any_between(r, self.x, self.x + rng)
                     if k == "starfruit":
                         has_target = any(not z.dead for z in game.zombies)
 
@@ -492,7 +668,7 @@ class Plant(Entity):
                         actual_ptype = ptype
                         # Torchwood upgrade check
                         if actual_ptype == "normal":
-                            for p in game.plants:
+                            for p in game.plant_grid.in_row(r, self.col + 1):
                                 if p.key == "torchwood" and p.row == r and p.col > self.col and not p.dead:
                                     actual_ptype = "fire"
                                     break
@@ -515,7 +691,7 @@ class Plant(Entity):
         if k == "puffshroom":
             self.shoot_timer += 1
             if self.shoot_timer >= 90:
-                has_t = any(z.row == self.row and self.x < z.x < self.x + 250 and not z.dead for z in game.zombies)
+                has_t = game.zombie_index.any_between(self.row, self.x, self.x + 250)
                 if has_t:
                     game.projectiles.append(Projectile(self.x + 10, self.y - 10, self.row, "spore"))
                     self.shoot_timer = 0
@@ -523,7 +699,7 @@ class Plant(Entity):
         if k == "fumeshroom":
             self.shoot_timer += 1
             if self.shoot_timer >= 90:
-                has_t = any(z.row == self.row and self.x < z.x < self.x + 350 and not z.dead for z in game.zombies)
+                has_t = game.zombie_index.any_between(self.row, self.x, self.x + 350)
                 if has_t:
                     game.projectiles.append(Projectile(self.x + 10, self.y - 10, self.row, "fume"))
                     self.shoot_timer = 0
@@ -531,20 +707,20 @@ class Plant(Entity):
         if k == "seashroom":
             self.shoot_timer += 1
             if self.shoot_timer >= 90:
-                has_t = any(z.row == self.row and self.x < z.x < self.x + 250 and not z.dead for z in game.zombies)
+                has_t = game.zombie_index.any_between(self.row, self.x, self.x + 250)
                 if has_t:
                     game.projectiles.append(Projectile(self.x + 10, self.y - 10, self.row, "spore"))
                     self.shoot_timer = 0
 
         if k == "scaredyshroom":
-            near = any(z.row == self.row and abs(z.x - self.x) < 120 and not z.dead for z in game.zombies)
+            near = bool(game.zombie_index.near(self.row, self.x, 120))
             if near:
                 self.state = "hiding"
             else:
                 self.state = "normal"
                 self.shoot_timer += 1
                 if self.shoot_timer >= 90:
-                    has_t = any(z.row == self.row and self.x < z.x < self.x + 500 and not z.dead for z in game.zombies)
+                    has_t = game.zombie_index.any_between(self.row, self.x, self.x + 500)
                     if has_t:
                         game.projectiles.append(Projectile(self.x + 10, self.y - 10, self.row, "spore"))
                         self.shoot_timer = 0
@@ -552,8 +728,8 @@ class Plant(Entity):
         if k == "gloomshroom":
             self.shoot_timer += 1
             if self.shoot_timer >= 100:
-                for z in game.zombies:
-                    if abs(z.row - self.row) <= 1 and abs(z.x - self.x) < 120 and not z.dead:
+                for r in (self.row - 1, self.row, self.row + 1):
+                    for z in game.zombie_index.near(r, self.x, 120):
                         z.take_damage(20, "fume")
                 self.shoot_timer = 0
 
@@ -577,7 +753,7 @@ class Plant(Entity):
         if k in pults:
             self.shoot_timer += 1
             if self.shoot_timer >= 100:
-                has_t = any(z.row == self.row and self.x < z.x and not z.dead for z in game.zombies)
+                has_t = game.zombie_index.first_right_of(self.row, self.x) is not None
                 if has_t:
                     game.projectiles.append(Projectile(self.x, self.y - 20, self.row, pults[k]))
                     self.shoot_timer = 0
@@ -683,6 +859,7 @@ class Plant(Entity):
                 if self.squash_target and not self.squash_target.dead:
                     dx = self.squash_target.x - self.x
                     self.x += dx * 0.15
+                    game.plant_grid.drift(self)
                     if abs(dx) < 20:
                         self.squash_target.take_damage(1800)
                         self.dead = True
@@ -710,11 +887,10 @@ class Plant(Entity):
                         break
 
         if k == "spikeweed" or k == "spikerock":
-            for z in game.zombies:
-                if z.row == self.row and abs(z.x - self.x) < 35 and not z.dead:
-                    if self.timer % 30 == 0:
-                        dmg = 20 if k == "spikeweed" else 40
-                        z.take_damage(dmg)
+            if self.timer % 30 == 0:
+                dmg = 20 if k == "spikeweed" else 40
+                for z in game.zombie_index.near(self.row, self.x, 35):
+                    z.take_damage(dmg)
 
         if k == "garlic":
             for z in game.zombies:
@@ -723,6 +899,7 @@ class Plant(Entity):
                     if 0 <= new_row < ROWS:
                         z.row = new_row
                         z.y = GRID_Y + z.row * CELL_H + CELL_H // 2
+                        game.zombie_index.move(z, self.row)
 
         if k == "magnetshroom":
             if self.state_timer <= 0:
@@ -1202,7 +1379,7 @@ class Zombie(Entity):
 
         # ── Pole vault jump ──
         if self.key == "pole" and not self.pole_jumped:
-            for p in game.plants:
+            for p in game.plant_grid.near(self.row, self.x, 50):
                 if p.row == self.row and abs(self.x - p.x) < 50 and self.x > p.x and not p.dead:
                     self.x = p.x - CELL_W
                     self.pole_jumped = True
@@ -1212,7 +1389,7 @@ class Zombie(Entity):
         # ── Pogo zombie — bounces over plants until pogo lost ──
         if self.key == "pogo" and self.accessory_hp > 0:
             self.x -= spd
-            for p in game.plants:
+            for p in game.plant_grid.near(self.row, self.x, 40):
                 if p.row == self.row and abs(self.x - p.x) < 40 and self.x > p.x and not p.dead:
                     if p.key not in ("spikeweed", "spikerock", "tallnut"):
                         self.x = p.x - CELL_W  # Jump over
@@ -1228,7 +1405,7 @@ class Zombie(Entity):
             if not hasattr(self, '_dolphin_jumped'):
                 self._dolphin_jumped = False
             if not self._dolphin_jumped:
-                for p in game.plants:
+                for p in game.plant_grid.near(self.row, self.x, 50):
                     if p.row == self.row and abs(self.x - p.x) < 50 and self.x > p.x and not p.dead:
                         self.x = p.x - CELL_W
                         self._dolphin_jumped = True
@@ -1258,7 +1435,7 @@ class Zombie(Entity):
         # ── Zomboni — crushes plants, leaves ice trail ──
         if self.key == "zomboni":
             self.x -= spd
-            for p in game.plants:
+            for p in game.plant_grid.near(self.row, self.x, 40):
                 if p.row == self.row and abs(self.x - p.x) < 40 and not p.dead:
                     if p.key not in ("spikerock",):  # Spikerock pops tires
                         p.dead = True
@@ -1304,7 +1481,7 @@ class Zombie(Entity):
             elif self._bungee_state == "grabbing":
                 if self._bungee_timer > 60:
                     col = int((self.x - GRID_X) // CELL_W)
-                    for p in game.plants:
+                    for p in game.plant_grid.at(self.row, col):
                         if p.col == col and p.row == self.row and not p.dead:
                             p.dead = True
                             break
@@ -1323,7 +1500,7 @@ class Zombie(Entity):
                 self.x -= spd
             else:
                 if self.anim_timer % 120 == 0 and self._catapult_shots < 20:
-                    for p in game.plants:
+                    for p in game.plant_grid.in_row(self.row):
                         if p.row == self.row and not p.dead:
                             p.hp -= 75
                             if p.hp <= 0: p.dead = True
@@ -1337,7 +1514,7 @@ class Zombie(Entity):
             if not hasattr(self, '_placed_ladder'):
                 self._placed_ladder = False
             if not self._placed_ladder:
-                for p in game.plants:
+                for p in game.plant_grid.near(self.row, self.x, 40):
                     if p.row == self.row and abs(self.x - p.x) < 40 and self.x > p.x and not p.dead:
                         if p.key in ("wallnut", "tallnut"):
                             self._placed_ladder = True
@@ -1347,7 +1524,7 @@ class Zombie(Entity):
 
         # ── Normal eating behavior ──
         self.eating_plant = None
-        for p in game.plants:
+        for p in game.plant_grid.near(self.row, self.x, 35):
             if p.row == self.row and not p.dead:
                 if p.key in ("spikeweed", "spikerock"):
                     continue
@@ -1397,7 +1574,7 @@ class Zombie(Entity):
                     for z in game.zombies:
                         pass  # Zomboss doesn't damage own zombies
                     # Freeze a row
-                    for p in game.plants:
+                    for p in game.plant_grid.in_row(row):
                         if p.row == row:
                             p.shoot_timer = -60  # Slow down
                     game.particles.append(Particle(self.x - 30, GRID_Y + row * CELL_H + CELL_H // 2, (100,200,255), 30, 20))
@@ -1407,7 +1584,7 @@ class Zombie(Entity):
                         game.zombies.append(bz)
                 elif attack == "stomp":
                     target_col = random.randint(0, COLS - 1)
-                    for p in game.plants:
+                    for p in game.plant_grid.in_col(target_col):
                         if p.col == target_col:
                             p.hp -= 200
                             if p.hp <= 0: p.dead = True
@@ -1970,6 +2147,8 @@ class Game:
         self.plantern_active = False
         self.result_timer = 0
         self.wave_announcement = None
+        self.zombie_index = ZombieIndex()
+        self.plant_grid = PlantGrid(self.plants)
         self.seed_cooldowns = {}  # key -> frames remaining
         self.conveyor_belt = []   # For conveyor belt levels
         self.conveyor_timer = 0
@@ -2273,6 +2452,7 @@ class Game:
         self.state = "GAME"
         self.sun = 9999
         self.plants.clear(); self.zombies.clear(); self.projectiles.clear()
+        self.plant_grid.clear()
         self.suns.clear(); self.coins.clear(); self.particles.clear()
         self.mowers = [LawnMower(i) for i in range(ROWS)]
         self.graves.clear(); self.ice_trails.clear()
@@ -2292,6 +2472,7 @@ class Game:
                            "types":["regular","cone","bucket"]}
         self.sun = 0
         self.plants.clear(); self.zombies.clear(); self.projectiles.clear()
+        self.plant_grid.clear()
         self.suns.clear(); self.coins.clear(); self.particles.clear()
         self.mowers = [LawnMower(i) for i in range(ROWS)]
         self.graves.clear(); self.ice_trails.clear()
@@ -2308,6 +2489,7 @@ class Game:
                            "types":["regular","cone","bucket","flag"]}
         self.sun = 200
         self.plants.clear(); self.zombies.clear(); self.projectiles.clear()
+        self.plant_grid.clear()
         self.suns.clear(); self.coins.clear(); self.particles.clear()
         self.mowers = [LawnMower(i) for i in range(ROWS)]
         self.graves.clear(); self.ice_trails.clear()
@@ -2507,6 +2689,7 @@ class Game:
         self.state = "GAME"
         self.sun = 50
         self.plants.clear()
+        self.plant_grid.clear()
         self.zombies.clear()
         self.projectiles.clear()
         self.suns.clear()
@@ -2625,7 +2808,7 @@ class Game:
 
             occupant = None
             lilypad = None
-            for p in self.plants:
+            for p in self.plant_grid.at(row, col):
                 if p.col == col and p.row == row:
                     if p.key == "lilypad": lilypad = p
                     elif p.key == "flowerpot": lilypad = p  # Treat pot like lilypad
@@ -2692,7 +2875,7 @@ class Game:
                         valid = False
 
                     if valid:
-                        self.plants.append(Plant(self.selected_seed, col, row))
+                        self.add_plant(Plant(self.selected_seed, col, row))
                         self.sun -= cost
                         if self.is_conveyor_level:
                             # Remove from conveyor (one-use per card)
@@ -2703,6 +2886,10 @@ class Game:
                         self.selected_seed = None
                         SFX.plant()
 
+    def add_plant(self, p):
+        self.plants.append(p)
+        self.plant_grid.add(p)
+
     # ── UPDATE ──
     def update(self):
         if self.state != "GAME": return
@@ -2816,6 +3003,7 @@ class Game:
                     self.zombies.append(Zombie("regular", g.row))
 
         # ── Entity updates ──
+        self.zombie_index.rebuild(self.zombies)
         for p in self.plants: p.update(self)
         for z in self.zombies: z.update(self)
         for pr in self.projectiles: pr.update(self)
@@ -2839,6 +3027,7 @@ class Game:
 
         # ── Cleanup ──
         self.plants = [p for p in self.plants if not p.dead]
+        self.plant_grid.prune(self.plants)
         self.zombies = [z for z in self.zombies if not z.dead]
         self.projectiles = [p for p in self.projectiles if not p.dead]
         self.suns = [s for s in self.suns if not s.dead]
@@ -3168,10 +3357,209 @@ class Game:
             self.draw()
             clock.tick(FPS)
 
+# ═══════════════════════════════════════════════════════════════
+#  SELF-TEST / BENCHMARK (--selftest, --bench)
+# ═══════════════════════════════════════════════════════════════
+LAWN_MIX = ["peashooter", "repeater", "threepeater", "snowpea", "gatlingpea", "splitpea", "cactus",
+            "starfruit", "puffshroom", "fumeshroom", "scaredyshroom", "gloomshroom", "cabbagepult",
+            "melonpult", "spikeweed", "garlic", "torchwood", "chomper", "wallnut"]
+
+def _survival_lawn(level_type="day", zombies=120, seed=49, rows=range(ROWS)):
+    """A survival game with every tile planted (on lily pads in the pool) and a wave across the given rows."""
+    random.seed(seed)
+    game = Game()
+    game._start_survival(level_type)
+    game.start_level()
+    game.survival_wave = 8
+    for row in range(ROWS):
+        for col in range(COLS):
+            if level_type in ("pool", "fog") and row in (2, 3):
+                game.add_plant(Plant("lilypad", col, row))
+            game.add_plant(Plant(LAWN_MIX[(row * COLS + col) % len(LAWN_MIX)], col, row))
+    types = list(ZOMBIE_DATA.keys())[:20]
+    for _ in range(zombies):
+        z = Zombie(random.choice(types), random.choice(rows))
+        z.x = random.uniform(GRID_X + 2 * CELL_W, SCREEN_WIDTH + 80)
+        game.zombies.append(z)
+    return game
+
+def _lawn_trace(game):
+    return (len(game.projectiles), game.game_over,
+            [(z.key, z.row, z.x, z.hp, z.accessory_hp, z.dead) for z in game.zombies],
+            [(p.key, p.row, p.hp, p.shoot_timer, p.state, p.dead) for p in game.plants])
+
+def selftest_zombie_index():
+    global ZOMBIE_INDEX
+    # Every query matches a scan of all zombies, through moves, deaths, row changes and spawns
+    random.seed(1)
+    index = ZombieIndex()
+    zombies = []
+    for tick in range(60):
+        for z in zombies:
+            z.x -= random.uniform(0, 3)
+            if random.random() < 0.02: z.row = random.randint(0, ROWS - 1)
+            if random.random() < 0.02: z.dead = True
+        zombies = [z for z in zombies if not z.dead]
+        for _ in range(random.randint(0, 4)):
+            z = Zombie("regular", random.randint(0, ROWS - 1))
+            z.x = random.uniform(GRID_X, SCREEN_WIDTH + 80)
+            zombies.append(z)
+        index.rebuild(zombies)
+        for z in random.sample(zombies, min(3, len(zombies))):
+            z.dead = random.random() < 0.5
+        if zombies:
+            z = random.choice(zombies)
+            old, z.row = z.row, (z.row + 1) % ROWS
+            index.move(z, old)
+        for _ in range(40):
+            r = random.randint(-1, ROWS)
+            x0 = random.uniform(GRID_X - 100, SCREEN_WIDTH)
+            x1 = x0 + random.choice([35, 120, 250, 900])
+            scan = [z for z in zombies if z.row == r and x0 < z.x < x1 and not z.dead]
+            assert index.any_between(r, x0, x1) == any(scan)
+            assert sorted(map(id, index.between(r, x0, x1))) == sorted(map(id, scan))
+            near = [z for z in zombies if z.row == r and abs(z.x - x0) < 120 and not z.dead]
+            assert sorted(map(id, index.near(r, x0, 120))) == sorted(map(id, near))
+            right = [z for z in zombies if z.row == r and x0 < z.x and not z.dead]
+            assert (index.first_right_of(r, x0) is None) == (not right)
+            if right:
+                assert index.first_right_of(r, x0).x == min(z.x for z in right)
+    # A full survival lawn plays out exactly as it does with scans
+    traces = []
+    for ZOMBIE_INDEX in (False, True):
+        game = _survival_lawn()
+        trace = []
+        for _ in range(600):
+            game.update()
+            trace.append(_lawn_trace(game))
+        traces.append(trace)
+    ZOMBIE_INDEX = True
+    assert traces[0] == traces[1]
+    print(f"zombie index ok  queries match scans, 600 survival ticks identical, {game.zombie_index.builds} builds")
+
+def benchmark_zombie_index(ticks=300):
+    """Plant targeting and whole-tick cost on a full lawn, with the wave spread out or massed in two rows."""
+    global ZOMBIE_INDEX
+    print(f"{'wave':<16}{'targeting ms (scan)':>21}{'(index)':>9}{'update ms (scan)':>18}{'(index)':>9}")
+    for count in (50, 100, 200):
+        for name, rows in (("spread", range(ROWS)), ("two rows", (0, 1))):
+            targeting, update = [], []
+            for ZOMBIE_INDEX in (False, True):
+                game = _survival_lawn(zombies=count, rows=rows)  # The wave holds still while the plants aim
+                t0 = time.perf_counter()
+                for _ in range(ticks):
+                    game.zombie_index.rebuild(game.zombies)
+                    for p in game.plants: p.update(game)
+                    game.zombies = [z for z in game.zombies if not z.dead]
+                    game.plants = [p for p in game.plants if not p.dead]
+                    game.plant_grid.prune(game.plants)
+                    game.projectiles.clear()
+                targeting.append((time.perf_counter() - t0) * 1000 / ticks)
+                game = _survival_lawn(zombies=count, rows=rows)
+                t0 = time.perf_counter()
+                for _ in range(ticks): game.update()
+                update.append((time.perf_counter() - t0) * 1000 / ticks)
+            label = f"{count} {name}"
+            print(f"{label:<16}{targeting[0]:>21.2f}{targeting[1]:>9.2f}{update[0]:>18.2f}{update[1]:>9.2f}")
+    ZOMBIE_INDEX = True
+
+def selftest_plant_grid():
+    global PLANT_GRID
+    # Each lookup, with the caller's own test applied, picks the same plants in the same order as a scan
+    random.seed(2)
+    game = _survival_lawn("pool", zombies=0)
+    grid = game.plant_grid
+    game.add_plant(Plant("flowerpot", 0, 2))    # Pot on a pad under a plant, a pad on a bare tile, lone pumpkins
+    game.add_plant(Plant("lilypad", 0, 2))
+    game.add_plant(Plant("pumpkin", 4, 1))
+    for p in random.sample(game.plants, 8):
+        p.pumpkin_hp = 4000
+    squash = Plant("squash", 3, 4)
+    game.add_plant(squash)
+    checks = {
+        "pole / dolphin": lambda r, x: (grid.near(r, x, 50),
+            lambda p: p.row == r and abs(x - p.x) < 50 and x > p.x and not p.dead),
+        "pogo / ladder": lambda r, x: (grid.near(r, x, 40),
+            lambda p: p.row == r and abs(x - p.x) < 40 and x > p.x and not p.dead),
+        "zomboni": lambda r, x: (grid.near(r, x, 40), lambda p: p.row == r and abs(x - p.x) < 40 and not p.dead),
+        "eating": lambda r, x: (grid.near(r, x, 35), lambda p: p.row == r and not p.dead
+            and p.key not in ("spikeweed", "spikerock") and abs(p.x - x) < 35),
+        "bungee": lambda r, x: (grid.at(r, int((x - GRID_X) // CELL_W)),
+            lambda p: p.col == int((x - GRID_X) // CELL_W) and p.row == r and not p.dead),
+        "catapult": lambda r, x: (grid.in_row(r), lambda p: p.row == r and not p.dead),
+        "torchwood": lambda r, x: (grid.in_row(r, int((x - GRID_X) // CELL_W) + 1),
+            lambda p: p.key == "torchwood" and p.row == r and p.col > int((x - GRID_X) // CELL_W) and not p.dead),
+        "zomboss stomp": lambda r, x: (grid.in_col(r), lambda p: p.col == r),
+        "tile click": lambda r, x: (grid.at(r, int((x - GRID_X) // CELL_W)),
+            lambda p: p.col == int((x - GRID_X) // CELL_W) and p.row == r),
+    }
+    for step in range(4):
+        if step == 1:  # Squash leaps two tiles off its own, mid-tick deaths are still listed
+            squash.x += 2 * CELL_W
+            grid.drift(squash)
+            for p in random.sample(game.plants, 10): p.dead = True
+        if step == 2:  # Dead plants pruned, fresh ones planted over them
+            game.plants = [p for p in game.plants if not p.dead]
+            grid.prune(game.plants)
+            for _ in range(6):
+                game.add_plant(Plant(random.choice(LAWN_MIX), random.randrange(COLS), random.randrange(ROWS)))
+        if step == 3:
+            game.plants.clear()
+            grid.clear()
+            game.add_plant(Plant("torchwood", 5, 0))
+        for name, check in checks.items():
+            for _ in range(300):
+                r = random.randint(-1, ROWS)
+                x = random.uniform(GRID_X - 150, SCREEN_WIDTH + 80)
+                candidates, test = check(r, x)
+                assert [p for p in candidates if test(p)] == [p for p in game.plants if test(p)], (name, step, r, x)
+    # A pool survival wave with vaulters, pogos, dolphins, Zombonis, diggers, bungees and catapults plays out the same
+    traces = []
+    for PLANT_GRID in (False, True):
+        game = _survival_lawn("pool", zombies=150, seed=50)
+        trace = []
+        for _ in range(900):
+            game.update()
+            trace.append(_lawn_trace(game))
+        traces.append(trace)
+    PLANT_GRID = True
+    assert traces[0] == traces[1]
+    assert len(game.plants) < ROWS * COLS * 2 - 2 * COLS  # Zombies did get to eat and crush
+    print(f"plant grid ok  lookups match scans, 900 pool survival ticks identical, {len(game.plants)} plants left")
+
+def benchmark_plant_grid(ticks=300):
+    """Zombie updates against a fully planted pool lawn, plant scans vs the tile grid."""
+    global PLANT_GRID
+    print(f"{'zombies':<9}{'zombies ms (scan)':>19}{'(grid)':>8}{'update ms (scan)':>18}{'(grid)':>8}")
+    for count in (50, 100, 200):
+        phase, update = [], []
+        for PLANT_GRID in (False, True):
+            game = _survival_lawn("pool", zombies=count)
+            for p in game.plants: p.hp = 10 ** 9  # Nothing gets eaten, so the lawn stays full
+            t0 = time.perf_counter()
+            for _ in range(ticks):
+                for z in game.zombies: z.update(game)
+                game.zombies = [z for z in game.zombies if not z.dead]
+                game.plants = [p for p in game.plants if not p.dead]
+                game.plant_grid.prune(game.plants)
+            phase.append((time.perf_counter() - t0) * 1000 / ticks)
+            game = _survival_lawn("pool", zombies=count)
+            t0 = time.perf_counter()
+            for _ in range(ticks): game.update()
+            update.append((time.perf_counter() - t0) * 1000 / ticks)
+        print(f"{count:<9}{phase[0]:>19.2f}{phase[1]:>8.2f}{update[0]:>18.2f}{update[1]:>8.2f}")
+    PLANT_GRID = True
+
 # ═══════════════════════════════════════════════════════════════
 #  LAUNCH
 # ═══════════════════════════════════════════════════════════════
-if __name__ == "__main__":
+if __name__ == "__main__" and "--selftest" in sys.argv:
+    selftest_zombie_index()
+    selftest_plant_grid()
+elif __name__ == "__main__" and "--bench" in sys.argv:
+    benchmark_zombie_index()
+    benchmark_plant_grid()
+elif __name__ == "__main__":
     print(f"╔═══════════════════════════════════════════════════╗")
     print(f"║  Cat's PVZ 1.0 — Complete Replanted Edition       ║")
     print(f"║  Team Flames / Samsoft / Flames Co                ║")
@@ -14,6 +14,7 @@ import sys
 import math
 import random
 import array
+import time
 
 # ─── Constants ───────────────────────────────────────────────────────────────
 SCREEN_W, SCREEN_H = 768, 720
@@ -38,6 +39,9 @@ SCROLL_THRESHOLD = SCREEN_W // 2.5
 LEVEL_WIDTH_TILES = 224  # 14 screens wide
 LEVEL_HEIGHT_TILES = 15
 
+# Rendering
+TILE_ATLAS = True  # Blit tiles from a pre-baked atlas instead of drawing each one
+
 # NES Palette (Authentic Hex Values)
 C_SKY          = (92, 148, 252)   # NES Sky Blue
 C_SKY_NIGHT    = (0, 0, 0)
@@ -313,6 +317,37 @@ def draw_scenery(surf, x, y, type_name):
         pygame.draw.ellipse(surf, C_WHITE, (x+25, y-10, 40, 30))
         pygame.draw.ellipse(surf, C_WHITE, (x+45, y, 50, 30))
 
+class TileAtlas:
+    """Every tile draw_game uses, drawn once with draw_block into one strip surface.
+
+    Question blocks get one cell per shimmer offset; the offset for a frame
+    is shimmer(frame), the same value draw_block computes.
+    """
+    TILES = {1: 'ground', 2: 'brick'}
+
+    @staticmethod
+    def shimmer(frame):
+        return int(math.sin(frame * 0.2) * 2)
+
+    def __init__(self):
+        entries = [(tile, 0, name, 0) for tile, name in self.TILES.items()]
+        # One representative frame per distinct question-mark offset
+        offsets = {}
+        for frame in range(64):
+            offsets.setdefault(self.shimmer(frame), frame)
+        entries += [(3, off, 'q_block', frame) for off, frame in sorted(offsets.items())]
+        self.surface = pygame.Surface((TILE * len(entries), TILE)).convert()
+        self.areas = {}
+        for i, (tile, off, name, frame) in enumerate(entries):
+            draw_block(self.surface, i * TILE, 0, name, frame)
+            self.areas[(tile, off)] = pygame.Rect(i * TILE, 0, TILE, TILE)
+
+    def tile_areas(self, frame):
+        """Tile id -> atlas rect for this frame"""
+        areas = {tile: self.areas[(tile, 0)] for tile in self.TILES}
+        areas[3] = self.areas[(3, self.shimmer(frame))]
+        return areas
+
 # ─── Level Generation ────────────────────────────────────────────────────────
 CONTENTS_COIN = 'coin'
 CONTENTS_MUSHROOM = 'mushroom'
@@ -429,6 +464,71 @@ class Player:
         h_curr = TILE * 2 if self.big else TILE
         return pygame.Rect(self.x+6, self.y, self.w, h_curr)
 
+# ─── Input Providers ─────────────────────────────────────────────────────────
+GAME_KEYS = (pygame.K_LEFT, pygame.K_RIGHT, pygame.K_z, pygame.K_SPACE, pygame.K_x, pygame.K_LSHIFT)
+
+class HeldKeys(frozenset):
+    """Keys down this tick; indexes like pygame.key.get_pressed()"""
+    __slots__ = ()
+
+    def __getitem__(self, key):
+        return key in self
+
+class InputProvider:
+    """Supplies one tick of input as (held, pressed) from held(game), the keys down this tick"""
+    def __init__(self, held):
+        self.held = held
+        self.last = HeldKeys()
+        self.recording = None # Set to a list to log every tick's held keys
+
+    def poll(self, game):
+        held = HeldKeys(self.held(game))
+        pressed = held - self.last # Key-down edges, like KEYDOWN events
+        self.last = held
+        if self.recording is not None:
+            self.recording.append(held)
+        return held, pressed
+
+def keyboard_held(game):
+    pygame.event.pump()
+    state = pygame.key.get_pressed()
+    return [k for k in GAME_KEYS if state[k]]
+
+class KeyboardInput(InputProvider):
+    def __init__(self):
+        super().__init__(keyboard_held)
+
+class ScriptedInput(InputProvider):
+    """Held keys from script(tick, game), e.g. a bot"""
+    def __init__(self, script):
+        super().__init__(self.step)
+        self.script = script
+        self.tick = 0
+
+    def step(self, game):
+        keys = self.script(self.tick, game)
+        self.tick += 1
+        return keys
+
+class RecordedInput(ScriptedInput):
+    """Replays a recording, then holds nothing"""
+    def __init__(self, frames):
+        super().__init__(self.frame)
+        self.frames = list(frames)
+
+    def frame(self, tick, game):
+        return self.frames[tick] if tick < len(self.frames) else ()
+
+    def save(self, path):
+        with open(path, 'w') as f:
+            for keys in self.frames:
+                f.write(','.join(sorted(pygame.key.name(k) for k in keys)) + '\n')
+
+    @classmethod
+    def load(cls, path):
+        with open(path) as f:
+            return cls([pygame.key.key_code(name) for name in line.strip().split(',') if name] for line in f)
+
 # ─── Main Game Loop ──────────────────────────────────────────────────────────
 class Game:
     def __init__(self):
@@ -448,6 +548,7 @@ class Game:
         
     def reset_level(self):
         self.level_data = LevelData(self.world, self.level)
+        self.atlas = TileAtlas()
         self.player = Player(100, 100)
         self.cam_x = 0
         self.audio.theme = 'underground' if self.level_data.underground else 'overworld'
@@ -462,7 +563,8 @@ class Game:
             if self.state == 'menu':
                 self.draw_menu()
             elif self.state == 'playing':
-                self.update_game()
+                self.update_game(pygame.key.get_pressed())
+                self.update_particles()
                 self.draw_game()
                 self.audio.update_music()
             elif self.state == 'game_over':
@@ -480,22 +582,42 @@ class Game:
                         self.audio.play('coin')
                         self.reset_level()
                 elif self.state == 'playing':
-                    if e.key == pygame.K_z or e.key == pygame.K_SPACE:
-                         # Coyote time allows jumping shortly after leaving ground
-                         if self.player.on_ground or self.player.coyote_timer > 0:
-                             self.player.vy = JUMP_FORCE
-                             self.audio.play('jump_big' if self.player.big else 'jump')
-                             self.player.coyote_timer = 0
-                             self.player.on_ground = False
-                    if e.key == pygame.K_x:
-                        if self.player.fire:
-                             self.fireball()
-                    if e.key == pygame.K_ESCAPE:
-                        self.state = 'menu'
+                    self.press_key(e.key)
                 elif self.state == 'game_over':
                      if e.key == pygame.K_RETURN:
                          self.state = 'menu'
 
+    def press_key(self, key):
+        if key == pygame.K_z or key == pygame.K_SPACE:
+             # Coyote time allows jumping shortly after leaving ground
+             if self.player.on_ground or self.player.coyote_timer > 0:
+                 self.player.vy = JUMP_FORCE
+                 self.audio.play('jump_big' if self.player.big else 'jump')
+                 self.player.coyote_timer = 0
+                 self.player.on_ground = False
+        if key == pygame.K_x:
+            if self.player.fire:
+                 self.fireball()
+        if key == pygame.K_ESCAPE:
+            self.state = 'menu'
+
+    def step(self, inputs):
+        """Advance exactly one tick of play from an InputProvider's (held, pressed), drawing nothing"""
+        held, pressed = inputs
+        self.frame_count += 1
+        if self.state == 'playing':
+            for key in pressed:
+                self.press_key(key)
+            self.update_game(held)
+            self.update_particles()
+
+    def run_headless(self, provider, ticks):
+        """Step as fast as possible, with no window, clock or music; returns ticks/sec"""
+        t0 = time.perf_counter()
+        for _ in range(ticks):
+            self.step(provider.poll(self))
+        return ticks / (time.perf_counter() - t0)
+
     def fireball(self):
         if len(self.player.fireballs) < 2:
             self.player.fireballs.append({
@@ -506,7 +628,7 @@ class Game:
             })
             self.audio.play('fireball')
 
-    def update_game(self):
+    def update_game(self, keys):
         p = self.player
         ld = self.level_data
         
@@ -516,7 +638,6 @@ class Game:
             return
 
         # ─── Player Physics ─────────────────────────
-        keys = pygame.key.get_pressed()
         acc = PLAYER_ACC
         max_s = PLAYER_MAX_WALK
         
@@ -732,6 +853,13 @@ class Game:
         self.player.vy = JUMP_FORCE
         self.audio.play('die')
         
+    def update_particles(self):
+        for part in self.particles[:]:
+            part['life'] -= 1
+            part['y'] -= 1
+            if part['life'] <= 0:
+                self.particles.remove(part)
+
     def add_particle(self, x, y, ptype, val):
         self.particles.append({'x': x, 'y': y, 'type': ptype, 'val': val, 'life': 60})
 
@@ -777,7 +905,7 @@ class Game:
         
         cam = self.cam_x
         start_col = int(cam // TILE)
-        end_col = start_col + (SCREEN_W // TILE) + 2
+        end_col = start_col + (self.screen.get_width() // TILE) + 2
         
         # Scenery
         for type_name, x, y in ld.decor:
@@ -789,12 +917,24 @@ class Game:
             draw_castle(self.screen, ld.castle_x - cam, (LEVEL_HEIGHT_TILES-5)*TILE - 40)
             
         # Tiles
-        for x in range(start_col, min(end_col, LEVEL_WIDTH_TILES)):
-            for y in range(LEVEL_HEIGHT_TILES):
-                t = ld.tiles[y][x]
-                if t == 1: draw_block(self.screen, x*TILE - cam, y*TILE, 'ground')
-                elif t == 2: draw_block(self.screen, x*TILE - cam, y*TILE, 'brick')
-                elif t == 3: draw_block(self.screen, x*TILE - cam, y*TILE, 'q_block', self.frame_count)
+        if TILE_ATLAS:
+            # One batched blit of atlas cells for everything on screen
+            sheet = self.atlas.surface
+            areas = self.atlas.tile_areas(self.frame_count)
+            batch = []
+            for x in range(start_col, min(end_col, LEVEL_WIDTH_TILES)):
+                sx = int(x*TILE - cam)
+                for y in range(LEVEL_HEIGHT_TILES):
+                    area = areas.get(ld.tiles[y][x])
+                    if area: batch.append((sheet, (sx, y*TILE), area))
+            self.screen.blits(batch, doreturn=False)
+        else:
+            for x in range(start_col, min(end_col, LEVEL_WIDTH_TILES)):
+                for y in range(LEVEL_HEIGHT_TILES):
+                    t = ld.tiles[y][x]
+                    if t == 1: draw_block(self.screen, x*TILE - cam, y*TILE, 'ground')
+                    elif t == 2: draw_block(self.screen, x*TILE - cam, y*TILE, 'brick')
+                    elif t == 3: draw_block(self.screen, x*TILE - cam, y*TILE, 'q_block', self.frame_count)
         
         # Pipes
         for px, py, ph in ld.pipes:
@@ -826,12 +966,7 @@ class Game:
              pygame.draw.circle(self.screen, C_FIREBALL, (int(f['x'] - cam), int(f['y'])), 6)
 
         # Particles
-        for part in self.particles[:]:
-            part['life'] -= 1
-            part['y'] -= 1
-            if part['life'] <= 0:
-                self.particles.remove(part)
-                continue
+        for part in self.particles:
             if part['type'] == 'text':
                 txt = self.hud_font.render(str(part['val']), True, C_WHITE)
                 self.screen.blit(txt, (part['x'] - cam, part['y']))
@@ -845,7 +980,128 @@ class Game:
         self.screen.blit(hud_coins, (300, 20))
         self.screen.blit(hud_world, (500, 20))
 
+# ─── Self-test / Benchmark (--selftest, --bench) ─────────────────────────────
+def _headless_game(seed=11):
+    import os
+    os.environ.setdefault('SDL_VIDEODRIVER', 'dummy')
+    os.environ.setdefault('SDL_AUDIODRIVER', 'dummy')
+    game = Game()
+    game.state = 'playing'
+    # Dense level: every empty cell above the ground becomes a block
+    rng = random.Random(seed)
+    tiles = game.level_data.tiles
+    for y in range(2, LEVEL_HEIGHT_TILES - 2):
+        for x in range(LEVEL_WIDTH_TILES):
+            if tiles[y][x] == 0:
+                tiles[y][x] = rng.choice((1, 2, 3))
+    return game
+
+def selftest_atlas():
+    """Atlas blits must be pixel-identical to drawing every tile"""
+    global TILE_ATLAS
+    game = _headless_game()
+    for cam, frame in ((0, 0), (333.5, 7), (1024.25, 23), (4000, 40), (8.75, 55)):
+        game.cam_x, game.frame_count = cam, frame
+        # pygame rounds a float outline rect differently from a fill, so the
+        # half-visible leftmost column can differ by a pixel at subpixel cams
+        left = 0 if cam == int(cam) else TILE
+        view = pygame.Rect(left, 0, SCREEN_W - left, SCREEN_H)
+        shots = []
+        for TILE_ATLAS in (False, True):
+            game.draw_game()
+            shots.append(pygame.image.tostring(game.screen.subsurface(view), 'RGB'))
+        assert shots[0] == shots[1], (cam, frame)
+    TILE_ATLAS = True
+    print("tile atlas selftest ok")
+
+def benchmark_atlas(frames=120):
+    """draw_game ms/frame on a dense level, procedural vs atlas, at 1x and 4x window scale"""
+    import time
+    global TILE_ATLAS
+    game = _headless_game()
+    print(f"{'scale':<8}{'procedural ms':>15}{'atlas ms':>10}")
+    for scale in (1, 4):
+        game.screen = pygame.Surface((SCREEN_W * scale, SCREEN_H * scale)).convert()
+        times = []
+        for TILE_ATLAS in (False, True):
+            t0 = time.perf_counter()
+            for f in range(frames):
+                game.frame_count = f
+                game.cam_x = (f * 37) % ((LEVEL_WIDTH_TILES - 16 * scale) * TILE)
+                game.draw_game()
+            times.append((time.perf_counter() - t0) * 1000 / frames)
+        print(f"{str(scale) + 'x':<8}{times[0]:>15.2f}{times[1]:>10.2f}")
+    TILE_ATLAS = True
+
+def _hold_right_jump(tick, game):
+    """Bot: run right, tapping jump for 20 ticks out of every 40"""
+    keys = [pygame.K_RIGHT, pygame.K_x]
+    if tick % 40 < 20: keys.append(pygame.K_z)
+    return keys
+
+def _sim_state(game):
+    p = game.player
+    return (p.x, p.y, p.vx, p.vy, p.dead, p.big, p.score, p.coins, game.cam_x, len(game.particles),
+            tuple((e['x'], e['y'], e['alive']) for e in game.level_data.enemies))
+
+def selftest_headless(ticks=10000):
+    """10,000 ticks of 1-1 under a bot with no drawing, then an exact replay of the recording"""
+    import os, tempfile
+    os.environ.setdefault('SDL_VIDEODRIVER', 'dummy')
+    os.environ.setdefault('SDL_AUDIODRIVER', 'dummy')
+    game = Game()
+    game.state = 'playing'
+    screen, game.screen = game.screen, None # Any drawing would now raise
+    furthest = [0.0]
+
+    def bot(tick, game):
+        furthest[0] = max(furthest[0], game.player.x)
+        return _hold_right_jump(tick, game)
+
+    bot_input = ScriptedInput(bot)
+    bot_input.recording = []
+    tps = game.run_headless(bot_input, ticks)
+    assert game.frame_count == ticks and len(bot_input.recording) == ticks
+    assert furthest[0] > SCREEN_W * 4, furthest[0]
+    assert game.player.score > 0
+    end = _sim_state(game)
+
+    path = os.path.join(tempfile.mkdtemp(), '1-1.keys')
+    RecordedInput(bot_input.recording).save(path)
+    for replay in (RecordedInput(bot_input.recording), RecordedInput.load(path)):
+        game.reset_level()
+        game.frame_count = 0
+        game.run_headless(replay, ticks)
+        assert _sim_state(game) == end
+    os.remove(path)
+    game.screen = screen
+    print(f"headless selftest ok ({ticks} ticks, furthest x {furthest[0]:.0f}, {tps:,.0f} ticks/s)")
+
+def benchmark_headless(ticks=3000):
+    """Bot ticks/sec uncapped: step + draw + flip like run() does, vs the headless step alone"""
+    game = _headless_game()
+    game.reset_level() # Plain 1-1, not the dense benchmark level
+    print(f"{'loop':<18}{'ticks/s':>10}{'ms/tick':>10}")
+    for label, draw in (("step + draw", True), ("headless step", False)):
+        bot = ScriptedInput(_hold_right_jump)
+        t0 = time.perf_counter()
+        for _ in range(ticks):
+            if game.player.dead: game.reset_level() # Respawn so the bot keeps playing
+            game.step(bot.poll(game))
+            if draw:
+                game.draw_game()
+                pygame.display.flip()
+        dt = time.perf_counter() - t0
+        print(f"{label:<18}{ticks / dt:>10,.0f}{dt / ticks * 1000:>10.3f}")
+
 # ─── Entry Point ─────────────────────────────────────────────────────────────
 if __name__ == '__main__':
-    game = Game()
-    game.run()
+    if '--selftest' in sys.argv:
+        selftest_atlas()
+        selftest_headless()
+    elif '--bench' in sys.argv:
+        benchmark_atlas()
+        benchmark_headless()
+    else:
+        game = Game()
+        game.run()
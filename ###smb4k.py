@@ -37,6 +37,22 @@ FIREBALL_SPEED = 8.0
 SCROLL_THRESHOLD = SCREEN_W // 2.5
 LEVEL_WIDTH_TILES = 224  # 14 screens wide
 LEVEL_HEIGHT_TILES = 15
+VERIFY_LEVELS = True  # Reroll generated levels whose flagpole Mario cannot reach
+VERIFY_RETRIES = 20   # Rerolls before keeping a level anyway
+
+# Enemy activation, per type:
+#   wake    - simulated while within this many px of the player
+#   sleep   - False keeps an enemy simulating once woken, wherever it goes
+#   despawn - removed once this many px behind the camera (None = never)
+ENEMY_INDEX = True  # Find nearby enemies through column buckets instead of scanning
+ENEMY_ACTIVATION = {
+    'goomba': {'wake': SCREEN_W + 100, 'sleep': True, 'despawn': None},
+    'koopa':  {'wake': SCREEN_W + 100, 'sleep': True, 'despawn': None},
+}
+BROADPHASE = True  # Pair fireballs and the player with enemies through a uniform grid
+
+# Rendering
+TILE_ATLAS = True  # Blit tiles from a pre-baked atlas instead of drawing each one
 
 # NES Palette (Authentic Hex Values)
 C_SKY          = (92, 148, 252)   # NES Sky Blue
@@ -322,28 +338,67 @@ def draw_castle(surf, x, y):
     for i in range(5):
         pygame.draw.rect(surf, C_CASTLE_GRAY, (x + i*30, y-20, 15, 20))
 
+class TileAtlas:
+    """Every tile draw_game uses, drawn once with draw_block into one strip surface.
+
+    Question blocks get one cell per shimmer offset; the offset for a frame
+    is shimmer(frame), the same value draw_block computes.
+    """
+    TILES = {1: 'ground', 2: 'brick'}
+
+    @staticmethod
+    def shimmer(frame):
+        return int(math.sin(frame * 0.2) * 2)
+
+    def __init__(self):
+        entries = [(tile, 0, name, 0) for tile, name in self.TILES.items()]
+        # One representative frame per distinct question-mark offset
+        offsets = {}
+        for frame in range(64):
+            offsets.setdefault(self.shimmer(frame), frame)
+        entries += [(3, off, 'q_block', frame) for off, frame in sorted(offsets.items())]
+        self.surface = pygame.Surface((TILE * len(entries), TILE)).convert()
+        self.areas = {}
+        for i, (tile, off, name, frame) in enumerate(entries):
+            draw_block(self.surface, i * TILE, 0, name, frame)
+            self.areas[(tile, off)] = pygame.Rect(i * TILE, 0, TILE, TILE)
+
+    def tile_areas(self, frame):
+        """Tile id -> atlas rect for this frame"""
+        areas = {tile: self.areas[(tile, 0)] for tile in self.TILES}
+        areas[3] = self.areas[(3, self.shimmer(frame))]
+        return areas
+
 # ─── Level Generation ────────────────────────────────────────────────────────
 CONTENTS_COIN = 'coin'
 CONTENTS_MUSHROOM = 'mushroom'
 CONTENTS_STAR = 'star'
 
 class LevelData:
-    def __init__(self, world, level):
+    def __init__(self, world, level, seed=None, retries=VERIFY_RETRIES):
         self.world = world
         self.level = level
+        self.seed = world * 10 + level if seed is None else seed
+        self.underground = (level == 2)
+        self.castle = (level == 4)
+        self.time = 400
+        self.generate(retries)
+
+    def generate(self, retries=VERIFY_RETRIES):
+        # Later attempts reseed; a level that verifies first time is unchanged
+        for attempt in range(retries + 1):
+            self.build(self.seed + attempt * 1000)
+            if attempt == retries or not VERIFY_LEVELS or verify_level(self)[0]:
+                break
+
+    def build(self, seed):
         self.tiles = [[0] * LEVEL_WIDTH_TILES for _ in range(LEVEL_HEIGHT_TILES)]
         self.enemies = []
         self.coins = []
         self.blocks = {}
         self.decor = []
         self.pipes = []
-        self.underground = (level == 2)
-        self.castle = (level == 4)
-        self.time = 400
-        self.generate()
-
-    def generate(self):
-        random.seed(self.world * 10 + self.level)
+        random.seed(seed)
         ground_y = LEVEL_HEIGHT_TILES - 2
         
         # 1. Base Ground
@@ -421,6 +476,351 @@ class LevelData:
         # Castle
         self.castle_x = (LEVEL_WIDTH_TILES - 5) * TILE
 
+# ─── Level Verification ──────────────────────────────────────────────────────
+class LevelVerifier:
+    """Proves Mario can get from the start to the flagpole over a LevelData's tile grid.
+
+    A state is a cell Mario can stand in. Each row keeps its states as one int
+    with a bit per column, so a jump is tried from every column of a row at
+    once. Jumps and walk-offs are simulated once from the physics constants,
+    with Mario as the single column under his centre, and merged into a trie
+    of tile steps so shared beginnings are checked once. Like update_game, a
+    step first moves across a column, then up or down a row; a blocked step
+    lands, or continues from where the game would snap Mario to.
+    """
+    SUBS = (-18, 5, 29)                # Takeoff rect.left offsets that keep the centre over the column
+    SPEEDS = (0.0, PLAYER_MAX_RUN)     # Horizontal speed at takeoff
+    HOLDS = (None, 4, 999)             # Frames jump is held; None walks off a ledge instead
+    BUMPS = 1                          # Wall or ceiling hits followed within one jump
+    SIDE, UP, DOWN = 0, 1, 2           # Step kinds: entered a column, or a row above / below
+    PAD_X, PAD_Y = 16, 8               # Empty columns left of and rows above the grid, so steps never index off it
+
+    def __init__(self):
+        self.tries = {big: self.build(big) for big in (False, True)}
+
+    def build(self, big):
+        """Root nodes of the step trie for small or big Mario"""
+        root = {}
+        h = TILE * 2 if big else TILE
+        for d in (1, -1):
+            for speed in self.SPEEDS:
+                for steer in (True, False):
+                    for hold in self.HOLDS:
+                        if hold is None: # Centre just over the next column's edge, not yet falling
+                            starts = [((TILE + 1 if d > 0 else -1) - (TILE - 12) / 2, 0.0, 0)]
+                        else:
+                            starts = [(sub, JUMP_FORCE, hold) for sub in self.SUBS]
+                        for x, vy, held in starts:
+                            self.grow(root, h, d, steer, held, x, float(TILE - h), speed * d, vy, 0, 0)
+        return self.freeze(root)
+
+    def grow(self, nodes, h, d, steer, hold, x, y, vx, vy, f, hits):
+        """Simulate from one pixel state, adding its steps under nodes (a key -> node dict)"""
+        w, T = TILE - 12, TILE
+        dc = math.floor((x + w / 2) / T)
+        r0, r1 = math.floor(y / T), math.floor((y + h - 1) / T)
+        while f < 240 and r0 <= LEVEL_HEIGHT_TILES:
+            f += 1
+            if steer:
+                vx = max(-PLAYER_MAX_RUN, min(PLAYER_MAX_RUN, vx + PLAYER_ACC * 1.5 * d))
+            else:
+                vx *= PLAYER_FRIC
+                if abs(vx) < 0.1: vx = 0
+            x += vx
+            c = math.floor((x + w / 2) / T)
+            if c != dc:
+                node = self.node(nodes, (self.SIDE, c, r0, r1))
+                if hits < self.BUMPS: # Pressed against the wall: rect edge on it, speed lost
+                    wx = c * T - w if c > dc else (c + 1) * T
+                    self.grow(node[5], h, d, steer, hold, wx, y, 0.0, vy, f - 1, hits + 1)
+                nodes, dc = node[4], c
+            vy += GRAVITY
+            if vy < 0 and f > hold: vy += 0.5
+            vy = min(MAX_FALL, vy)
+            y += vy
+            n0, n1 = math.floor(y / T), math.floor((y + h - 1) / T)
+            if vy < 0 and n0 < r0:
+                node = self.node(nodes, (self.UP, dc, n0, n0))
+                if hits < self.BUMPS: # Head bump: stops under the block
+                    self.grow(node[5], h, d, steer, 0, x, (n0 + 1) * T, vx, 0.0, f, hits + 1)
+                nodes = node[4]
+            elif vy > 0 and n1 > r1:
+                nodes = self.node(nodes, (self.DOWN, dc, n1, n1))[4] # Blocked means landed
+            r0, r1 = n0, n1
+
+    @staticmethod
+    def node(nodes, key):
+        node = nodes.get(key)
+        if node is None:
+            node = nodes[key] = list(key) + [{}, {}]
+        return node
+
+    def freeze(self, nodes):
+        """Nested dicts to (kind, dc, shift, r0, span, children, after_hit) tuples for verify"""
+        out = []
+        for kind, dc, r0, r1, kids, after in nodes.values():
+            assert -self.PAD_X <= dc and r0 >= -self.PAD_Y, "jump leaves the padded grid"
+            out.append((kind, dc, dc + self.PAD_X, r0, r1 - r0, self.freeze(kids), self.freeze(after)))
+        return out
+
+    def verify(self, ld, powerup=False):
+        """(True, flag column) if the flag can be touched, else (False, furthest column stood on).
+
+        With powerup the flag only counts once a mushroom block has been bumped.
+        """
+        H = LEVEL_HEIGHT_TILES
+        solid = [0] * H
+        mushrooms = [0] * H
+        for y, row in enumerate(ld.tiles):
+            solid[y] = int(''.join('1' if t else '0' for t in reversed(row)), 2)
+        for (x, y), content in ld.blocks.items():
+            solid[y] |= 1 << x
+            if content == CONTENTS_MUSHROOM and ld.tiles[y][x] == 3:
+                mushrooms[y] |= 1 << x
+        every = (1 << LEVEL_WIDTH_TILES) - 1
+        stand = {}
+        for r in range(H - 1):
+            floor = ~solid[r] & solid[r + 1] & every
+            stand[r, False] = floor
+            stand[r, True] = floor & ~solid[r - 1] if r > 0 else floor
+        goal = ld.flag_x // TILE
+        runs = {}
+
+        def walk(r, big, seeds):
+            """Every column connected to a seed by walking along row r"""
+            key = (r, big)
+            if key not in runs:
+                W, found = stand[key], []
+                starts, ends = W & ~(W << 1), W & ~(W >> 1)
+                while starts:
+                    s = starts & -starts
+                    e = ends & ~(s - 1)
+                    e &= -e
+                    found.append((e << 1) - s)
+                    starts ^= s
+                runs[key] = found
+            fill = 0
+            for run in runs[key]:
+                if run & seeds: fill |= run
+            return fill
+
+        # Start where Player(100, 100) lands
+        col = (100 + 6 + (TILE - 12) // 2) // TILE
+        row = next(r for r in range(2, H - 1) if stand[r, False] >> col & 1)
+        # Rows shifted up by PAD_X and down by PAD_Y, plus tables of each row
+        # ORed with the next one or two for bodies that straddle rows: checking
+        # a step is then one lookup and one right shift by the node's shift
+        PX, PY = self.PAD_X, self.PAD_Y
+        one = [0] * PY + [bits << PX for bits in solid] + [0, 0]
+        two = [a | b for a, b in zip(one, one[1:] + [0])]
+        rows = (one, two, [a | b for a, b in zip(two, one[2:] + [0, 0])])
+        caps = [0] * PY + [bits << PX for bits in mushrooms]
+        goal_shift = goal + PX
+        reach = {}
+        todo = {(row, False): 1 << col} # Landings not yet walked, merged per (row, big)
+        SIDE, UP = self.SIDE, self.UP
+        while todo:
+            (r, big), seeds = todo.popitem()
+            if not 0 <= r < H - 1: continue
+            have = reach.get((r, big), 0)
+            seeds &= stand[r, big] & ~have
+            if not seeds: continue
+            new = walk(r, big, seeds) & ~have
+            reach[r, big] = have | new
+            counts = big or not powerup
+            if counts and new >> goal:
+                return True, goal
+            base, depth = r + PY, H - r
+            stack = [(node, new) for node in self.tries[big]]
+            while stack:
+                (kind, dc, shift, r0, span, kids, after), A = stack.pop()
+                if r0 >= depth: continue # Fell out of the level
+                hit = rows[span][base + r0] >> shift & A
+                if hit:
+                    if kind == SIDE or kind == UP:
+                        for node in after:
+                            stack.append((node, hit))
+                        if kind == UP and powerup and not big:
+                            bumped = caps[base + r0] >> shift & hit
+                            if bumped: todo[r, True] = todo.get((r, True), 0) | bumped # Grows, then drops back where he jumped
+                    else:
+                        key = (r + r0 - 1, big)
+                        todo[key] = todo.get(key, 0) | hit << shift >> PX
+                    A ^= hit
+                    if not A: continue
+                if kind == SIDE and counts and A << shift >> goal_shift:
+                    return True, goal
+                for node in kids:
+                    stack.append((node, A))
+        furthest = max((bits.bit_length() - 1 for bits in reach.values()), default=col)
+        return False, furthest
+
+_verifier = None
+
+def verify_level(ld, powerup=False):
+    """LevelVerifier.verify with a verifier built once per process"""
+    global _verifier
+    if _verifier is None:
+        _verifier = LevelVerifier()
+    return _verifier.verify(ld, powerup)
+
+def _verify_seed(job):
+    world, level, seed, powerup = job
+    ld = LevelData(world, level, seed=seed, retries=0)
+    return (seed,) + verify_level(ld, powerup)
+
+def verify_seeds(seeds, world=1, level=1, powerup=False, jobs=None):
+    """Verify freshly generated levels for many seeds across worker processes; [(seed, ok, column)]"""
+    import multiprocessing
+    verify_level(LevelData(world, level, retries=0)) # Build the tries once before forking
+    with multiprocessing.Pool(jobs) as pool:
+        return pool.map(_verify_seed, [(world, level, s, powerup) for s in seeds], chunksize=64)
+
+def report_seeds(count, world=1, level=1, powerup=False):
+    """--verify-seeds: verify seeds 0..count-1 unrerolled and print the unbeatable ones"""
+    import time
+    t0 = time.perf_counter()
+    results = verify_seeds(range(count), world, level, powerup)
+    elapsed = time.perf_counter() - t0
+    bad = [(seed, column) for seed, ok, column in results if not ok]
+    print(f"{count} seeds of {world}-{level} in {elapsed:.1f}s ({count / elapsed:.0f}/s): {len(bad)} unbeatable")
+    for seed, column in bad[:20]:
+        print(f"  seed {seed}: stuck at column {column}")
+
+class EnemyIndex:
+    """Living enemies bucketed by tile column, so activation only visits nearby columns.
+
+    Enemies are referred to by their position in the level's enemy list and
+    candidates are always returned in that order, which keeps updates in
+    the same sequence as scanning the whole list.
+    """
+    def __init__(self, enemies):
+        self.enemies = enemies
+        self.buckets = {}
+        self.columns = {}
+        self.awake = {}
+        self.reach = max(policy['wake'] for policy in ENEMY_ACTIVATION.values())
+        for i, e in enumerate(enemies):
+            if e['alive']:
+                self._put(i, int(e['x'] // TILE))
+
+    def _put(self, i, col):
+        self.columns[i] = col
+        self.buckets.setdefault(col, {})[i] = None  # dict as an ordered set
+
+    def moved(self, i):
+        """Re-bucket enemy i after it has walked"""
+        col = int(self.enemies[i]['x'] // TILE)
+        old = self.columns.get(i)
+        if old is not None and old != col:
+            bucket = self.buckets[old]
+            del bucket[i]
+            if not bucket: del self.buckets[old]
+            self._put(i, col)
+
+    def remove(self, i):
+        """Drop a dead enemy from its bucket straight away"""
+        col = self.columns.pop(i, None)
+        if col is not None:
+            bucket = self.buckets[col]
+            del bucket[i]
+            if not bucket: del self.buckets[col]
+        self.awake.pop(i, None)
+
+    def between(self, x0, x1):
+        """Indices of living enemies whose column overlaps [x0, x1], in list order"""
+        found = []
+        for col in range(int(x0 // TILE) - 1, int(x1 // TILE) + 2):
+            bucket = self.buckets.get(col)
+            if bucket: found.extend(bucket)
+        found.sort()
+        return found
+
+    def active(self, px):
+        """Enemies to simulate this frame for a player at px, applying each type's policy"""
+        found = []
+        for i in self.between(px - self.reach, px + self.reach):
+            e = self.enemies[i]
+            policy = ENEMY_ACTIVATION[e['type']]
+            if abs(e['x'] - px) < policy['wake']:
+                found.append(i)
+                if not policy['sleep']:
+                    self.awake[i] = None
+        if self.awake:
+            found = sorted(set(found).union(self.awake))
+        return found
+
+class Broadphase:
+    """Uniform grid of TILE-sized cells for entity-versus-entity overlap queries.
+
+    Bodies register an AABB under a key (enemies use their list index) and
+    moving one only touches the cells it entered or left. Body rects are
+    updated in place and recycled through a pool, and queries reuse a probe
+    rect, so a tick allocates no Rects. Keys come back in ascending order,
+    the same order as scanning the enemy list.
+    """
+    def __init__(self):
+        self.cells = {}
+        self.bodies = {}
+        self.pool = []
+        self.probe = pygame.Rect(0, 0, 0, 0)
+        self.scratch = pygame.Rect(0, 0, 0, 0)  # for callers' narrow-phase tests
+        self.tests = 0
+
+    @staticmethod
+    def _span(rect):
+        return rect.left // TILE, rect.top // TILE, (rect.right - 1) // TILE, (rect.bottom - 1) // TILE
+
+    def _link(self, key, span):
+        x0, y0, x1, y1 = span
+        for cy in range(y0, y1 + 1):
+            for cx in range(x0, x1 + 1):
+                self.cells.setdefault((cx, cy), {})[key] = None  # dict as an ordered set
+
+    def _unlink(self, key, span):
+        x0, y0, x1, y1 = span
+        for cy in range(y0, y1 + 1):
+            for cx in range(x0, x1 + 1):
+                cell = self.cells[(cx, cy)]
+                del cell[key]
+                if not cell: del self.cells[(cx, cy)]
+
+    def update(self, key, x, y, w, h):
+        """Register or move a body"""
+        body = self.bodies.get(key)
+        if body is None:
+            rect = self.pool.pop() if self.pool else pygame.Rect(0, 0, 0, 0)
+            body = self.bodies[key] = [rect, None]
+        body[0].update(x, y, w, h)
+        span = self._span(body[0])
+        if span != body[1]:
+            if body[1] is not None:
+                self._unlink(key, body[1])
+            self._link(key, span)
+            body[1] = span
+
+    def remove(self, key):
+        body = self.bodies.pop(key, None)
+        if body is not None:
+            self._unlink(key, body[1])
+            self.pool.append(body[0])
+
+    def query(self, x, y, w, h):
+        """Keys of bodies overlapping the box, in ascending order"""
+        probe = self.probe
+        probe.update(x, y, w, h)
+        x0, y0, x1, y1 = self._span(probe)
+        candidates = {}
+        for cy in range(y0, y1 + 1):
+            for cx in range(x0, x1 + 1):
+                cell = self.cells.get((cx, cy))
+                if cell: candidates.update(cell)
+        self.tests += len(candidates)
+        bodies = self.bodies
+        found = [key for key in candidates if probe.colliderect(bodies[key][0])]
+        found.sort()
+        return found
+
 # ─── Game Objects ────────────────────────────────────────────────────────────
 class Player:
     def __init__(self, x, y):
@@ -465,11 +865,21 @@ class Game:
         
     def reset_level(self):
         self.level_data = LevelData(self.world, self.level)
+        self.index_enemies()
+        self.atlas = TileAtlas()
         self.player = Player(100, 100)
         self.cam_x = 0
         self.audio.theme = 'underground' if self.level_data.underground else 'overworld'
         self.particles = []
         
+    def index_enemies(self):
+        enemies = self.level_data.enemies
+        self.enemy_index = EnemyIndex(enemies)
+        self.broadphase = Broadphase()
+        for i, e in enumerate(enemies):
+            if e['alive']:
+                self.broadphase.update(i, e['x'], e['y'], TILE, TILE)
+
     def run(self):
         while True:
             self.frame_count += 1
@@ -523,7 +933,7 @@ class Game:
             })
             self.audio.play('fireball')
 
-    def update_game(self):
+    def update_game(self, keys=None):
         p = self.player
         ld = self.level_data
         
@@ -533,7 +943,8 @@ class Game:
             return
 
         # ─── Player Physics ─────────────────────────
-        keys = pygame.key.get_pressed()
+        if keys is None:
+            keys = pygame.key.get_pressed()
         acc = PLAYER_ACC
         max_s = PLAYER_MAX_WALK
         
@@ -595,49 +1006,64 @@ class Game:
             
         # ─── Entities ──────────────────────────────
         # Enemies
-        for e in ld.enemies:
+        index = self.enemy_index
+        grid = self.broadphase
+        if ENEMY_INDEX:
+            active = index.active(p.x)
+        else:
+            active = [i for i, e in enumerate(ld.enemies)
+                      if e['alive'] and abs(e['x'] - p.x) < ENEMY_ACTIVATION[e['type']]['wake']]
+        for i in active:
+            e = ld.enemies[i]
             if not e['alive']: continue
             # Basic AI
-            if abs(e['x'] - p.x) < SCREEN_W + 100: # Only update near player
-                e['vy'] += GRAVITY
-                e['vy'] = min(MAX_FALL, e['vy'])
-                e['x'] += e['vx']
-                e['y'] += e['vy']
-                
-                # Floor collision for enemy
-                ex_tile = int((e['x'] + TILE//2) // TILE)
-                ey_tile = int((e['y'] + TILE) // TILE)
-                if 0 <= ey_tile < LEVEL_HEIGHT_TILES and 0 <= ex_tile < LEVEL_WIDTH_TILES:
-                    if ld.tiles[ey_tile][ex_tile] != 0:
-                        e['y'] = (ey_tile * TILE) - TILE
-                        e['vy'] = 0
-                
-                # Wall turn-around
-                check_x = e['x'] + (TILE if e['vx'] > 0 else 0)
-                tx = int(check_x // TILE)
-                ty = int(e['y'] // TILE)
-                
-                wall_hit = False
-                if 0 <= ty < LEVEL_HEIGHT_TILES and 0 <= tx < LEVEL_WIDTH_TILES:
-                    if ld.tiles[ty][tx] != 0:
-                        wall_hit = True
-
-                if e['x'] < self.cam_x or wall_hit:
-                    e['vx'] *= -1
-                    e['facing'] *= -1
-                
-                # Player Interaction
-                e_rect = pygame.Rect(e['x']+4, e['y']+8, TILE-8, TILE-8)
-                if p.rect.colliderect(e_rect) and not p.invincible:
-                    # Stomp
-                    if p.vy > 0 and p.y + p.h < e['y'] + TILE//2:
-                        e['alive'] = False
-                        p.vy = BOUNCE_FORCE
-                        self.audio.play('stomp')
-                        self.add_particle(e['x'], e['y'], 'text', '100')
-                        p.score += 100
-                    else:
-                        self.damage_player()
+            e['vy'] += GRAVITY
+            e['vy'] = min(MAX_FALL, e['vy'])
+            e['x'] += e['vx']
+            e['y'] += e['vy']
+            
+            # Floor collision for enemy
+            ex_tile = int((e['x'] + TILE//2) // TILE)
+            ey_tile = int((e['y'] + TILE) // TILE)
+            if 0 <= ey_tile < LEVEL_HEIGHT_TILES and 0 <= ex_tile < LEVEL_WIDTH_TILES:
+                if ld.tiles[ey_tile][ex_tile] != 0:
+                    e['y'] = (ey_tile * TILE) - TILE
+                    e['vy'] = 0
+            
+            # Wall turn-around
+            check_x = e['x'] + (TILE if e['vx'] > 0 else 0)
+            tx = int(check_x // TILE)
+            ty = int(e['y'] // TILE)
+            
+            wall_hit = False
+            if 0 <= ty < LEVEL_HEIGHT_TILES and 0 <= tx < LEVEL_WIDTH_TILES:
+                if ld.tiles[ty][tx] != 0:
+                    wall_hit = True
+
+            if e['x'] < self.cam_x or wall_hit:
+                e['vx'] *= -1
+                e['facing'] *= -1
+            index.moved(i)
+            grid.update(i, e['x'], e['y'], TILE, TILE)
+
+            despawn = ENEMY_ACTIVATION[e['type']]['despawn']
+            if despawn is not None and e['x'] < self.cam_x - despawn:
+                self.remove_enemy(i)
+                continue
+            
+            # Player Interaction
+            if not BROADPHASE:
+                self.touch_enemy(i, pygame.Rect(e['x']+4, e['y']+8, TILE-8, TILE-8))
+
+        if BROADPHASE:
+            # Every enemy has moved, so each contact sees the same positions the
+            # per-enemy checks did; the grid only offers the ones near the player
+            r = p.rect
+            hitbox = grid.scratch
+            for i in grid.query(r.x, r.y, r.w, r.h):
+                e = ld.enemies[i]
+                hitbox.update(e['x']+4, e['y']+8, TILE-8, TILE-8)
+                self.touch_enemy(i, hitbox)
 
         # Fireballs
         for f in p.fireballs[:]:
@@ -659,18 +1085,43 @@ class Game:
                     f['vy'] = -5 # Bounce
             
             # Hit Enemy
-            f_rect = pygame.Rect(f['x'], f['y'], 8, 8)
-            hit = False
-            for e in ld.enemies:
-                if e['alive']:
-                    e_rect = pygame.Rect(e['x'], e['y'], TILE, TILE)
-                    if f_rect.colliderect(e_rect):
-                        e['alive'] = False
-                        hit = True
-                        self.audio.play('stomp')
-                        self.add_particle(e['x'], e['y'], 'text', '200')
-                        break
-            if hit: p.fireballs.remove(f)
+            if BROADPHASE:
+                hits = grid.query(f['x'], f['y'], 8, 8)
+            else:
+                f_rect = pygame.Rect(f['x'], f['y'], 8, 8)
+                if ENEMY_INDEX:
+                    nearby = index.between(f['x'] - TILE, f['x'] + 8)
+                else:
+                    nearby = range(len(ld.enemies))
+                hits = (i for i in nearby if ld.enemies[i]['alive']
+                        and f_rect.colliderect(pygame.Rect(ld.enemies[i]['x'], ld.enemies[i]['y'], TILE, TILE)))
+            for i in hits:
+                e = ld.enemies[i]
+                self.remove_enemy(i)
+                self.audio.play('stomp')
+                self.add_particle(e['x'], e['y'], 'text', '200')
+                p.fireballs.remove(f)
+                break
+
+    def touch_enemy(self, i, e_rect):
+        """Stomp enemy i or get hurt by it if the player overlaps its hitbox"""
+        p = self.player
+        e = self.level_data.enemies[i]
+        if p.rect.colliderect(e_rect) and not p.invincible:
+            # Stomp
+            if p.vy > 0 and p.y + p.h < e['y'] + TILE//2:
+                self.remove_enemy(i)
+                p.vy = BOUNCE_FORCE
+                self.audio.play('stomp')
+                self.add_particle(e['x'], e['y'], 'text', '100')
+                p.score += 100
+            else:
+                self.damage_player()
+
+    def remove_enemy(self, i):
+        self.level_data.enemies[i]['alive'] = False
+        self.enemy_index.remove(i)
+        self.broadphase.remove(i)
 
     def check_collision(self, ent, axis):
         ld = self.level_data
@@ -792,7 +1243,7 @@ class Game:
         
         cam = self.cam_x
         start_col = int(cam // TILE)
-        end_col = start_col + (SCREEN_W // TILE) + 2
+        end_col = start_col + (self.screen.get_width() // TILE) + 2
         
         # Scenery
         for type_name, x, y in ld.decor:
@@ -804,12 +1255,24 @@ class Game:
             draw_castle(self.screen, ld.castle_x - cam, (LEVEL_HEIGHT_TILES-5)*TILE - 40)
             
         # Tiles
-        for x in range(start_col, min(end_col, LEVEL_WIDTH_TILES)):
-            for y in range(LEVEL_HEIGHT_TILES):
-                t = ld.tiles[y][x]
-                if t == 1: draw_block(self.screen, x*TILE - cam, y*TILE, 'ground')
-                elif t == 2: draw_block(self.screen, x*TILE - cam, y*TILE, 'brick')
-                elif t == 3: draw_block(self.screen, x*TILE - cam, y*TILE, 'q_block', self.frame_count)
+        if TILE_ATLAS:
+            # One batched blit of atlas cells for everything on screen
+            sheet = self.atlas.surface
+            areas = self.atlas.tile_areas(self.frame_count)
+            batch = []
+            for x in range(start_col, min(end_col, LEVEL_WIDTH_TILES)):
+                sx = int(x*TILE - cam)
+                for y in range(LEVEL_HEIGHT_TILES):
+                    area = areas.get(ld.tiles[y][x])
+                    if area: batch.append((sheet, (sx, y*TILE), area))
+            self.screen.blits(batch, doreturn=False)
+        else:
+            for x in range(start_col, min(end_col, LEVEL_WIDTH_TILES)):
+                for y in range(LEVEL_HEIGHT_TILES):
+                    t = ld.tiles[y][x]
+                    if t == 1: draw_block(self.screen, x*TILE - cam, y*TILE, 'ground')
+                    elif t == 2: draw_block(self.screen, x*TILE - cam, y*TILE, 'brick')
+                    elif t == 3: draw_block(self.screen, x*TILE - cam, y*TILE, 'q_block', self.frame_count)
         
         # Pipes
         for px, py, ph in ld.pipes:
@@ -829,3 +1292,359 @@ class Game:
                      draw_koopa(self.screen, e['x'] - cam, e['y'], self.frame_count, e['facing'])
         
         # Player#
+
+# ─── Self-test / Benchmark (--selftest, --bench) ─────────────────────────────
+def _headless_game(seed=11, dense=True):
+    import os
+    os.environ.setdefault('SDL_VIDEODRIVER', 'dummy')
+    os.environ.setdefault('SDL_AUDIODRIVER', 'dummy')
+    game = Game()
+    game.state = 'playing'
+    if not dense:
+        return game
+    # Dense level: every empty cell above the ground becomes a block
+    rng = random.Random(seed)
+    tiles = game.level_data.tiles
+    for y in range(2, LEVEL_HEIGHT_TILES - 2):
+        for x in range(LEVEL_WIDTH_TILES):
+            if tiles[y][x] == 0:
+                tiles[y][x] = rng.choice((1, 2, 3))
+    return game
+
+def selftest_atlas():
+    """Atlas blits must be pixel-identical to drawing every tile"""
+    global TILE_ATLAS
+    game = _headless_game()
+    for cam, frame in ((0, 0), (333.5, 7), (1024.25, 23), (4000, 40), (8.75, 55)):
+        game.cam_x, game.frame_count = cam, frame
+        # pygame rounds a float outline rect differently from a fill, so the
+        # half-visible leftmost column can differ by a pixel at subpixel cams
+        left = 0 if cam == int(cam) else TILE
+        view = pygame.Rect(left, 0, SCREEN_W - left, SCREEN_H)
+        shots = []
+        for TILE_ATLAS in (False, True):
+            game.draw_game()
+            shots.append(pygame.image.tostring(game.screen.subsurface(view), 'RGB'))
+        assert shots[0] == shots[1], (cam, frame)
+    TILE_ATLAS = True
+    print("tile atlas selftest ok")
+
+def _crowd(game, count, seed=36):
+    """Replace the level's enemies with count walkers spread over the whole level"""
+    rng = random.Random(seed)
+    ground_y = LEVEL_HEIGHT_TILES - 2
+    game.level_data.enemies = [{
+        'type': 'goomba' if rng.random() < 0.8 else 'koopa',
+        'x': rng.uniform(8, LEVEL_WIDTH_TILES - 20) * TILE, 'y': (ground_y - 1 - rng.randint(0, 6)) * TILE,
+        'vx': rng.choice((-ENEMY_SPEED, ENEMY_SPEED)), 'vy': 0, 'alive': True, 'frame': 0, 'facing': -1
+    } for _ in range(count)]
+    game.index_enemies()
+
+def _scripted_play(game, frames):
+    """Run right, hop and throw fireballs on a fixed schedule; yields a state snapshot per frame"""
+    from collections import defaultdict
+    p = game.player
+    for f in range(frames):
+        keys = defaultdict(bool)
+        keys[pygame.K_RIGHT] = (f // 90) % 4 != 3
+        keys[pygame.K_LEFT] = (f // 90) % 4 == 3
+        keys[pygame.K_z] = f % 45 < 14
+        if keys[pygame.K_z] and p.on_ground and f % 45 == 0:
+            p.vy = JUMP_FORCE
+        if f % 25 == 0:
+            game.fireball()
+        if p.invincible: p.invincible -= 1
+        if p.dead:
+            # Respawn in place so the run keeps meeting enemies
+            p.dead, p.y, p.vy, p.invincible = False, 100, 0, 60
+        game.update_game(keys)
+        yield (p.x, p.y, p.vx, p.vy, p.score, p.big, p.dead, len(p.fireballs),
+               tuple((e['x'], e['y'], e['vx'], e['alive']) for e in game.level_data.enemies))
+
+def selftest_enemy_index(frames=1500):
+    """Bucketed activation must play out exactly like scanning every enemy"""
+    global ENEMY_INDEX
+    game = _headless_game(dense=False)
+    for world, level, crowd in ((1, 1, 0), (2, 3, 0), (1, 1, 400), (3, 1, 2000)):
+        runs = []
+        for ENEMY_INDEX in (False, True):
+            game.world, game.level = world, level
+            game.reset_level()
+            if crowd:
+                _crowd(game, crowd)
+            runs.append(list(_scripted_play(game, frames)))
+        ENEMY_INDEX = True
+        for f, (a, b) in enumerate(zip(*runs)):
+            assert a == b, f"{world}-{level} crowd={crowd}: diverged at frame {f}"
+        alive = sum(e['alive'] for e in game.level_data.enemies)
+        index = game.enemy_index
+        # Dead enemies are out of the buckets; the living are in the right column
+        assert sorted(i for b in index.buckets.values() for i in b) == \
+            [i for i, e in enumerate(game.level_data.enemies) if e['alive']]
+        for i, col in index.columns.items():
+            assert col == int(game.level_data.enemies[i]['x'] // TILE)
+        print(f"{world}-{level} crowd={crowd:<5} identical over {frames} frames ({alive} still alive)")
+    # Policies: goombas never sleep once woken, koopas despawn right behind the camera
+    saved = {k: dict(v) for k, v in ENEMY_ACTIVATION.items()}
+    ENEMY_ACTIVATION['goomba']['sleep'] = False
+    ENEMY_ACTIVATION['koopa']['despawn'] = 0
+    try:
+        game.reset_level()
+        _crowd(game, 300)
+        for _ in _scripted_play(game, 600):
+            pass
+        index = game.enemy_index
+        for i, e in enumerate(game.level_data.enemies):
+            near = abs(e['x'] - game.player.x) < ENEMY_ACTIVATION['koopa']['wake'] - TILE
+            if e['type'] == 'koopa' and e['alive'] and near:
+                assert e['x'] >= game.cam_x - ENEMY_ACTIVATION['koopa']['despawn'] - abs(e['vx'])
+            if i in index.awake:
+                assert e['type'] == 'goomba' and e['alive']
+        assert index.awake, "no goomba stayed awake"
+    finally:
+        for k, v in saved.items():
+            ENEMY_ACTIVATION[k].update(v)
+    print("enemy index selftest ok")
+
+def _stress_play(game, frames, fireballs=50, count=500, seed=39):
+    """count enemies on screen and fireballs topped up every frame; yields the keys to update with"""
+    rng = random.Random(seed)
+    p = game.player
+    p.x, p.y = 300.0, (LEVEL_HEIGHT_TILES - 3) * TILE
+    game.level_data.enemies = [{
+        'type': 'goomba' if rng.random() < 0.8 else 'koopa',
+        'x': rng.uniform(0, SCREEN_W * 1.5), 'y': rng.uniform(2, LEVEL_HEIGHT_TILES - 3) * TILE,
+        'vx': rng.choice((-ENEMY_SPEED, ENEMY_SPEED)), 'vy': 0, 'alive': True, 'frame': 0, 'facing': -1
+    } for _ in range(count)]
+    game.index_enemies()
+    keys = {pygame.K_RIGHT: False, pygame.K_LEFT: False, pygame.K_LSHIFT: False,
+            pygame.K_x: False, pygame.K_z: False, pygame.K_SPACE: False}
+    for f in range(frames):
+        p.invincible = 2  # keep the player in the crowd without dying
+        while len(p.fireballs) < fireballs:
+            p.fireballs.append({'x': game.cam_x + rng.uniform(0, SCREEN_W - 60), 'y': rng.uniform(0, SCREEN_H - 150),
+                                'vx': rng.choice((-FIREBALL_SPEED, FIREBALL_SPEED)), 'vy': 0})
+        yield keys
+
+def _snapshot(game):
+    p = game.player
+    return (p.x, p.y, p.vx, p.vy, p.score, p.big, p.dead, len(p.fireballs),
+            tuple((e['x'], e['y'], e['vx'], e['alive']) for e in game.level_data.enemies))
+
+def selftest_broadphase(frames=1500):
+    """Grid pair queries must play out exactly like testing every candidate pair"""
+    global BROADPHASE
+    game = _headless_game(dense=False)
+    for world, level, crowd in ((1, 1, 0), (2, 3, 0), (1, 1, 400), (3, 1, 2000)):
+        runs = []
+        for BROADPHASE in (False, True):
+            game.world, game.level = world, level
+            game.reset_level()
+            if crowd:
+                _crowd(game, crowd)
+            runs.append(list(_scripted_play(game, frames)))
+        BROADPHASE = True
+        for f, (a, b) in enumerate(zip(*runs)):
+            assert a == b, f"{world}-{level} crowd={crowd}: diverged at frame {f}"
+        print(f"{world}-{level} crowd={crowd:<5} identical over {frames} frames")
+    runs = []
+    for BROADPHASE in (False, True):
+        game.reset_level()
+        run = []
+        for keys in _stress_play(game, 240):
+            game.update_game(keys)
+            run.append(_snapshot(game))
+        runs.append(run)
+    BROADPHASE = True
+    assert runs[0] == runs[1], "stress scene diverged"
+    enemies = game.level_data.enemies
+    killed = sum(not e['alive'] for e in enemies)
+    assert killed > 50, killed
+    # The grid holds exactly the living enemies, each in the cells its box covers
+    grid = game.broadphase
+    assert sorted(grid.bodies) == [i for i, e in enumerate(enemies) if e['alive']]
+    cells = {}
+    for i, (rect, span) in grid.bodies.items():
+        assert rect == pygame.Rect(enemies[i]['x'], enemies[i]['y'], TILE, TILE) and span == grid._span(rect)
+        for cy in range(span[1], span[3] + 1):
+            for cx in range(span[0], span[2] + 1):
+                cells.setdefault((cx, cy), set()).add(i)
+    assert cells == {k: set(v) for k, v in grid.cells.items()}
+    assert len(grid.pool) == killed
+    print(f"stress 50 fireballs x 500 enemies identical over 240 frames ({killed} killed)")
+    print("broadphase selftest ok")
+
+def _flat_level():
+    """Level 1-1 stripped to bare ground up to the castle bridge, for hand-built obstacles"""
+    ld = LevelData(1, 1, retries=0)
+    ground_y = LEVEL_HEIGHT_TILES - 2
+    for y, row in enumerate(ld.tiles):
+        row[:] = [int(y >= ground_y and x < LEVEL_WIDTH_TILES - 15) for x in range(LEVEL_WIDTH_TILES)]
+    ld.blocks, ld.enemies, ld.pipes = {}, [], []
+    return ld
+
+def _jump_clears(game, ld, col):
+    """Whether one running jump in update_game lands Mario past column col, at any takeoff point"""
+    from collections import defaultdict
+    game.level_data = ld
+    game.index_enemies()
+    for takeoff in range(0, 100, 2):
+        p = game.player = Player((col - 14) * TILE, (LEVEL_HEIGHT_TILES - 3) * TILE)
+        game.cam_x = p.x - 200
+        for f in range(takeoff + 120):
+            keys = defaultdict(bool)
+            keys[pygame.K_RIGHT] = keys[pygame.K_x] = True
+            keys[pygame.K_z] = f >= takeoff
+            if f == takeoff:
+                if not p.on_ground: break
+                p.vy = JUMP_FORCE
+            game.update_game(keys)
+            if p.dead or p.y > SCREEN_H: break
+            if f > takeoff + 1 and p.on_ground:
+                if p.x > (col + 1) * TILE: return True
+                break
+    return False
+
+def selftest_verifier():
+    """Verifier verdicts must match real jumps, and rerolls must only touch unbeatable levels"""
+    global VERIFY_LEVELS
+    game = _headless_game(dense=False)
+    ground_y, col = LEVEL_HEIGHT_TILES - 2, 40
+    # Walls and gaps: the verifier's threshold is where a real running jump stops clearing
+    for kind, sizes in (('wall', range(1, 7)), ('gap', range(1, 9))):
+        verdicts = []
+        for size in sizes:
+            ld = _flat_level()
+            if kind == 'wall':
+                for y in range(ground_y - size, ground_y):
+                    ld.tiles[y][col] = 1
+            else:
+                for x in range(col - size + 1, col + 1):
+                    ld.tiles[ground_y][x] = ld.tiles[ground_y + 1][x] = 0
+            ok = verify_level(ld)[0]
+            assert ok == _jump_clears(game, ld, col), (kind, size, ok)
+            verdicts.append(ok)
+        assert verdicts[0] and not verdicts[-1] and verdicts == sorted(verdicts, reverse=True), (kind, verdicts)
+    # The report names the last column Mario can stand on
+    ld = _flat_level()
+    for y in range(2, ground_y):
+        ld.tiles[y][col] = 1
+    assert verify_level(ld) == (False, col - 1), verify_level(ld)
+    # Power-up runs need a mushroom block within reach
+    ld = _flat_level()
+    assert verify_level(ld) == (True, ld.flag_x // TILE) and not verify_level(ld, powerup=True)[0]
+    for height, reachable in ((8, False), (4, True)):
+        ld.tiles[ground_y - height][30] = 3
+        ld.blocks = {(30, ground_y - height): CONTENTS_MUSHROOM}
+        assert verify_level(ld, powerup=True)[0] == reachable, height
+    # Rerolls: beatable stock levels are unchanged, unbeatable ones get a new layout
+    for world, level in ((1, 1), (2, 3), (8, 2)):
+        VERIFY_LEVELS = False
+        raw = LevelData(world, level)
+        VERIFY_LEVELS = True
+        checked = LevelData(world, level)
+        assert verify_level(checked)[0]
+        assert (raw.tiles == checked.tiles) == verify_level(raw)[0], (world, level)
+    print("level verifier selftest ok")
+
+def benchmark_verifier(count=200):
+    """Verifier ms/level, and LevelData ms/level with and without verification and rerolls"""
+    import time
+    global VERIFY_LEVELS
+    verify_level(LevelData(1, 1, retries=0))
+    levels = [LevelData(1 + i % 8, 1 + i // 8 % 4, seed=i, retries=0) for i in range(count)]
+    print(f"{'':<22}{'ms/level':>10}")
+    for label, powerup in (("verify", False), ("verify (powerup)", True)):
+        t0 = time.perf_counter()
+        for ld in levels:
+            verify_level(ld, powerup)
+        print(f"{label:<22}{(time.perf_counter() - t0) * 1000 / count:>10.2f}")
+    for label, VERIFY_LEVELS in (("generate", False), ("generate + verify", True)):
+        t0 = time.perf_counter()
+        for i in range(count):
+            LevelData(1 + i % 8, 1 + i // 8 % 4, seed=i)
+        print(f"{label:<22}{(time.perf_counter() - t0) * 1000 / count:>10.2f}")
+    VERIFY_LEVELS = True
+    print(f"unbeatable before reroll: {sum(not verify_level(ld)[0] for ld in levels)}/{count}")
+
+def benchmark_broadphase(frames=240):
+    """Stress scene (50 fireballs x 500 enemies): update_game ms/frame and candidate pairs/frame"""
+    import time
+    global ENEMY_INDEX, BROADPHASE
+    game = _headless_game(dense=False)
+    print(f"{'pairing':<16}{'ms/frame':>10}{'pairs/frame':>13}")
+    for label, ENEMY_INDEX, BROADPHASE in (("all pairs", False, False), ("column buckets", True, False),
+                                           ("grid", True, True)):
+        game.reset_level()
+        elapsed = pairs = 0
+        for keys in _stress_play(game, frames):
+            p, ld, index = game.player, game.level_data, game.enemy_index
+            if BROADPHASE:
+                before = game.broadphase.tests
+            else:
+                # Each fireball against its candidates, plus each simulated enemy against the player
+                alive = sum(e['alive'] for e in ld.enemies)
+                active = len(index.active(p.x)) if ENEMY_INDEX else alive
+                for f in p.fireballs:
+                    pairs += len(index.between(f['x'] - TILE, f['x'] + 8)) if ENEMY_INDEX else alive
+                pairs += active
+            t0 = time.perf_counter()
+            game.update_game(keys)
+            elapsed += time.perf_counter() - t0
+            if BROADPHASE:
+                pairs += game.broadphase.tests - before
+        print(f"{label:<16}{elapsed * 1000 / frames:>10.2f}{pairs / frames:>13.0f}")
+    ENEMY_INDEX = BROADPHASE = True
+
+def benchmark_enemy_index(frames=600, count=2000):
+    """update_game ms/frame on a synthetic 2,000-enemy level, full scan vs column buckets"""
+    import time
+    global ENEMY_INDEX
+    game = _headless_game(dense=False)
+    print(f"{'enemies':<10}{'scan ms':>10}{'index ms':>10}")
+    for ENEMY_INDEX in (False, True):
+        game.reset_level()
+        _crowd(game, count)
+        t0 = time.perf_counter()
+        for _ in _scripted_play(game, frames):
+            pass
+        if ENEMY_INDEX:
+            indexed = (time.perf_counter() - t0) * 1000 / frames
+        else:
+            scanned = (time.perf_counter() - t0) * 1000 / frames
+    print(f"{count:<10}{scanned:>10.2f}{indexed:>10.2f}")
+
+def benchmark_atlas(frames=120):
+    """draw_game ms/frame on a dense level, procedural vs atlas, at 1x and 4x window scale"""
+    import time
+    global TILE_ATLAS
+    game = _headless_game()
+    print(f"{'scale':<8}{'procedural ms':>15}{'atlas ms':>10}")
+    for scale in (1, 4):
+        game.screen = pygame.Surface((SCREEN_W * scale, SCREEN_H * scale)).convert()
+        times = []
+        for TILE_ATLAS in (False, True):
+            t0 = time.perf_counter()
+            for f in range(frames):
+                game.frame_count = f
+                game.cam_x = (f * 37) % ((LEVEL_WIDTH_TILES - 16 * scale) * TILE)
+                game.draw_game()
+            times.append((time.perf_counter() - t0) * 1000 / frames)
+        print(f"{str(scale) + 'x':<8}{times[0]:>15.2f}{times[1]:>10.2f}")
+    TILE_ATLAS = True
+
+# ─── Entry Point ─────────────────────────────────────────────────────────────
+if __name__ == '__main__':
+    if '--selftest' in sys.argv:
+        selftest_atlas()
+        selftest_enemy_index()
+        selftest_broadphase()
+        selftest_verifier()
+    elif '--bench' in sys.argv:
+        benchmark_atlas()
+        benchmark_enemy_index()
+        benchmark_broadphase()
+        benchmark_verifier()
+    elif '--verify-seeds' in sys.argv:
+        at = sys.argv.index('--verify-seeds') + 1
+        report_seeds(int(sys.argv[at]) if at < len(sys.argv) else 10000)
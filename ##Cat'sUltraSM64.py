@@ -2,6 +2,7 @@ import pygame
 import math
 import sys
 import random
+import time
 
 # --- CONFIGURATION ---
 WIDTH, HEIGHT = 800, 600
@@ -29,6 +30,12 @@ GRAVITY = 0.9
 KEY_TURN = 0.06
 STAR_TOTAL = 120
 
+# Trigger volumes
+TRIGGER_CELL = 128      # XZ cell size of the trigger grid
+STAR_RADIUS = 60        # Star pickup sphere
+COIN_RADIUS = 40        # Coin pickup sphere
+PAINTING_REACH = 150    # Half-width of the XZ box in front of a painting
+
 # =====================================================================
 # SM64 PC PORT COLOR PALETTES (sourced from actual texture/vertex data)
 # =====================================================================
@@ -356,6 +363,87 @@ class Coin(Mesh):
         self.add_cube(4,8,4,0,0,0,BUTTON_GOLD)
 
 
+# =====================================================================
+# TRIGGER VOLUMES — collectibles and warps in a uniform XZ grid
+# =====================================================================
+class Trigger:
+    """Sphere (r) or box (hx, hy, hz) volume with a payload and enter/exit callbacks"""
+    __slots__ = ['x', 'y', 'z', 'r', 'hx', 'hy', 'hz', 'payload', 'on_enter', 'on_exit', 'order', 'cells']
+    def __init__(self, x, y, z, payload, on_enter, on_exit, r=None, hx=0, hy=0, hz=0):
+        self.x = x; self.y = y; self.z = z
+        self.r = r; self.hx = hx; self.hy = hy; self.hz = hz
+        self.payload = payload; self.on_enter = on_enter; self.on_exit = on_exit
+        self.order = 0; self.cells = []
+
+    def contains(self, x, y, z):
+        dx = x - self.x; dy = y - self.y; dz = z - self.z
+        if self.r is not None:
+            return math.sqrt(dx*dx + dy*dy + dz*dz) < self.r
+        return abs(dx) < self.hx and abs(dy) < self.hy and abs(dz) < self.hz
+
+class TriggerGrid:
+    """Triggers bucketed into every XZ cell their bounds touch.
+
+    update() only tests the bucket of the cell Mario is in, and remove()
+    only touches the few buckets the trigger was filed under.
+    """
+    def __init__(self, cell=TRIGGER_CELL):
+        self.cell = cell
+        self.cells = {}
+        self.inside = {}    # triggers currently containing Mario (ordered set)
+        self.count = 0
+
+    def _add(self, t, ext_x, ext_z):
+        c = self.cell
+        t.order = self.count
+        self.count += 1
+        for gx in range(math.floor((t.x - ext_x) / c), math.floor((t.x + ext_x) / c) + 1):
+            for gz in range(math.floor((t.z - ext_z) / c), math.floor((t.z + ext_z) / c) + 1):
+                self.cells.setdefault((gx, gz), {})[t] = None
+                t.cells.append((gx, gz))
+        return t
+
+    def add_sphere(self, x, y, z, r, payload, on_enter=None, on_exit=None):
+        return self._add(Trigger(x, y, z, payload, on_enter, on_exit, r=r), r, r)
+
+    def add_box(self, x, y, z, hx, hy, hz, payload, on_enter=None, on_exit=None):
+        return self._add(Trigger(x, y, z, payload, on_enter, on_exit, hx=hx, hy=hy, hz=hz), hx, hz)
+
+    def remove(self, t):
+        for key in t.cells:
+            bucket = self.cells[key]
+            del bucket[t]
+            if not bucket:
+                del self.cells[key]
+        t.cells = []
+        self.inside.pop(t, None)
+
+    def query(self, x, y, z):
+        bucket = self.cells.get((math.floor(x / self.cell), math.floor(z / self.cell)))
+        if not bucket:
+            return []
+        return [t for t in bucket if t.contains(x, y, z)]
+
+    def update(self, x, y, z):
+        """Fire on_exit for volumes Mario left and on_enter for ones he entered"""
+        now = self.query(x, y, z)
+        if self.inside:
+            still = set(now)
+            for t in [t for t in self.inside if t not in still]:
+                del self.inside[t]
+                if t.on_exit:
+                    t.on_exit(t)
+        for t in now:
+            if t.cells and t not in self.inside:
+                self.inside[t] = None
+                if t.on_enter:
+                    t.on_enter(t)
+
+    def active(self):
+        """Triggers Mario is inside, in registration order"""
+        return sorted(self.inside, key=lambda t: t.order)
+
+
 # =====================================================================
 # SM64 PC PORT LEVEL BUILDERS — AUTHENTIC OUTDOOR GEOMETRY
 # =====================================================================
@@ -1264,6 +1352,25 @@ UPPER_PAINTINGS = [
     {"pos":(778,100,-300),"level":"c12_tall"},{"pos":(778,100,-500),"level":"c13_tiny"},
     {"pos":(0,60,-778),"level":"c14_clock"},{"pos":(0,75,-790),"level":"c15_rainbow"},
 ]
+LEVEL_PAINTINGS = {"castle_f1":CASTLE_F1_PAINTINGS,"castle_basement":BASEMENT_PAINTINGS,
+                   "castle_upper":UPPER_PAINTINGS}
+
+def build_level_triggers(stars, coins, on_star, on_coin):
+    """Pickup grid for a level: stars and coins as spheres"""
+    grid = TriggerGrid()
+    for star in stars:
+        if not star.collected: grid.add_sphere(star.x,star.y,star.z,STAR_RADIUS,star,on_star)
+    for coin in coins:
+        if not coin.collected: grid.add_sphere(coin.x,coin.y,coin.z,COIN_RADIUS,coin,on_coin)
+    return grid
+
+def build_warp_triggers(paintings, on_enter, on_exit):
+    """Painting warps as XZ boxes (any height) in front of each canvas"""
+    grid = TriggerGrid()
+    for p in paintings:
+        px,py,pz = p["pos"]
+        grid.add_box(px,py,pz,PAINTING_REACH,float('inf'),PAINTING_REACH,p,on_enter,on_exit)
+    return grid
 
 
 # =====================================================================
@@ -1377,6 +1484,7 @@ def main():
     vel_x=vel_z=0.0; head_bob_phase=0.0; mouse_captured=False
     cx,cy = WIDTH//2,HEIGHT//2
     collected_stars = set(); total_coins = 0
+    level_triggers = None; warp_triggers = None; warp_hint = ""
     star_flash=0; coin_flash=0; level_name_timer=0; level_display_name=""
 
     def release_mouse():
@@ -1388,8 +1496,30 @@ def main():
         pygame.mouse.set_visible(False); pygame.event.set_grab(True); mouse_captured=True
         pygame.mouse.set_pos(cx, cy)
 
+    def collect_star(trigger):
+        nonlocal star_flash
+        star = trigger.payload
+        star.collected=True; collected_stars.add(f"{current_level_id}_{star.star_id}")
+        star_flash=30
+        level_triggers.remove(trigger)
+
+    def collect_coin(trigger):
+        nonlocal total_coins, coin_flash
+        trigger.payload.collected=True; total_coins+=1; coin_flash=15
+        if total_coins%50==0: mario.lives+=1
+        level_triggers.remove(trigger)
+
+    def near_painting(trigger):
+        nonlocal warp_hint
+        warp_hint = LEVELS[trigger.payload["level"]]["name"]
+
+    def leave_painting(trigger):
+        nonlocal warp_hint
+        warp_hint = ""
+
     def load_level(level_id):
         nonlocal mario, current_level_mesh, current_level_stars, current_level_coins
+        nonlocal level_triggers, warp_triggers, warp_hint
         nonlocal current_level_id, cam_x,cam_y,cam_z,cam_yaw,cam_pitch
         nonlocal vel_x,vel_z,head_bob_phase, level_name_timer,level_display_name
         info = LEVELS[level_id]
@@ -1402,6 +1532,10 @@ def main():
             else: current_level_mesh=result[0]; current_level_stars=[]; current_level_coins=[]
         else: current_level_mesh=result; current_level_stars=[]; current_level_coins=[]
         mario = Mario(0,50,400)
+        level_triggers = build_level_triggers(current_level_stars,current_level_coins,collect_star,collect_coin)
+        warp_hint = ""
+        warp_triggers = build_warp_triggers(LEVEL_PAINTINGS.get(level_id,[]),near_painting,leave_painting)
+        warp_triggers.update(mario.x,mario.y,mario.z)
         cam_yaw=math.pi; cam_pitch=0.0
         cam_x=mario.x; cam_y=mario.y+EYE_HEIGHT; cam_z=mario.z
         vel_x=vel_z=0.0; head_bob_phase=0.0
@@ -1503,31 +1637,25 @@ def main():
                         if current_level_id=="castle_grounds":
                             if abs(mario.x)<100 and mario.z<-900: load_level("castle_f1")
                         elif current_level_id=="castle_f1":
-                            entered=False
-                            for p in CASTLE_F1_PAINTINGS:
-                                if abs(mario.x-p["pos"][0])<150 and abs(mario.z-p["pos"][2])<150:
-                                    load_level(p["level"]); entered=True; break
-                            if not entered:
+                            warps = warp_triggers.active()
+                            if warps: load_level(warps[0].payload["level"])
+                            else:
                                 if abs(mario.x-600)<100 and abs(mario.z-600)<100: load_level("castle_basement")
                                 elif abs(mario.x)<200 and mario.z<-800: load_level("castle_upper")
                                 elif abs(mario.x)<200 and mario.z>800: load_level("castle_grounds")
                                 elif abs(mario.x)<100 and abs(mario.z)<100 and mario.y>50: load_level("s_slide")
                         elif current_level_id=="castle_basement":
-                            entered=False
-                            for p in BASEMENT_PAINTINGS:
-                                if abs(mario.x-p["pos"][0])<150 and abs(mario.z-p["pos"][2])<150:
-                                    load_level(p["level"]); entered=True; break
-                            if not entered:
+                            warps = warp_triggers.active()
+                            if warps: load_level(warps[0].payload["level"])
+                            else:
                                 if abs(mario.x-800)<100 and abs(mario.z-800)<100: load_level("s_metal")
                                 elif abs(mario.x-600)<100 and abs(mario.z+1178)<100: load_level("s_vanish")
                                 elif abs(mario.x)<200 and mario.z>1000: load_level("castle_f1")
                                 elif abs(mario.x)<100 and abs(mario.z+600)<100: load_level("b1_dark")
                         elif current_level_id=="castle_upper":
-                            entered=False
-                            for p in UPPER_PAINTINGS:
-                                if abs(mario.x-p["pos"][0])<150 and abs(mario.z-p["pos"][2])<150:
-                                    load_level(p["level"]); entered=True; break
-                            if not entered:
+                            warps = warp_triggers.active()
+                            if warps: load_level(warps[0].payload["level"])
+                            else:
                                 if abs(mario.x)<200 and mario.z<-600: load_level("castle_top")
                                 elif abs(mario.x)<200 and mario.z>600: load_level("castle_f1")
                                 elif abs(mario.x-600)<200 and abs(mario.z)<200: load_level("b2_fire")
@@ -1679,21 +1807,9 @@ def main():
                 cam_y += (target_y - cam_y) * CAM_LERP
                 cam_z += (target_z - cam_z) * CAM_LERP
 
-                # Collectibles
-                for star in current_level_stars:
-                    if not star.collected:
-                        star.yaw += 0.05
-                        dx=mario.x-star.x; dy=mario.y-star.y; dz=mario.z-star.z
-                        if math.sqrt(dx*dx+dy*dy+dz*dz)<60:
-                            star.collected=True; collected_stars.add(f"{current_level_id}_{star.star_id}")
-                            star_flash=30
-                for coin in current_level_coins:
-                    if not coin.collected:
-                        coin.yaw += 0.08
-                        dx=mario.x-coin.x; dy=mario.y-coin.y; dz=mario.z-coin.z
-                        if math.sqrt(dx*dx+dy*dy+dz*dz)<40:
-                            coin.collected=True; total_coins+=1; coin_flash=15
-                            if total_coins%50==0: mario.lives+=1
+                # Collectibles + painting proximity (trigger grid, Mario's cell only)
+                level_triggers.update(mario.x,mario.y,mario.z)
+                warp_triggers.update(mario.x,mario.y,mario.z)
 
             # === RENDER SCENE ===
             all_polys = []
@@ -1701,9 +1817,11 @@ def main():
                 all_polys.extend(render_mesh(screen,current_level_mesh,cam_x,cam_y,cam_z,cam_yaw,cam_pitch,cx,cy))
             for star in current_level_stars:
                 if not star.collected:
+                    star.yaw += 0.05
                     all_polys.extend(render_mesh(screen,star,cam_x,cam_y,cam_z,cam_yaw,cam_pitch,cx,cy))
             for coin in current_level_coins:
                 if not coin.collected:
+                    coin.yaw += 0.08
                     all_polys.extend(render_mesh(screen,coin,cam_x,cam_y,cam_z,cam_yaw,cam_pitch,cx,cy))
 
             all_polys.sort(key=lambda x:x['depth'],reverse=True)
@@ -1719,7 +1837,7 @@ def main():
             draw_hud()
             draw_level_intro()
 
-            hint = "E: Enter Door/Painting" if current_level_id and "castle" in current_level_id else "E: Exit Level" if current_level_id else ""
+            hint = f"E: Enter {warp_hint}" if warp_hint else "E: Enter Door/Painting" if current_level_id and "castle" in current_level_id else "E: Exit Level" if current_level_id else ""
             if hint:
                 screen.blit(font_small.render(hint,True,YELLOW),(WIDTH//2-60,8))
 
@@ -1742,5 +1860,90 @@ def main():
     pygame.quit()
     sys.exit()
 
+# =====================================================================
+# SELF-TEST / BENCHMARK (--selftest, --bench)
+# =====================================================================
+def _coin_field(n, seed):
+    rng = random.Random(seed)
+    return [Coin(rng.uniform(-3000, 3000), rng.uniform(0, 60), rng.uniform(-3000, 3000)) for _ in range(n)]
+
+def _walk_path(ticks, seed):
+    rng = random.Random(seed)
+    x = z = 0.0; heading = 0.0; path = []
+    for _ in range(ticks):
+        heading += rng.uniform(-0.2, 0.2)
+        x = max(-3000, min(3000, x + math.cos(heading) * MAX_SPEED))
+        z = max(-3000, min(3000, z + math.sin(heading) * MAX_SPEED))
+        path.append((x, rng.uniform(0, 60), z))
+    return path
+
+def selftest_triggers(coins=3000, ticks=3000):
+    """Grid pickups match the old per-frame distance loop on a dense coin field"""
+    path = _walk_path(ticks, 7)
+    ref_coins = _coin_field(coins, 3)
+    ref = []
+    for tick, (x, y, z) in enumerate(path):
+        for i, coin in enumerate(ref_coins):
+            if not coin.collected:
+                dx = x - coin.x; dy = y - coin.y; dz = z - coin.z
+                if math.sqrt(dx*dx + dy*dy + dz*dz) < COIN_RADIUS:
+                    coin.collected = True
+                    ref.append((tick, i))
+    grid_coins = _coin_field(coins, 3)
+    index = {id(c): i for i, c in enumerate(grid_coins)}
+    got = []
+    tick = 0
+    def on_coin(t):
+        t.payload.collected = True
+        got.append((tick, index[id(t.payload)]))
+        grid.remove(t)
+    grid = build_level_triggers([], grid_coins, None, on_coin)
+    for tick, (x, y, z) in enumerate(path):
+        grid.update(x, y, z)
+    assert sorted(got) == sorted(ref) and ref, (len(got), len(ref))
+    # Removed coins leave no trace in the grid
+    live = {t.payload for b in grid.cells.values() for t in b}
+    assert all(not c.collected for c in live)
+
+    # Painting boxes: one enter on approach, one exit on leaving, first painting wins overlaps
+    events = []
+    warps = build_warp_triggers(CASTLE_F1_PAINTINGS,
+                                lambda t: events.append(("enter", t.payload["level"])),
+                                lambda t: events.append(("exit", t.payload["level"])))
+    for x, z in [(0, 0), (-900, -300), (-880, -310), (-900, -400), (-900, -900), (0, 0)]:
+        warps.update(x, 50, z)
+        if (x, z) == (-900, -400):
+            assert [t.payload["level"] for t in warps.active()] == ["c01_bob", "c02_whomp"]
+    assert events == [("enter", "c01_bob"), ("enter", "c02_whomp"), ("exit", "c01_bob"),
+                      ("exit", "c02_whomp")], events
+    print(f"trigger selftest ok ({len(ref)} pickups over {ticks} ticks, {coins} coins)")
+
+def benchmark_triggers(coins=5000, ticks=600):
+    """Per-tick pickup cost: distance loop over every coin vs the trigger grid"""
+    path = _walk_path(ticks, 7)
+    field = _coin_field(coins, 3)
+    start = time.perf_counter()
+    for x, y, z in path:
+        for coin in field:
+            if not coin.collected:
+                dx = x - coin.x; dy = y - coin.y; dz = z - coin.z
+                if math.sqrt(dx*dx + dy*dy + dz*dz) < COIN_RADIUS:
+                    coin.collected = True
+    brute = (time.perf_counter() - start) * 1e6 / ticks
+    field = _coin_field(coins, 3)
+    def on_coin(t):
+        t.payload.collected = True
+        grid.remove(t)
+    start = time.perf_counter()
+    grid = build_level_triggers([], field, None, on_coin)
+    build_ms = (time.perf_counter() - start) * 1000
+    start = time.perf_counter()
+    for x, y, z in path:
+        grid.update(x, y, z)
+    fast = (time.perf_counter() - start) * 1e6 / ticks
+    print(f"triggers: {coins} coins  loop {brute:.1f} us/tick  grid {fast:.2f} us/tick  (grid build {build_ms:.1f} ms)")
+
 if __name__ == "__main__":
-    main()
+    if "--selftest" in sys.argv: selftest_triggers()
+    elif "--bench" in sys.argv: benchmark_triggers()
+    else: main()
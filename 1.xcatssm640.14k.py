@@ -2,6 +2,7 @@ import pygame
 import math
 import sys
 import random
+import time
 
 # --- CONFIGURATION ---
 WIDTH, HEIGHT = 800, 600
@@ -16,6 +17,16 @@ PITCH_MIN = -1.5
 PITCH_MAX = 1.5
 EYE_HEIGHT = 160  # Mario's eye height approx
 
+# Collision
+COLLISION_CELL = 256      # XZ grid cell size for the collision world
+FLOOR_NORMAL_Y = 0.3      # Faces with ny above this are walkable floors
+
+# Timestep
+PHYSICS_HZ = 60           # Fixed simulation rate; physics constants are per tick
+PHYSICS_DT = 1.0 / PHYSICS_HZ
+MAX_CATCHUP_STEPS = 5     # Ticks per frame before the backlog is dropped
+SUBSTEP_MAX_TRAVEL = 5.0  # Half the thinnest slab the builders emit (10)
+
 # Physics
 MAX_RUN_SPEED = 32.0
 RUN_ACCEL = 2.0
@@ -52,6 +63,7 @@ TTM_ROCK = (128, 120, 104); TTM_MUSH = (200, 40, 40)
 THI_GRASS = (0, 168, 0); THI_WATER = (24, 88, 200)
 TTC_WOOD = (168, 120, 56); TTC_GOLD = (200, 180, 50)
 RR_CLOUD = (240, 240, 255); RR_RAINBOW = [(255,0,0),(255,165,0),(255,255,0),(0,255,0),(0,0,255),(75,0,130)]
+BDW_STONE = (80, 64, 80); BFS_METAL = (128, 136, 144)
 
 # Universal
 WHITE=(255,255,255); BLACK=(0,0,0); RED=(220,20,60); 
@@ -83,6 +95,13 @@ class Mesh:
     def __init__(self):
         self.vertices = []
         self.faces = []
+        self.bodies = []
+
+    def add_body(self, body_mesh, path):
+        """Moving collision object: body_mesh is in local space, path(tick) -> (x, y, z, yaw)"""
+        body = DynamicBody(body_mesh, path)
+        self.bodies.append(body)
+        return body
 
     def add_vert(self, x, y, z):
         self.vertices.append(Vector3(x, y, z))
@@ -161,6 +180,248 @@ class Mesh:
             self.add_face([base_verts[i], base_verts[j], tip], color)
         self.add_face(base_verts, color)
 
+    def add_pyramid(self, bw, h, ox, oy, oz, color):
+        hw = bw/2
+        tip = self.add_vert(ox, oy+h, oz)
+        base_verts = [self.add_vert(ox+hw, oy, oz-hw), self.add_vert(ox+hw, oy, oz+hw),
+                      self.add_vert(ox-hw, oy, oz+hw), self.add_vert(ox-hw, oy, oz-hw)]
+        for i in range(4):
+            self.add_face([base_verts[i], base_verts[(i+1)%4], tip], color)
+        self.add_face(base_verts, color)
+
+# =====================================================================
+# COLLISION WORLD
+# =====================================================================
+
+class CollisionFace:
+    __slots__ = ['face','nx','ny','nz','x0','y0','z0','min_x','max_x','min_z','max_z']
+    def __init__(self, face, vs):
+        self.face = face
+        self.nx, self.ny, self.nz = face.normal
+        # Plane through the first vertex (same reference point the renderer uses)
+        self.x0, self.y0, self.z0 = vs[0].x, vs[0].y, vs[0].z
+        # XZ bounds, padded like the original ground probe
+        self.min_x = min(v.x for v in vs) - 10
+        self.max_x = max(v.x for v in vs) + 10
+        self.min_z = min(v.z for v in vs) - 10
+        self.max_z = max(v.z for v in vs) + 10
+
+    def height_at(self, x, z):
+        return self.y0 - (self.nx*(x-self.x0) + self.nz*(z-self.z0))/self.ny
+
+def linear_path(a, b, period, phase=0.0):
+    """Eases back and forth between points a and b every period ticks"""
+    def path(tick):
+        s = 0.5 - 0.5 * math.cos(2 * math.pi * (tick / period + phase))
+        return (a[0] + (b[0]-a[0])*s, a[1] + (b[1]-a[1])*s, a[2] + (b[2]-a[2])*s, 0.0)
+    return path
+
+def spin_path(origin, speed, phase=0.0):
+    """Turns about the Y axis through origin at speed radians per tick"""
+    def path(tick):
+        return (origin[0], origin[1], origin[2], phase + speed * tick)
+    return path
+
+class DynamicBody:
+    """Local-space collision mesh carried by a scripted transform (translation + yaw).
+
+    Floors are kept in local space; queries move the probe into the body's
+    frame instead of re-deriving world faces every tick.
+    """
+    def __init__(self, mesh, path):
+        self.mesh = mesh
+        self.path = path
+        self.floors = []
+        for f in mesh.faces:
+            if f.normal[1] > FLOOR_NORMAL_Y:
+                self.floors.append(CollisionFace(f, [mesh.vertices[i] for i in f.indices]))
+        # XZ bounding circle about the local origin around every padded floor rect
+        self.radius = max((math.hypot(max(-cf.min_x, cf.max_x), max(-cf.min_z, cf.max_z))
+                           for cf in self.floors), default=0)
+        self.cells = None
+        self.set_tick(0)
+        self.prev = self.pose
+
+    def set_tick(self, tick):
+        self.prev = getattr(self, 'pose', None)
+        self.pose = self.path(tick)
+
+    def aabb(self):
+        x, _, z, _ = self.pose
+        r = self.radius
+        return x - r, z - r, x + r, z + r
+
+    def floor_at(self, x, y, z, default):
+        """Highest floor of this body at world (x, z) no more than 30 units above y"""
+        bx, by, bz, yaw = self.pose
+        c, s = math.cos(yaw), math.sin(yaw)
+        dx, dz = x - bx, z - bz
+        lx, lz = dx*c + dz*s, -dx*s + dz*c
+        ground_y = default
+        for cf in self.floors:
+            if cf.min_x <= lx <= cf.max_x and cf.min_z <= lz <= cf.max_z:
+                h = cf.height_at(lx, lz) + by
+                if h > ground_y and h <= y + 30:
+                    ground_y = h
+        return ground_y
+
+    def carry(self, x, y, z):
+        """Where a point riding the body at its previous pose ends up now"""
+        px, py, pz, pyaw = self.prev
+        bx, by, bz, yaw = self.pose
+        dx, dz = x - px, z - pz
+        rot = yaw - pyaw
+        c, s = math.cos(rot), math.sin(rot)
+        return bx + dx*c - dz*s, y + by - py, bz + dx*s + dz*c
+
+    def world_vertices(self, alpha=1.0):
+        bx, by, bz, yaw = (p + (c - p) * alpha for p, c in zip(self.prev, self.pose))
+        c, s = math.cos(yaw), math.sin(yaw)
+        return [Vector3(v.x*c - v.z*s + bx, v.y + by, v.x*s + v.z*c + bz) for v in self.mesh.vertices]
+
+class CollisionWorld:
+    """Static collision faces split into floor/wall/ceiling and bucketed in an XZ grid.
+
+    Built once per level load; floor queries only visit the faces in one cell.
+    Dynamic bodies live in their own grid, updated incrementally each tick.
+    """
+    def __init__(self, mesh, cell=COLLISION_CELL):
+        self.cell = cell
+        self.bodies = list(mesh.bodies)
+        self.body_grid = {}
+        self.cell_updates = 0
+        self.floors, self.walls, self.ceilings = [], [], []
+        self.floor_grid = {}
+        self.wall_grid = {}
+        self.ceiling_grid = {}
+        for f in mesh.faces:
+            cf = CollisionFace(f, [mesh.vertices[i] for i in f.indices])
+            if cf.ny > FLOOR_NORMAL_Y:
+                self.floors.append(cf); grid = self.floor_grid
+            elif cf.ny < -FLOOR_NORMAL_Y:
+                self.ceilings.append(cf); grid = self.ceiling_grid
+            else:
+                self.walls.append(cf); grid = self.wall_grid
+            self._insert(grid, cf)
+        self.update_bodies(0)
+
+    def _body_cells(self, body):
+        c = self.cell
+        min_x, min_z, max_x, max_z = body.aabb()
+        return (math.floor(min_x / c), math.floor(min_z / c), math.floor(max_x / c), math.floor(max_z / c))
+
+    def update_bodies(self, tick):
+        """Moves every body to tick; only bodies whose cell range changed touch the grid"""
+        grid = self.body_grid
+        for body in self.bodies:
+            body.set_tick(tick)
+            new = self._body_cells(body)
+            old = body.cells
+            if new == old:
+                continue
+            if old:
+                for gx in range(old[0], old[2] + 1):
+                    for gz in range(old[1], old[3] + 1):
+                        if not (new[0] <= gx <= new[2] and new[1] <= gz <= new[3]):
+                            bucket = grid[(gx, gz)]
+                            del bucket[body]
+                            if not bucket: del grid[(gx, gz)]
+                            self.cell_updates += 1
+            for gx in range(new[0], new[2] + 1):
+                for gz in range(new[1], new[3] + 1):
+                    if not old or not (old[0] <= gx <= old[2] and old[1] <= gz <= old[3]):
+                        grid.setdefault((gx, gz), {})[body] = None  # dict as an ordered set
+                        self.cell_updates += 1
+            body.cells = new
+
+    def find_support(self, x, y, z, default=-2000):
+        """Like find_floor but also over dynamic bodies; returns (height, body or None)"""
+        ground_y = self.find_floor(x, y, z, default)
+        support = None
+        bucket = self.body_grid.get((math.floor(x / self.cell), math.floor(z / self.cell)))
+        if bucket:
+            for body in bucket:
+                h = body.floor_at(x, y, z, ground_y)
+                if h > ground_y:
+                    ground_y, support = h, body
+        return ground_y, support
+
+    def _insert(self, grid, cf):
+        c = self.cell
+        for gx in range(math.floor(cf.min_x / c), math.floor(cf.max_x / c) + 1):
+            for gz in range(math.floor(cf.min_z / c), math.floor(cf.max_z / c) + 1):
+                grid.setdefault((gx, gz), []).append(cf)
+
+    def find_floor(self, x, y, z, default=-2000):
+        """Highest floor at (x, z) that is no more than 30 units above y"""
+        ground_y = default
+        bucket = self.floor_grid.get((math.floor(x / self.cell), math.floor(z / self.cell)))
+        if not bucket:
+            return ground_y
+        for cf in bucket:
+            if cf.min_x <= x <= cf.max_x and cf.min_z <= z <= cf.max_z:
+                h = cf.height_at(x, z)
+                if h > ground_y and h <= y + 30:
+                    ground_y = h
+        return ground_y
+
+def find_support_brute(mesh, x, y, z, default=-2000):
+    """Reference for find_support: every static face, then every body"""
+    ground_y = find_floor_brute(mesh, x, y, z, default)
+    support = None
+    for body in mesh.bodies:
+        h = body.floor_at(x, y, z, ground_y)
+        if h > ground_y:
+            ground_y, support = h, body
+    return ground_y, support
+
+def find_floor_brute(mesh, x, y, z, default=-2000):
+    """Reference floor probe: scans every face in the mesh"""
+    ground_y = default
+    for f in mesh.faces:
+        # Simple point-in-rect XZ check for ground
+        vs = [mesh.vertices[i] for i in f.indices]
+        min_x = min(v.x for v in vs) - 10
+        max_x = max(v.x for v in vs) + 10
+        min_z = min(v.z for v in vs) - 10
+        max_z = max(v.z for v in vs) + 10
+
+        if min_x <= x <= max_x and min_z <= z <= max_z:
+            # Plane Y at X,Z
+            nx, ny, nz = f.normal
+            if ny > FLOOR_NORMAL_Y: # Walkable
+                # Plane eq: nx(x-v0x) + ny(y-v0y) + nz(z-v0z) = 0
+                # y = v0y - (nx(x-v0x) + nz(z-v0z))/ny
+                v0 = vs[0]
+                h = v0.y - (nx*(x-v0.x) + nz*(z-v0.z))/ny
+                if h > ground_y and h <= y + 30:
+                    ground_y = h
+    return ground_y
+
+class FixedTimestep:
+    """Accumulates real time and hands out whole fixed-size simulation ticks.
+
+    alpha is how far the leftover time reaches into the next tick, for
+    interpolating between the last two simulated states.
+    """
+    def __init__(self, dt=PHYSICS_DT, max_steps=MAX_CATCHUP_STEPS):
+        self.dt = dt
+        self.max_steps = max_steps
+        self.accumulator = 0.0
+        self.alpha = 0.0
+
+    def advance(self, elapsed):
+        """Returns the number of ticks to run for elapsed seconds of real time"""
+        self.accumulator += elapsed
+        steps = int(self.accumulator / self.dt)
+        self.accumulator -= steps * self.dt
+        if steps > self.max_steps:
+            # Spiral of death guard: run slow rather than never catching up
+            steps = self.max_steps
+            self.accumulator = 0.0
+        self.alpha = self.accumulator / self.dt
+        return steps
+
 # =====================================================================
 # 1:1 LEVEL BUILDERS
 # =====================================================================
@@ -399,8 +660,16 @@ def b_ttc():
     # Gears
     for i in range(10):
         h = i * 200
-        m.add_cylinder(200, 20, 0, h, 0, TTC_GOLD)
-        m.add_cube(150, 10, 400, 0, h+50, 0, TTC_GOLD) # Hands
+        cog = Mesh()
+        cog.add_cylinder(200, 20, 0, 0, 0, TTC_GOLD)
+        m.add_body(cog, spin_path((0, h, 0), 0.01 * (1 if i % 2 else -1)))
+        hand = Mesh()
+        hand.add_cube(150, 10, 400, 0, 0, 0, TTC_GOLD) # Hands
+        m.add_body(hand, spin_path((0, h+50, 0), 0.02, phase=i))
+    # Elevator up the side of the gear stack
+    lift = Mesh()
+    lift.add_cube(150, 20, 150, 0, 0, 0, TTC_WOOD)
+    m.add_body(lift, linear_path((350, 0, 0), (350, 1800, 0), 600))
     return m
 
 def b_rr():
@@ -410,6 +679,11 @@ def b_rr():
         x = i * 100
         y = math.sin(i*0.2) * 200 + 500
         m.add_cube(100, 10, 50, x, y, 0, RR_RAINBOW[i%6])
+    # Ferry platforms between the carpet and the cruiser
+    for i in range(3):
+        ferry = Mesh()
+        ferry.add_cube(150, 20, 150, 0, 0, 0, RR_RAINBOW[i*2])
+        m.add_body(ferry, linear_path((2000, 600 + i*60, -200), (2000, 800, -800), 360, phase=i/3))
     # Cruiser
     m.add_cube(600, 100, 300, 2000, 800, -1000, (150, 150, 255))
     # Big House
@@ -471,6 +745,53 @@ def b_wmotr():
         m.add_cube(200, 20, 200, i*300, i*100, 0, RR_CLOUD)
     return m
 
+def b_stress():
+    """200 moving platforms over a flat floor (broadphase stress test)"""
+    m = Mesh()
+    m.add_cube(6000, 20, 3000, 0, -20, 0, GREY)
+    rng = random.Random(200)
+    for i in range(200):
+        x, z = (i % 20) * 300 - 2850, (i // 20) * 300 - 1350
+        y = 100 + rng.uniform(0, 300)
+        plat = Mesh()
+        plat.add_cube(150, 20, 150, 0, 0, 0, RR_RAINBOW[i % 6])
+        if i % 3 == 0:
+            path = linear_path((x, y, z), (x + rng.uniform(-600, 600), y, z + rng.uniform(-600, 600)), rng.randint(120, 480), rng.random())
+        elif i % 3 == 1:
+            path = linear_path((x, y, z), (x, y + 400, z), rng.randint(120, 480), rng.random())  # Elevator
+        else:
+            path = spin_path((x, y, z), rng.uniform(-0.05, 0.05))  # Cog
+        m.add_body(plat, path)
+    return m
+
+LEVELS = {
+    pygame.K_1: ("Bob-omb Battlefield", b_bob, "default"),
+    pygame.K_2: ("Whomp's Fortress", b_wf, "default"),
+    pygame.K_3: ("Jolly Roger Bay", b_jrb, "water"),
+    pygame.K_4: ("Cool Cool Mountain", b_ccm, "default"),
+    pygame.K_5: ("Big Boo's Haunt", b_bbh, "dark"),
+    pygame.K_6: ("Hazy Maze Cave", b_hmc, "dark"),
+    pygame.K_7: ("Lethal Lava Land", b_lll, "fire"),
+    pygame.K_8: ("Shifting Sand Land", b_ssl, "default"),
+    pygame.K_9: ("Dire Dire Docks", b_ddd, "water"),
+    pygame.K_0: ("Snowman's Land", b_sl, "default"),
+    pygame.K_MINUS: ("Wet-Dry World", b_wdw, "default"),
+    pygame.K_EQUALS: ("Tall Tall Mountain", b_ttm, "default"),
+    pygame.K_q: ("Tiny-Huge Island", b_thi, "default"),
+    pygame.K_w: ("Tick Tock Clock", b_ttc, "default"),
+    pygame.K_e: ("Rainbow Ride", b_rr, "default"),
+    pygame.K_r: ("Castle Grounds", b_castle, "default"),
+    pygame.K_t: ("Bowser 1", b_bitdw, "dark"),
+    pygame.K_y: ("Bowser 2", b_bitfs, "fire"),
+    pygame.K_u: ("Bowser 3", b_bits, "dark"),
+    pygame.K_F1: ("Princess Slide", b_pss, "default"),
+    pygame.K_F2: ("Metal Cap", b_cotmc, "dark"),
+    pygame.K_F3: ("Wing Cap", b_totwc, "default"),
+    pygame.K_F4: ("Vanish Cap", b_vcutm, "dark"),
+    pygame.K_F5: ("Wing Mario Rainbow", b_wmotr, "default"),
+    pygame.K_F6: ("Platform Stress", b_stress, "default")
+}
+
 # =====================================================================
 # GAME CLASS
 # =====================================================================
@@ -483,34 +804,10 @@ class Game:
         self.clock = pygame.time.Clock()
         self.font = pygame.font.SysFont('Arial', 16)
         
-        self.levels = {
-            pygame.K_1: ("Bob-omb Battlefield", b_bob, "default"),
-            pygame.K_2: ("Whomp's Fortress", b_wf, "default"),
-            pygame.K_3: ("Jolly Roger Bay", b_jrb, "water"),
-            pygame.K_4: ("Cool Cool Mountain", b_ccm, "default"),
-            pygame.K_5: ("Big Boo's Haunt", b_bbh, "dark"),
-            pygame.K_6: ("Hazy Maze Cave", b_hmc, "dark"),
-            pygame.K_7: ("Lethal Lava Land", b_lll, "fire"),
-            pygame.K_8: ("Shifting Sand Land", b_ssl, "default"),
-            pygame.K_9: ("Dire Dire Docks", b_ddd, "water"),
-            pygame.K_0: ("Snowman's Land", b_sl, "default"),
-            pygame.K_MINUS: ("Wet-Dry World", b_wdw, "default"),
-            pygame.K_EQUALS: ("Tall Tall Mountain", b_ttm, "default"),
-            pygame.K_q: ("Tiny-Huge Island", b_thi, "default"),
-            pygame.K_w: ("Tick Tock Clock", b_ttc, "default"),
-            pygame.K_e: ("Rainbow Ride", b_rr, "default"),
-            pygame.K_r: ("Castle Grounds", b_castle, "default"),
-            pygame.K_t: ("Bowser 1", b_bitdw, "dark"),
-            pygame.K_y: ("Bowser 2", b_bitfs, "fire"),
-            pygame.K_u: ("Bowser 3", b_bits, "dark"),
-            pygame.K_F1: ("Princess Slide", b_pss, "default"),
-            pygame.K_F2: ("Metal Cap", b_cotmc, "dark"),
-            pygame.K_F3: ("Wing Cap", b_totwc, "default"),
-            pygame.K_F4: ("Vanish Cap", b_vcutm, "dark"),
-            pygame.K_F5: ("Wing Mario Rainbow", b_wmotr, "default")
-        }
+        self.levels = LEVELS
         
         self.pos = [0, 500, 1000]
+        self.prev_pos = list(self.pos)
         self.vel = [0, 0, 0]
         self.yaw = 0
         self.pitch = 0
@@ -522,17 +819,37 @@ class Game:
 
     def load_level(self, builder, sky):
         self.mesh = builder()
+        self.collision = CollisionWorld(self.mesh)
         self.sky_colors = SM64_SKIES.get(sky, SM64_SKIES["default"])
         self.pos = [0, 500, 800]
+        self.prev_pos = list(self.pos)
         self.vel = [0, 0, 0]
+        self.tick = 0
+        self.ground_body = None
+        self.platform_vel = (0, 0, 0)
 
-    def physics(self, dt):
-        keys = pygame.key.get_pressed()
-        
-        # Mouse
+    def look(self):
+        # Mouse look is per rendered frame; physics only reads the yaw
         mx, my = pygame.mouse.get_rel()
         self.yaw += mx * MOUSE_SENS_X
         self.pitch = max(PITCH_MIN, min(PITCH_MAX, self.pitch - my * MOUSE_SENS_Y))
+
+    def step(self, keys):
+        """One fixed PHYSICS_DT tick, remembering the previous state for interpolation"""
+        self.prev_pos = list(self.pos)
+        self.tick += 1
+        self.collision.update_bodies(self.tick)
+        # Ride whatever we were standing on
+        self.platform_vel = (0, 0, 0)
+        if self.ground_body is not None:
+            x, y, z = self.ground_body.carry(*self.pos)
+            self.platform_vel = (x - self.pos[0], y - self.pos[1], z - self.pos[2])
+            self.pos = [x, y, z]
+        self.physics(1, keys)
+
+    def physics(self, dt, keys=None):
+        if keys is None:
+            keys = pygame.key.get_pressed()
         
         # Input Vectors
         fd, sd = 0, 0
@@ -573,9 +890,11 @@ class Game:
                     self.vel[0] *= RUN_DECEL
                     self.vel[2] *= RUN_DECEL
                 
-                # Jump
+                # Jump (keeps the platform's momentum)
                 if keys[pygame.K_SPACE]:
-                    self.vel[1] = JUMP_FORCE
+                    self.vel[0] += self.platform_vel[0]
+                    self.vel[1] = JUMP_FORCE + max(0, self.platform_vel[1])
+                    self.vel[2] += self.platform_vel[2]
                     self.state = "air"
             else:
                 # Air control
@@ -591,44 +910,34 @@ class Game:
             self.vel[0] *= scale
             self.vel[2] *= scale
 
-        # Integration
-        self.pos[0] += self.vel[0]
-        self.pos[1] += self.vel[1]
-        self.pos[2] += self.vel[2]
-        
-        # Collision (Ground)
-        ground_y = -2000
-        for f in self.mesh.faces:
-            # Simple point-in-rect XZ check for ground
-            vs = [self.mesh.vertices[i] for i in f.indices]
-            min_x = min(v.x for v in vs) - 10
-            max_x = max(v.x for v in vs) + 10
-            min_z = min(v.z for v in vs) - 10
-            max_z = max(v.z for v in vs) + 10
+        # Integration, split so no sub-step travels past a thin floor
+        travel = max(abs(self.vel[0]), abs(self.vel[1]), abs(self.vel[2])) * dt
+        substeps = max(1, math.ceil(travel / SUBSTEP_MAX_TRAVEL))
+        self.ground_body = None
+        for _ in range(substeps):
+            self.pos[0] += self.vel[0] * dt / substeps
+            self.pos[1] += self.vel[1] * dt / substeps
+            self.pos[2] += self.vel[2] * dt / substeps
             
-            if min_x <= self.pos[0] <= max_x and min_z <= self.pos[2] <= max_z:
-                # Plane Y at X,Z
-                nx, ny, nz = f.normal
-                if ny > 0.3: # Walkable
-                    # Plane eq: nx(x-v0x) + ny(y-v0y) + nz(z-v0z) = 0
-                    # y = v0y - (nx(x-v0x) + nz(z-v0z))/ny
-                    v0 = vs[0]
-                    h = v0.y - (nx*(self.pos[0]-v0.x) + nz*(self.pos[2]-v0.z))/ny
-                    if h > ground_y and h <= self.pos[1] + 30:
-                        ground_y = h
-        
-        if self.pos[1] <= ground_y + EYE_HEIGHT and self.vel[1] <= 0:
-            self.pos[1] = ground_y + EYE_HEIGHT
-            self.vel[1] = 0
-            self.state = "ground"
-        elif not is_water:
-            self.state = "air"
+            # Collision (Ground)
+            ground_y, body = self.collision.find_support(self.pos[0], self.pos[1], self.pos[2])
             
-        if self.pos[1] < -3000: # Void
-            self.pos = [0, 1000, 0]
-            self.vel = [0, 0, 0]
+            if self.pos[1] <= ground_y + EYE_HEIGHT and self.vel[1] <= 0:
+                self.pos[1] = ground_y + EYE_HEIGHT
+                self.vel[1] = 0
+                self.state = "ground"
+                self.ground_body = body
+            elif not is_water:
+                self.state = "air"
+                self.ground_body = None
+                
+            if self.pos[1] < -3000: # Void
+                self.pos = [0, 1000, 0]
+                self.prev_pos = list(self.pos)
+                self.vel = [0, 0, 0]
+                break
 
-    def render(self):
+    def render(self, alpha=1.0):
         # Sky
         c1, c2 = self.sky_colors
         for y in range(HEIGHT):
@@ -636,59 +945,63 @@ class Game:
             c = (c1[0]*(1-t)+c2[0]*t, c1[1]*(1-t)+c2[1]*t, c1[2]*(1-t)+c2[2]*t)
             pygame.draw.line(self.screen, c, (0,y), (WIDTH,y))
 
-        # 3D
-        cx, cy, cz = self.pos
+        # 3D (camera between the last two ticks)
+        cx, cy, cz = (p + (c - p) * alpha for p, c in zip(self.prev_pos, self.pos))
         cy -= 20 # Camera slightly below hitbox top
         cos_y, sin_y = math.cos(self.yaw), math.sin(self.yaw)
         cos_p, sin_p = math.cos(self.pitch), math.sin(self.pitch)
         
         faces = []
         
-        # Transform all verts once
-        t_verts = []
-        for v in self.mesh.vertices:
-            dx, dy, dz = v.x - cx, v.y - cy, v.z - cz
+        # Static level plus the dynamic bodies at their interpolated poses
+        sources = [(self.mesh.vertices, self.mesh.faces)]
+        sources += [(b.world_vertices(alpha), b.mesh.faces) for b in self.collision.bodies]
+        for verts, mesh_faces in sources:
+            # Transform all verts once
+            t_verts = []
+            for v in verts:
+                dx, dy, dz = v.x - cx, v.y - cy, v.z - cz
             
-            # Yaw
-            rx = dx*cos_y - dz*sin_y
-            rz = dx*sin_y + dz*cos_y
+                # Yaw
+                rx = dx*cos_y - dz*sin_y
+                rz = dx*sin_y + dz*cos_y
             
-            # Pitch
-            ry = dy*cos_p - rz*sin_p
-            rz = dy*sin_p + rz*cos_p
+                # Pitch
+                ry = dy*cos_p - rz*sin_p
+                rz = dy*sin_p + rz*cos_p
             
-            t_verts.append((rx, ry, rz))
+                t_verts.append((rx, ry, rz))
             
-        for f in self.mesh.faces:
-            # Backface Cull
-            # Use precomputed face normal? No, need view space normal
-            # Approx: Check center Z
-            vs = [t_verts[i] for i in f.indices]
+            for f in mesh_faces:
+                # Backface Cull
+                # Use precomputed face normal? No, need view space normal
+                # Approx: Check center Z
+                vs = [t_verts[i] for i in f.indices]
             
-            # Clipping
-            if any(v[2] < 10 for v in vs): continue
+                # Clipping
+                if any(v[2] < 10 for v in vs): continue
             
-            # Painter sort val
-            avg_z = sum(v[2] for v in vs) / len(vs)
-            if avg_z > VIEW_DISTANCE: continue
+                # Painter sort val
+                avg_z = sum(v[2] for v in vs) / len(vs)
+                if avg_z > VIEW_DISTANCE: continue
             
-            # Normal Check (Simplified)
-            v0, v1, v2 = vs[0], vs[1], vs[2]
-            nx = (v1[1]-v0[1])*(v2[2]-v0[2]) - (v1[2]-v0[2])*(v2[1]-v0[1])
-            ny = (v1[2]-v0[2])*(v2[0]-v0[0]) - (v1[0]-v0[0])*(v2[2]-v0[2])
-            nz = (v1[0]-v0[0])*(v2[1]-v0[1]) - (v1[1]-v0[1])*(v2[0]-v0[0])
+                # Normal Check (Simplified)
+                v0, v1, v2 = vs[0], vs[1], vs[2]
+                nx = (v1[1]-v0[1])*(v2[2]-v0[2]) - (v1[2]-v0[2])*(v2[1]-v0[1])
+                ny = (v1[2]-v0[2])*(v2[0]-v0[0]) - (v1[0]-v0[0])*(v2[2]-v0[2])
+                nz = (v1[0]-v0[0])*(v2[1]-v0[1]) - (v1[1]-v0[1])*(v2[0]-v0[0])
             
-            # View vector is (0,0,0) -> v0, which is just v0
-            if v0[0]*nx + v0[1]*ny + v0[2]*nz >= 0: continue
-
-            # Project
-            pts = []
-            for vx, vy, vz in vs:
-                sx = (vx/vz) * FOV + WIDTH/2
-                sy = (-vy/vz) * FOV + HEIGHT/2
-                pts.append((sx, sy))
+                # View vector is (0,0,0) -> v0, which is just v0
+                if v0[0]*nx + v0[1]*ny + v0[2]*nz >= 0: continue
+
+                # Project
+                pts = []
+                for vx, vy, vz in vs:
+                    sx = (vx/vz) * FOV + WIDTH/2
+                    sy = (-vy/vz) * FOV + HEIGHT/2
+                    pts.append((sx, sy))
                 
-            faces.append((avg_z, pts, f.color))
+                faces.append((avg_z, pts, f.color))
             
         faces.sort(key=lambda x: x[0], reverse=True)
         
@@ -708,6 +1021,8 @@ class Game:
     def run(self):
         self.current_map_name = "Castle Grounds"
         running = True
+        timestep = FixedTimestep()
+        last = time.perf_counter()
         while running:
             for e in pygame.event.get():
                 if e.type == pygame.QUIT: running = False
@@ -718,11 +1033,187 @@ class Game:
                         self.current_map_name = name
                         self.load_level(builder, sky)
             
-            self.physics(1)
-            self.render()
+            self.look()
+            now = time.perf_counter()
+            for _ in range(timestep.advance(now - last)):
+                self.step(pygame.key.get_pressed())
+            last = now
+            self.render(timestep.alpha)
             self.clock.tick(FPS)
         pygame.quit()
         sys.exit()
 
+# =====================================================================
+# SELF-TEST / BENCHMARK (--selftest, --bench)
+# =====================================================================
+
+def _random_probes(mesh, rng, n):
+    xs = [v.x for v in mesh.vertices]; ys = [v.y for v in mesh.vertices]; zs = [v.z for v in mesh.vertices]
+    return [(rng.uniform(min(xs)-200, max(xs)+200), rng.uniform(min(ys)-200, max(ys)+400),
+             rng.uniform(min(zs)-200, max(zs)+200)) for _ in range(n)]
+
+def selftest_collision(samples=2000, seed=64):
+    """Grid floor queries must match the brute-force scan at random points in every level"""
+    rng = random.Random(seed)
+    for name, builder, _ in LEVELS.values():
+        mesh = builder()
+        world = CollisionWorld(mesh)
+        for x, y, z in _random_probes(mesh, rng, samples):
+            fast = world.find_floor(x, y, z)
+            ref = find_floor_brute(mesh, x, y, z)
+            assert fast == ref, f"{name}: floor at {(x, y, z)} grid={fast} brute={ref}"
+        # Face corners sit exactly on padded bounds and cell edges
+        for v in mesh.vertices:
+            assert world.find_floor(v.x, v.y, v.z) == find_floor_brute(mesh, v.x, v.y, v.z), name
+        print(f"{name:<22} ok  floors={len(world.floors)} walls={len(world.walls)} ceilings={len(world.ceilings)}")
+
+def _scripted_keys(tick):
+    """Deterministic input by simulation tick: run, turn, jump, stop"""
+    keys = {pygame.K_w: 40 <= tick < 200, pygame.K_a: 90 <= tick < 130,
+            pygame.K_d: 150 <= tick < 170, pygame.K_s: False,
+            pygame.K_SPACE: tick in (60, 61, 140), pygame.K_LSHIFT: False}
+    return keys
+
+def _simulate(game, render_fps, seconds):
+    """Drives the fixed-timestep scheduler with a fake render clock; returns the per-tick trajectory"""
+    game.load_level(b_bob, "default")
+    game.yaw = game.pitch = 0
+    game.state = "air"
+    timestep = FixedTimestep()
+    trajectory = []
+    for _ in range(round(seconds * render_fps)):
+        for _ in range(timestep.advance(1.0 / render_fps)):
+            game.step(_scripted_keys(len(trajectory)))
+            trajectory.append(tuple(game.pos))
+        # Interpolated camera always lies between the last two ticks
+        for axis in range(3):
+            cam = game.prev_pos[axis] + (game.pos[axis] - game.prev_pos[axis]) * timestep.alpha
+            lo, hi = sorted((game.prev_pos[axis], game.pos[axis]))
+            assert lo - 1e-9 <= cam <= hi + 1e-9
+    return trajectory
+
+def selftest_timestep(seconds=4):
+    """Trajectories must not depend on the render frame rate"""
+    import os
+    os.environ.setdefault("SDL_VIDEODRIVER", "dummy")
+    game = Game()
+    runs = {fps: _simulate(game, fps, seconds) for fps in (20, 30, 60, 144)}
+    ticks = min(len(t) for t in runs.values())
+    assert ticks >= seconds * PHYSICS_HZ - 1, ticks
+    for fps, trajectory in runs.items():
+        assert trajectory[:ticks] == runs[60][:ticks], f"{fps} fps diverged from 60 fps"
+    # Catch-up is capped and the backlog dropped
+    timestep = FixedTimestep()
+    assert timestep.advance(1.0) == MAX_CATCHUP_STEPS and timestep.accumulator == 0.0
+    # A terminal-velocity fall (far more than a slab's thickness per tick) still lands
+    game.load_level(b_bob, "default")
+    x, z = 0, 0
+    floor = game.collision.find_floor(x, 10000, z)
+    game.pos = [x, floor + EYE_HEIGHT + 1000, z]; game.vel = [0, TERMINAL_VELOCITY, 0]
+    for _ in range(30):
+        game.physics(1, _scripted_keys(-1))
+    assert game.pos[1] == floor + EYE_HEIGHT and game.state == "ground", (game.pos, floor)
+    print(f"timestep ok  {ticks} ticks identical at 20/30/60/144 fps")
+    pygame.quit()
+
+def _rebuilt_body_grid(world):
+    grid = {}
+    for body in world.bodies:
+        gx0, gz0, gx1, gz1 = world._body_cells(body)
+        for gx in range(gx0, gx1 + 1):
+            for gz in range(gz0, gz1 + 1):
+                grid.setdefault((gx, gz), set()).add(body)
+    return grid
+
+def selftest_dynamic(samples=300, seed=32):
+    """Incremental body grid must match a rebuild, and support queries the brute scan"""
+    rng = random.Random(seed)
+    for builder in (b_ttc, b_rr, b_stress):
+        mesh = builder()
+        world = CollisionWorld(mesh)
+        for tick in list(range(0, 240, 7)) + [rng.randint(0, 100000) for _ in range(10)]:
+            world.update_bodies(tick)
+            assert {k: set(v) for k, v in world.body_grid.items()} == _rebuilt_body_grid(world), (builder.__name__, tick)
+            probes = []
+            for _ in range(samples):
+                x, y, z, _ = rng.choice(world.bodies).pose
+                probes.append((x + rng.uniform(-150, 150), y + rng.uniform(-50, 200), z + rng.uniform(-150, 150)))
+            for x, y, z in probes:
+                h, body = world.find_support(x, y, z)
+                ref, _ = find_support_brute(mesh, x, y, z)
+                assert h == ref, (builder.__name__, tick, (x, y, z), h, ref)
+                if body is not None:
+                    assert body.floor_at(x, y, z, -2000) == h
+        print(f"{builder.__name__:<10} ok  bodies={len(world.bodies)}")
+
+    # Riding: an elevator and a spinning cog carry Mario and he inherits the motion
+    import os
+    os.environ.setdefault("SDL_VIDEODRIVER", "dummy")
+    game = Game()
+    for name, pick in (("elevator", 1), ("cog", 2)):
+        game.load_level(b_stress, "default")
+        body = game.collision.bodies[pick]
+        bx, by, bz, _ = body.pose
+        game.pos = [bx + 40, body.floor_at(bx + 40, by + 100, bz, -2000) + EYE_HEIGHT, bz]
+        game.physics(1, _scripted_keys(-1))  # Settle onto the platform
+        assert game.ground_body is body, name
+        for _ in range(90):
+            before = body.pose
+            game.step(_scripted_keys(-1))
+            assert game.ground_body is body, (name, game.pos, before, body.pose)
+            assert abs(game.pos[1] - (body.floor_at(game.pos[0], game.pos[1], game.pos[2], -2000) + EYE_HEIGHT)) < 1e-6
+        # Still the same distance from the cog's axis after spinning
+        if name == "cog":
+            assert abs(math.hypot(game.pos[0] - bx, game.pos[2] - bz) - 40) < 1e-6
+    print("riding ok")
+    pygame.quit()
+
+def benchmark_dynamic(ticks=600):
+    """Per-tick broadphase cost on the 200-platform stress level"""
+    mesh = b_stress()
+    world = CollisionWorld(mesh)
+    updates = world.cell_updates
+    t0 = time.perf_counter()
+    for tick in range(1, ticks + 1):
+        world.update_bodies(tick)
+    t1 = time.perf_counter()
+    per_tick_cells = (world.cell_updates - updates) / ticks
+    # Full rebuild of the body grid every tick for comparison
+    for tick in range(1, ticks + 1):
+        world.body_grid = {}
+        for body in world.bodies: body.cells = None
+        world.update_bodies(tick)
+    t2 = time.perf_counter()
+    rng = random.Random(1)
+    probes = [(rng.uniform(-3000, 3000), 300, rng.uniform(-1500, 1500)) for _ in range(2000)]
+    for x, y, z in probes: world.find_support(x, y, z)
+    t3 = time.perf_counter()
+    print(f"{'bodies':<24}{len(world.bodies):>10}")
+    print(f"{'incremental us/tick':<24}{(t1-t0)*1e6/ticks:>10.1f}   ({per_tick_cells:.1f} cell edits/tick)")
+    print(f"{'full rebuild us/tick':<24}{(t2-t1)*1e6/ticks:>10.1f}")
+    print(f"{'find_support us':<24}{(t3-t2)*1e6/len(probes):>10.2f}")
+
+def benchmark_collision(samples=2000, seed=64):
+    rng = random.Random(seed)
+    print(f"{'level':<22}{'faces':>6}{'brute us':>10}{'grid us':>9}")
+    for name, builder, _ in LEVELS.values():
+        mesh = builder()
+        world = CollisionWorld(mesh)
+        probes = _random_probes(mesh, rng, samples)
+        t0 = time.perf_counter()
+        for x, y, z in probes: find_floor_brute(mesh, x, y, z)
+        t1 = time.perf_counter()
+        for x, y, z in probes: world.find_floor(x, y, z)
+        t2 = time.perf_counter()
+        print(f"{name:<22}{len(mesh.faces):>6}{(t1-t0)*1e6/samples:>10.1f}{(t2-t1)*1e6/samples:>9.2f}")
+
 if __name__ == "__main__":
-    Game().run()
+    if "--selftest" in sys.argv:
+        selftest_collision()
+        selftest_timestep()
+        selftest_dynamic()
+    elif "--bench" in sys.argv:
+        benchmark_collision()
+        benchmark_dynamic()
+    else:
+        Game().run()
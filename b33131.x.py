@@ -2,6 +2,12 @@ import pygame
 import math
 import random
 import sys
+import os
+import array
+
+if "--selftest" in sys.argv:
+    os.environ.setdefault("SDL_VIDEODRIVER", "dummy")
+    os.environ.setdefault("SDL_AUDIODRIVER", "dummy")
 
 # --- CONFIGURATION ---
 WIDTH, HEIGHT = 800, 600
@@ -12,6 +18,8 @@ MOVE_SPEED = 0.3
 SPRINT_SPEED = 0.6
 RENDER_DISTANCE = 150
 MAX_POLY_COUNT = 2000
+HEIGHTFIELD_CELL = 0.25      # World units per floor-height cell
+HEIGHTFIELD_DEFAULT = -2.0   # Floor height of cells no face covers
 
 # --- COLORS ---
 SKY_BLUE = (135, 206, 235)
@@ -46,6 +54,7 @@ class Face:
         self.vertices = vertices # List of Vector3
         self.color = color
         self.dist = 0.0 # Distance to camera for sorting
+        self.floor = None # Walkable: height walked at above this face
 
     def update_dist(self, cam_pos):
         # Calculate centroid distance for depth sorting
@@ -93,8 +102,8 @@ def project(v, cam):
 
     return (screen_x, screen_y)
 
-def create_cube(x, y, z, w, h, d, color):
-    """Generates faces for a cube/box."""
+def create_cube(x, y, z, w, h, d, color, floor=None):
+    """Generates faces for a cube/box; floor tags the top as walkable, raised by that much."""
     hw, hh, hd = w/2, h/2, d/2
     # Vertices
     v = [
@@ -113,6 +122,8 @@ def create_cube(x, y, z, w, h, d, color):
     for idx_list in indices:
         face_verts = [v[i] for i in idx_list]
         faces.append(Face(face_verts, color))
+    if floor is not None:
+        faces[4].floor = floor
     return faces
 
 def create_pyramid(x, y, z, r, h, color):
@@ -158,6 +169,106 @@ def create_prism(x, y, z, r, h, sides, color):
     
     return faces
 
+class HeightField:
+    """Max-height grid baked from the XZ footprint of every non-vertical face,
+    each raised by its floor offset.
+
+    Heights are stored per cell center in a flat row-major array, so a floor
+    lookup is a bilinear sample of four cells no matter how much geometry
+    the world has.
+    """
+    def __init__(self, faces, cell=HEIGHTFIELD_CELL, default=HEIGHTFIELD_DEFAULT):
+        self.cell = cell
+        self.default = default
+        xs = [v.x for f in faces for v in f.vertices]
+        zs = [v.z for f in faces for v in f.vertices]
+        self.x0 = min(xs) if xs else 0.0
+        self.z0 = min(zs) if zs else 0.0
+        self.w = max(1, int(math.ceil((max(xs) - self.x0) / cell))) if xs else 1
+        self.h = max(1, int(math.ceil((max(zs) - self.z0) / cell))) if zs else 1
+        self.heights = array.array('d', [default]) * (self.w * self.h)
+        for face in faces:
+            self.rasterize(face)
+
+    def rasterize(self, face):
+        vs = face.vertices
+        # Newell normal (works for any planar polygon winding)
+        nx = ny = nz = 0.0
+        for i in range(len(vs)):
+            a = vs[i]; b = vs[(i + 1) % len(vs)]
+            nx += (a.y - b.y) * (a.z + b.z)
+            ny += (a.z - b.z) * (a.x + b.x)
+            nz += (a.x - b.x) * (a.y + b.y)
+        if abs(ny) < 1e-9:
+            return  # Vertical wall: no floor footprint
+        p = vs[0]
+        lift = face.floor or 0.0
+        cell = self.cell
+        z_min = min(v.z for v in vs); z_max = max(v.z for v in vs)
+        row_lo = max(0, int(math.ceil((z_min - self.z0) / cell - 0.5)))
+        row_hi = min(self.h - 1, int(math.floor((z_max - self.z0) / cell - 0.5)))
+        heights = self.heights
+        for row in range(row_lo, row_hi + 1):
+            zc = self.z0 + (row + 0.5) * cell
+            # Convex polygon: span between the edge crossings on this row
+            xs = []
+            for i in range(len(vs)):
+                a = vs[i]; b = vs[(i + 1) % len(vs)]
+                if (a.z <= zc <= b.z or b.z <= zc <= a.z) and a.z != b.z:
+                    xs.append(a.x + (zc - a.z) * (b.x - a.x) / (b.z - a.z))
+            if not xs:
+                continue
+            col_lo = max(0, int(math.ceil((min(xs) - self.x0) / cell - 0.5)))
+            col_hi = min(self.w - 1, int(math.floor((max(xs) - self.x0) / cell - 0.5)))
+            if col_hi < col_lo:
+                continue
+            base = row * self.w
+            h_row = p.y + lift - (nz * (zc - p.z)) / ny
+            if nx == 0:
+                # Level along x: one height for the whole span
+                heights[base + col_lo:base + col_hi + 1] = array.array(
+                    'd', map(max, heights[base + col_lo:base + col_hi + 1], [h_row] * (col_hi - col_lo + 1)))
+            else:
+                for col in range(col_lo, col_hi + 1):
+                    xc = self.x0 + (col + 0.5) * cell
+                    hv = h_row - nx * (xc - p.x) / ny
+                    if hv > heights[base + col]:
+                        heights[base + col] = hv
+
+    def sample(self, x, z):
+        """Bilinear floor height at (x, z); past the edge the border cells extend"""
+        fx = (x - self.x0) / self.cell - 0.5
+        fz = (z - self.z0) / self.cell - 0.5
+        ix = int(math.floor(fx)); iz = int(math.floor(fz))
+        tx = fx - ix; tz = fz - iz
+        x1 = min(self.w - 1, max(0, ix + 1)); z1 = min(self.h - 1, max(0, iz + 1))
+        ix = min(self.w - 1, max(0, ix)); iz = min(self.h - 1, max(0, iz))
+        hs = self.heights; w = self.w
+        top = hs[iz*w + ix] + (hs[iz*w + x1] - hs[iz*w + ix]) * tx
+        bot = hs[z1*w + ix] + (hs[z1*w + x1] - hs[z1*w + ix]) * tx
+        return top + (bot - top) * tz
+
+def legacy_floor_height(x, z):
+    """The old hand-written floor chain, kept as the bake's reference"""
+    # Bridge
+    if z < -2 and abs(x) < 6:
+        return 0.5
+    elif z > 0 and abs(x) < 20:
+        return 0.1 # Lobby
+    else:
+        return -2.0 # Water/Grass level
+
+_baked_floors = {}
+
+def bake_floors(faces):
+    """HeightField of the walkable faces, baked once per distinct floor layout"""
+    floors = [f for f in faces if f.floor is not None]
+    key = tuple((f.floor,) + tuple((v.x, v.y, v.z) for v in f.vertices) for f in floors)
+    field = _baked_floors.get(key)
+    if field is None:
+        field = _baked_floors[key] = HeightField(floors)
+    return field
+
 # --- GAME STATE ---
 
 class Game:
@@ -200,15 +311,15 @@ class Game:
         self.geometry = []
         
         # 1. GROUND & WATER
-        # Huge grass plane (simulated by large rect)
-        self.geometry.extend(create_cube(0, -3, 0, 200, 1, 200, GRASS_GREEN))
+        # Huge grass plane (simulated by large rect), waded half a unit above its top
+        self.geometry.extend(create_cube(0, -3, 0, 200, 1, 200, GRASS_GREEN, floor=0.5))
         
         # Water Plane
         self.water_faces = create_cube(0, -1.5, 0, 200, 1, 200, self.water_color)
         self.geometry.extend(self.water_faces)
         
-        # Bridge
-        self.geometry.extend(create_cube(0, -0.5, -30, 10, 1, 60, BRIDGE_BROWN))
+        # Bridge (x -6..6, from the moat's edge up to the lobby step), walked half a unit up
+        self.geometry.extend(create_cube(0, -0.5, -51, 12, 1, 98, BRIDGE_BROWN, floor=0.5))
         
         # Fountain Base
         self.geometry.extend(create_prism(0, -1, -45, 8, 2, 8, WALL_GREY))
@@ -218,6 +329,9 @@ class Game:
         # Main Block (The "Lobby" box)
         # We model the exterior walls
         self.geometry.extend(create_cube(0, 15, 20, 40, 30, 40, WALL_GREY))
+
+        # Lobby floor, running on through the courtyard behind the block
+        self.geometry.extend(create_cube(0, -0.4, 50, 40, 1, 100, WALL_GREY, floor=0.0))
         
         # Towers
         self.geometry.extend(create_prism(-20, 20, 0, 5, 40, 6, WALL_GREY))
@@ -235,6 +349,9 @@ class Game:
         
         # The Hole (Black Circle on bridge/lobby transition)
         self.geometry.extend(create_prism(-10, 0.1, 25, 2, 0.1, 8, BLACK))
+
+        # 3. FLOORS - baked from the walkable pieces above
+        self.heightfield = bake_floors(self.geometry)
         
     def update_ai(self):
         now = pygame.time.get_ticks()
@@ -303,7 +420,7 @@ class Game:
             next_z = self.camera.pos.z + move_z
             
             # Collision Logic (Hardcoded boundaries for castle/bridge)
-            # Bridge is approx X: -5 to 5, Z: -60 to 0
+            # Bridge is approx X: -6 to 6, Z: -100 to -2
             # Courtyard is approx Z > 0
             
             can_move = True
@@ -328,15 +445,8 @@ class Game:
         self.update_ai()
         self.handle_input()
         
-        # Gravity / Height Logic
-        floor_h = 0
-        # Bridge
-        if self.camera.pos.z < -2 and abs(self.camera.pos.x) < 6:
-            floor_h = 0.5
-        elif self.camera.pos.z > 0 and abs(self.camera.pos.x) < 20:
-            floor_h = 0.1 # Lobby
-        else:
-            floor_h = -2.0 # Water/Grass level
+        # Gravity / Height Logic (baked floor heightfield)
+        floor_h = self.heightfield.sample(self.camera.pos.x, self.camera.pos.z)
             
         # The Hole Logic
         dist_to_hole = math.sqrt((self.camera.pos.x - -10)**2 + (self.camera.pos.z - 25)**2)
@@ -486,6 +596,32 @@ class Game:
         pygame.quit()
         sys.exit()
 
-if __name__ == "__main__":
+def selftest_heightfield(samples=20000, seed=3313):
+    """The floors baked from the tagged world pieces must reproduce the old hand-written heights"""
     game = Game()
-    game.run()
+    field = game.heightfield
+    rng = random.Random(seed)
+    edge = 1.5 * HEIGHTFIELD_CELL
+    checked = 0
+    for _ in range(samples):
+        x = rng.uniform(-300, 300); z = rng.uniform(-300, 300)
+        ref = legacy_floor_height(x, z)
+        got = field.sample(x, z)
+        # Within a cell of a floor edge the sample blends the two sides
+        near = [legacy_floor_height(x + dx, z + dz) for dx in (-edge, 0, edge) for dz in (-edge, 0, edge)]
+        if len(set(near)) == 1:
+            assert abs(got - ref) < 1e-9, (x, z, got, ref)
+            checked += 1
+        else:
+            assert min(near) - 1e-9 <= got <= max(near) + 1e-9, (x, z, got, near)
+    # Rebuilding the same world reuses the bake
+    game.build_world()
+    assert game.heightfield is field
+    print(f"heightfield selftest ok ({checked} interior samples, {field.w}x{field.h} cells)")
+
+if __name__ == "__main__":
+    if "--selftest" in sys.argv:
+        selftest_heightfield()
+    else:
+        game = Game()
+        game.run()
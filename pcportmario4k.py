@@ -37,6 +37,32 @@ BOUNCE_FORCE = -6.0
 ENEMY_SPEED = 1.5
 SHELL_SPEED = 7.0
 
+# Tile Grid
+# Levels store one byte per cell; the ID indexes both the name and flag tables
+TILE_NAMES = (None, 'ground', 'hard', 'brick', 'q_block', 'used', 'pipe_top', 'pipe', 'pole')
+TILE_IDS = {name: i for i, name in enumerate(TILE_NAMES)}
+F_SOLID, F_BREAKABLE, F_BUMPABLE, F_HAZARD = 1, 2, 4, 8
+TILE_FLAGS = bytes((
+    0,                                  # empty
+    F_SOLID,                            # ground
+    F_SOLID,                            # hard
+    F_SOLID | F_BREAKABLE | F_BUMPABLE, # brick
+    F_SOLID | F_BUMPABLE,               # q_block
+    F_SOLID,                            # used
+    F_SOLID,                            # pipe_top
+    F_SOLID,                            # pipe
+    0,                                  # pole (drawn, not collided)
+))
+
+# Level Streaming
+LEVEL_WIDTH = 300     # Columns from start to castle
+STREAM_LEVELS = True  # Build levels chunk by chunk around the camera
+CHUNK_W = 32          # Columns per generated chunk
+CHUNKS_RESIDENT = 4   # One behind the camera, up to two on screen, one ahead
+
+# Rendering
+SCROLL_RENDER = True  # Keep the tile layer between frames, drawing only what scrolls in
+
 # Input
 KEY_JUMP = [pygame.K_z, pygame.K_SPACE, pygame.K_UP]
 KEY_RUN  = [pygame.K_x, pygame.K_LSHIFT, pygame.K_RSHIFT]
@@ -384,6 +410,94 @@ class Renderer:
             pygame.draw.rect(surf, C_BLACK, rect, 2)
             pygame.draw.rect(surf, C_BLACK, (x, y + TILE_SIZE - 4, TILE_SIZE, 2)) # Lip
 
+class ScrollingBackground:
+    """The level's tiles cached on a screen-sized surface that follows the camera.
+
+    Scrolling right shifts the cached pixels with Surface.scroll and draws only
+    the strip of columns it uncovers, and cells changed by hit_block are patched
+    in place. Question blocks flash, so they stay off the cache and are drawn on
+    top each frame. A new level or a camera jump (backwards, or a whole screen
+    at once) redraws everything.
+
+    Tiles are blitted from sprites drawn once per theme rather than drawn with
+    Renderer.draw_block, which rounds lines differently when clipped. Bricks and
+    ground spill a pixel into the cells right and below, so the sprites are a
+    pixel larger than a tile and any area is repainted by clipping to it and
+    blitting in the same row order as a full redraw, neighbours included.
+    """
+    KEY = (255, 0, 255)
+
+    def __init__(self, size):
+        self.surface = pygame.Surface(size).convert()
+        self.sprites = {} # theme -> {tile name: sprite}
+        self.level = None
+        self.cam = 0
+        self.flashing = set() # (x, y) of q_blocks left off the cache
+        self.redraws = self.strips = self.patches = 0
+
+    @staticmethod
+    def sky(theme):
+        return C_BLACK if theme == 'underground' else C_SKY_BLACK if theme == 'castle' else C_SKY
+
+    def tile_sprites(self, theme):
+        if theme not in self.sprites:
+            sprites = self.sprites[theme] = {}
+            for name in TILE_NAMES[1:]:
+                if name in ('q_block', 'pole'): continue # Animated, and drawn by draw_play
+                sprite = pygame.Surface((TILE_SIZE + 1, TILE_SIZE + 1)).convert()
+                sprite.fill(self.KEY)
+                Renderer.draw_block(sprite, 0, 0, name, theme)
+                sprite.set_colorkey(self.KEY)
+                sprites[name] = sprite
+        return self.sprites[theme]
+
+    def draw(self, screen, level):
+        cam = int(level.camera_x)
+        dx = cam - self.cam
+        width, height = self.surface.get_size()
+        if level is not self.level or not 0 <= dx < width:
+            self.level, self.cam = level, cam
+            self.flashing.clear()
+            self.repaint(0, 0, width, height)
+            self.redraws += 1
+        elif dx:
+            self.cam = cam
+            self.surface.scroll(-dx)
+            self.repaint(width - dx, 0, dx, height)
+            self.strips += 1
+        for x, y in level.changed_tiles:
+            draw_x = x * TILE_SIZE - cam
+            if -TILE_SIZE < draw_x < width:
+                self.flashing.discard((x, y))
+                self.repaint(draw_x, y * TILE_SIZE, TILE_SIZE + 1, TILE_SIZE + 1)
+                self.patches += 1
+        level.changed_tiles.clear()
+
+        screen.blit(self.surface, (0, 0))
+        for cell in list(self.flashing):
+            x, y = cell
+            draw_x = x * TILE_SIZE - cam
+            if draw_x <= -TILE_SIZE:
+                self.flashing.discard(cell)
+            else:
+                Renderer.draw_block(screen, draw_x, y * TILE_SIZE, 'q_block', level.theme)
+
+    def repaint(self, left, top, w, h):
+        """Redraw the screen area (left, top, w, h) from the level's tiles"""
+        level, cam, surf = self.level, self.cam, self.surface
+        sprites = self.tile_sprites(level.theme)
+        surf.set_clip((left, top, w, h))
+        surf.fill(self.sky(level.theme))
+        # One cell up and left as well, for what spills in from there
+        for y in range(max(0, top // TILE_SIZE - 1), min(level.height, (top + h - 1) // TILE_SIZE + 1)):
+            for x in range((cam + left) // TILE_SIZE - 1, (cam + left + w - 1) // TILE_SIZE + 1):
+                t = level.get_tile(x, y)
+                if t == 'q_block':
+                    self.flashing.add((x, y))
+                elif t in sprites:
+                    surf.blit(sprites[t], (x * TILE_SIZE - cam, y * TILE_SIZE))
+        surf.set_clip(None)
+
 # ─── PARTICLE SYSTEM ─────────────────────────────────────────────────────────
 class Particle:
     def __init__(self, x, y, type, val=None):
@@ -417,6 +531,109 @@ class Particle:
             radius = (60 - self.life) // 2
             pygame.draw.circle(surf, C_MARIO_RED, (int(sx), int(self.y)), radius, 2)
 
+# ─── SWEPT COLLISION ─────────────────────────────────────────────────────────
+def sweep_tiles(level, x, y, w, h, dx, dy, mask=F_SOLID):
+    """First contact of a w x h box moving by (dx, dy) with the tile grid.
+
+    Walks the columns and rows the leading edges cross in time order (DDA),
+    testing only the newly entered cells, so no speed can skip a tile.
+    Returns (t, nx, ny, col, row) with t in [0, 1) and (nx, ny) the surface
+    normal, or None if the path is clear. Cells already overlapped are ignored.
+    """
+    inf = math.inf
+    sx = (dx > 0) - (dx < 0)
+    sy = (dy > 0) - (dy < 0)
+    if sx > 0:
+        col = math.ceil((x + w) / TILE_SIZE)
+        tx = (col * TILE_SIZE - x - w) / dx
+    elif sx < 0:
+        col = math.floor(x / TILE_SIZE) - 1
+        tx = ((col + 1) * TILE_SIZE - x) / dx
+    else:
+        tx = inf
+    if sy > 0:
+        row = math.ceil((y + h) / TILE_SIZE)
+        ty = (row * TILE_SIZE - y - h) / dy
+    elif sy < 0:
+        row = math.floor(y / TILE_SIZE) - 1
+        ty = ((row + 1) * TILE_SIZE - y) / dy
+    else:
+        ty = inf
+    if tx >= 1 and ty >= 1:
+        return None # No cell boundary crossed this step
+    dtx = TILE_SIZE / abs(dx) if sx else inf
+    dty = TILE_SIZE / abs(dy) if sy else inf
+    tiles, span, origin, height = level.tiles, level.span, level.origin, level.height
+    right = origin + span # Grid columns are [origin, right)
+
+    while True:
+        if tx <= ty:
+            t = tx
+            if t >= 1: return None
+            # Rows spanned at time t; the leading side comes from the rows already entered
+            top = y + dy * t
+            r0, r1 = math.floor(top / TILE_SIZE), math.ceil((top + h) / TILE_SIZE) - 1
+            if sy > 0: r1 = row - 1
+            elif sy < 0: r0 = row + 1
+            c = col - origin
+            if 0 <= c < span:
+                for r in range(r0 if r0 > 0 else 0, r1 + 1 if r1 < height else height):
+                    if TILE_FLAGS[tiles[r * span + c]] & mask:
+                        return t, -sx, 0, col, r
+            col += sx
+            tx += dtx
+        else:
+            t = ty
+            if t >= 1: return None
+            left = x + dx * t
+            c0, c1 = math.floor(left / TILE_SIZE), math.ceil((left + w) / TILE_SIZE)
+            if sx > 0: c1 = col
+            elif sx < 0: c0 = col + 1
+            if 0 <= row < height:
+                base = row * span - origin
+                for c in range(c0 if c0 > origin else origin, c1 if c1 < right else right):
+                    if TILE_FLAGS[tiles[base + c]] & mask:
+                        return t, 0, -sy, c, row
+            row += sy
+            ty += dty
+
+def sweep_box(x, y, w, h, dx, dy, ox, oy, ow, oh):
+    """Entry time in [0, 1) of a moving box into a static one, or None (0 if already overlapping)"""
+    if dx:
+        a, b = (ox - x - w) / dx, (ox + ow - x) / dx
+        t0x, t1x = (a, b) if a < b else (b, a)
+    elif x + w <= ox or x >= ox + ow:
+        return None
+    else:
+        t0x, t1x = -math.inf, math.inf
+    if dy:
+        a, b = (oy - y - h) / dy, (oy + oh - y) / dy
+        t0y, t1y = (a, b) if a < b else (b, a)
+    elif y + h <= oy or y >= oy + oh:
+        return None
+    else:
+        t0y, t1y = -math.inf, math.inf
+    t0 = max(t0x, t0y)
+    t1 = min(t1x, t1y)
+    if t0 >= t1 or t1 <= 0 or t0 >= 1:
+        return None
+    return max(t0, 0.0)
+
+def sweep_enemies(level, x, y, w, h, dx, dy, t_max=1.0, skip=None):
+    """Live enemies a moving box touches by t_max, as (t, enemy) pairs in hit order"""
+    # Reject on the bounds of the whole swept path before solving entry times
+    x0, x1 = (x, x + w + dx) if dx > 0 else (x + dx, x + w)
+    y0, y1 = (y, y + h + dy) if dy > 0 else (y + dy, y + h)
+    hits = []
+    for e in level.enemies:
+        if e.x >= x1 or e.x + e.w <= x0 or e.y >= y1 or e.y + e.h <= y0: continue
+        if e is skip or not e.alive or e.state == 'dead': continue
+        t = sweep_box(x, y, w, h, dx, dy, e.x, e.y, e.w, e.h)
+        if t is not None and t <= t_max:
+            hits.append((t, e))
+    hits.sort(key=lambda hit: hit[0])
+    return hits
+
 # ─── ENTITY SYSTEM ───────────────────────────────────────────────────────────
 class Entity:
     def __init__(self, x, y, w, h):
@@ -455,7 +672,7 @@ class Player(Entity):
     def update(self, keys, level, audio):
         # Fireball Logic
         for f in self.fireballs:
-            f.update(level)
+            f.update(level, audio)
         self.fireballs = [f for f in self.fireballs if f.alive]
 
         # Growth Animation
@@ -566,28 +783,29 @@ class Player(Entity):
         start_row = int(player_rect.top // TILE_SIZE) - 1
         end_row = int(player_rect.bottom // TILE_SIZE) + 1
 
-        for row in range(start_row, end_row):
-            for col in range(start_col, end_col):
-                tile = level.get_tile(col, row)
-                if tile and tile not in ('bush', 'cloud', 'hill'):
-                    # Check passability
-                    if tile in ('pipe_top', 'pipe') or tile == 'ground' or tile == 'brick' or tile == 'q_block' or tile == 'hard' or tile == 'used':
-                         tile_rect = pygame.Rect(col * TILE_SIZE, row * TILE_SIZE, TILE_SIZE, TILE_SIZE)
-                         if player_rect.colliderect(tile_rect):
-                            if x_axis:
-                                if self.vx > 0: self.x = tile_rect.left - self.w
-                                elif self.vx < 0: self.x = tile_rect.right
-                                self.vx = 0
-                            else:
-                                if self.vy > 0:
-                                    self.y = tile_rect.top - self.h
-                                    self.on_ground = True
-                                    self.vy = 0
-                                elif self.vy < 0:
-                                    self.y = tile_rect.bottom
-                                    self.vy = 0
-                                    level.hit_block(col, row, self)
-                            self.update_rect()
+        # Clamp once, then walk each row as a contiguous slice of the grid
+        tiles, span, origin = level.tiles, level.span, level.origin
+        start_col, end_col = max(start_col, origin), min(end_col, origin + span)
+        for row in range(max(start_row, 0), min(end_row, level.height)):
+            base = row * span - origin
+            for col, tid in enumerate(tiles[base + start_col:base + end_col], start_col):
+                if TILE_FLAGS[tid] & F_SOLID:
+                    tile_rect = pygame.Rect(col * TILE_SIZE, row * TILE_SIZE, TILE_SIZE, TILE_SIZE)
+                    if player_rect.colliderect(tile_rect):
+                        if x_axis:
+                            if self.vx > 0: self.x = tile_rect.left - self.w
+                            elif self.vx < 0: self.x = tile_rect.right
+                            self.vx = 0
+                        else:
+                            if self.vy > 0:
+                                self.y = tile_rect.top - self.h
+                                self.on_ground = True
+                                self.vy = 0
+                            elif self.vy < 0:
+                                self.y = tile_rect.bottom
+                                self.vy = 0
+                                level.hit_block(col, row, self)
+                        self.update_rect()
 
     def shoot(self, audio):
         if self.powerup == 2 and len(self.fireballs) < 2:
@@ -622,27 +840,44 @@ class Fireball(Entity):
         self.vy = 2.0
         self.bounces = 0
     
-    def update(self, level):
-        self.x += self.vx
-        self.y += self.vy
-        self.vy += GRAVITY
-        
-        # Simple tile checks
-        cx, cy = int(self.x // TILE_SIZE), int(self.y // TILE_SIZE)
-        t = level.get_tile(cx, cy)
-        
-        # Ground hit (Bounce)
-        if self.vy > 0 and level.get_tile(cx, cy+1) in ('ground', 'brick', 'hard', 'q_block', 'used', 'pipe'):
-            self.vy = -6.0
-        
-        # Wall hit
-        if level.get_tile(int((self.x + self.vx) // TILE_SIZE), cy) in ('ground', 'brick', 'hard', 'q_block', 'used', 'pipe'):
-            self.alive = False
-            level.particles.append(Particle(self.x, self.y, 'fireball_explode'))
+    def update(self, level, audio):
+        # Sweep the whole step so a fast fireball can't tunnel through a
+        # one-tile wall or a small enemy; a floor bounce continues the rest
+        dx, dy = self.vx, self.vy
+        bounced = False
+        for _ in range(3):
+            hit = sweep_tiles(level, self.x, self.y, self.w, self.h, dx, dy)
+            t = hit[0] if hit else 1.0
+            enemies = sweep_enemies(level, self.x, self.y, self.w, self.h, dx, dy, t)
+            if enemies:
+                t, enemy = enemies[0]
+                self.x += dx * t
+                self.y += dy * t
+                enemy.die(level, audio, score_val=200)
+                self.explode(level)
+                break
+            self.x += dx * t
+            self.y += dy * t
+            if not hit: break
+            if hit[1]: # Wall hit
+                self.explode(level)
+                break
+            if hit[2] < 0: # Ground hit (Bounce)
+                self.vy = -6.0
+                bounced = True
+            else:
+                self.vy = 0.0
+            dx, dy = dx * (1 - t), self.vy * (1 - t)
+        if not bounced:
+            self.vy += GRAVITY
 
         if self.y > SCREEN_H: self.alive = False
         self.update_rect()
 
+    def explode(self, level):
+        self.alive = False
+        level.particles.append(Particle(self.x, self.y, 'fireball_explode'))
+
 class Enemy(Entity):
     def __init__(self, x, y, type):
         super().__init__(x, y, TILE_SIZE, TILE_SIZE)
@@ -699,19 +934,19 @@ class Enemy(Entity):
         # Shell Logic
         if self.state == 'shell':
             if abs(self.vx) > 0:
-                # Sliding collision
-                next_x = self.x + self.vx
-                cx = int((next_x + self.w/2) // TILE_SIZE)
-                cy = int((self.y + self.h/2) // TILE_SIZE)
-                if level.get_tile(cx, cy):
+                # Sliding collision, swept so a fast shell reverses at the wall
+                # and hits every enemy on its path instead of skipping over them
+                dx = self.vx
+                for _ in range(3):
+                    hit = sweep_tiles(level, self.x, self.y, self.w, self.h, dx, 0)
+                    t = hit[0] if hit else 1.0
+                    for _, other in sweep_enemies(level, self.x, self.y, self.w, self.h, dx, 0, t, skip=self):
+                        other.die(level, audio, score_val=500)
+                    self.x += dx * t
+                    if not hit: break
                     self.vx *= -1
+                    dx = -dx * (1 - t)
                     audio.play_sfx('bump')
-                
-                # Hit enemies
-                rect = self.rect
-                for other in level.enemies:
-                    if other != self and other.alive and other.state != 'dead' and rect.colliderect(other.rect):
-                        other.die(level, audio, score_val=500)
             else:
                 self.vx = 0
 
@@ -724,8 +959,7 @@ class Enemy(Entity):
         mid_x = int((self.x + self.w/2) // TILE_SIZE)
         
         # Simple floor collision
-        t_below = level.get_tile(mid_x, bot_y)
-        if t_below and t_below not in ('bush', 'cloud'):
+        if level.tile_id(mid_x, bot_y):
             self.y = bot_y * TILE_SIZE - self.h
             self.vy = 0
             self.on_ground = True
@@ -738,11 +972,11 @@ class Enemy(Entity):
         mid_y = int((self.y + self.h/2) // TILE_SIZE)
         
         if self.type != 'bowser' and self.state != 'shell':
-            if level.get_tile(side_x, mid_y):
+            if level.tile_id(side_x, mid_y):
                 self.vx *= -1
                 self.facing *= -1
         
-        self.x += self.vx
+        if self.state != 'shell': self.x += self.vx
         self.frame += 1
         self.update_rect()
         
@@ -767,12 +1001,21 @@ class Enemy(Entity):
 
 # ─── LEVEL SYSTEM ────────────────────────────────────────────────────────────
 class Level:
-    def __init__(self, world, stage):
-        self.width = 300 # Wide levels
+    def __init__(self, world, stage, width=LEVEL_WIDTH, seed=None, streamed=False):
+        self.width = width # Wide levels
         self.height = 15
-        self.tiles = {}
+        self.seed = random.getrandbits(32) if seed is None else seed
+        self.chunk_count = -(-width // CHUNK_W)
+        self.streamed = streamed
+        # Streamed levels keep a fixed window of chunks; the rest hold the whole level
+        self.span = CHUNKS_RESIDENT * CHUNK_W if streamed else width
+        self.origin = 0 # First column held in the grid
+        self.tiles = bytearray(self.span * self.height) # Row-major tile IDs
+        self.first_chunk = 0
+        self.next_chunk = 0 # First chunk not yet generated
         self.enemies = []
         self.particles = []
+        self.changed_tiles = [] # Cells hit_block changed since the last frame was drawn
         self.camera_x = 0
         self.world = world
         self.stage = stage
@@ -783,92 +1026,150 @@ class Level:
         elif stage == 3: self.theme = 'athletic'
         elif stage == 4: self.theme = 'castle'
 
-        self.generate()
+        self.floor_y = (self.height - 2) * TILE_SIZE
+        self.flag_x = (self.width - 15) * TILE_SIZE
+        self.castle_x = (self.width - 8) * TILE_SIZE
+
+        if streamed:
+            self.stream(0)
+        else:
+            self.generate()
 
     def generate(self):
+        while self.next_chunk < self.chunk_count:
+            self.generate_chunk(self.next_chunk)
+            self.next_chunk += 1
+
+    def stream(self, camera_x):
+        """Keep chunks from one behind the camera to one past the right screen edge"""
+        chunk_px = CHUNK_W * TILE_SIZE
+        first = max(0, int(camera_x // chunk_px) - 1)
+        last = min(int((camera_x + SCREEN_W) // chunk_px) + 1, self.chunk_count - 1)
+        if first > self.first_chunk:
+            self.drop_chunks(first)
+        while self.next_chunk <= last:
+            self.generate_chunk(self.next_chunk)
+            self.next_chunk += 1
+
+    def drop_chunks(self, first):
+        """Slide the window so it starts at chunk `first`, forgetting what falls off the left"""
+        shift = min((first - self.first_chunk) * CHUNK_W, self.span)
+        span, tiles = self.span, self.tiles
+        for row in range(self.height):
+            base = row * span
+            tiles[base:base + span - shift] = tiles[base + shift:base + span]
+            tiles[base + span - shift:base + span] = bytes(shift)
+        self.first_chunk = first
+        self.origin = first * CHUNK_W
+        self.next_chunk = max(self.next_chunk, first)
+        left = self.origin * TILE_SIZE
+        self.enemies = [e for e in self.enemies if e.x + e.w > left]
+
+    def generate_chunk(self, k):
+        # Each chunk draws from its own seed, so it comes out the same whenever it is built
+        rng = random.Random(self.seed * 1000003 + k)
+        start = k * CHUNK_W
+        end = min(start + CHUNK_W, self.width)
+
         # 1. Terrain Generation
-        self.floor_y = (self.height - 2) * TILE_SIZE
         ground_h = 2
         
         # Fill ground
-        for x in range(self.width):
+        for x in range(start, end):
             # Pit logic
             if self.theme != 'castle' and 30 < x < self.width - 30:
-                if random.random() < 0.05: continue 
+                if rng.random() < 0.05: continue 
             
             for y in range(self.height - ground_h, self.height):
-                self.tiles[(x,y)] = 'ground'
+                self.set_tile(x, y, 'ground')
         
         # Ceiling (Underground/Castle)
         if self.theme in ('underground', 'castle'):
-            for x in range(self.width):
-                self.tiles[(x,0)] = 'hard'
-                self.tiles[(x,1)] = 'hard'
-        
-        # 2. Features Pass
-        x = 10
-        while x < self.width - 30:
-            x += random.randint(3, 8)
+            for x in range(start, end):
+                self.set_tile(x, 0, 'hard')
+                self.set_tile(x, 1, 'hard')
+        
+        # 2. Features Pass (every feature starts and ends inside its chunk)
+        x = max(start, 10)
+        while True:
+            x += rng.randint(3, 8)
+            if x >= end or x >= self.width - 30: break
             
             # Pipes
-            if self.theme == 'overworld' and random.random() < 0.2:
-                h = random.randint(2, 4)
-                self.tiles[(x, self.height - 3)] = 'pipe_top'
+            if self.theme == 'overworld' and rng.random() < 0.2:
+                h = rng.randint(2, 4)
+                self.set_tile(x, self.height - 3, 'pipe_top')
                 for i in range(1, h):
-                    self.tiles[(x, self.height - 3 - i)] = 'pipe'
+                    self.set_tile(x, self.height - 3 - i, 'pipe')
                 # Piranha Plant opportunity
                 x += 2
                 continue
             
             # Structures
-            struct_type = random.choice(['row', 'pyramid', 'q_formation'])
+            struct_type = rng.choice(['row', 'pyramid', 'q_formation'])
             y_base = self.height - 6
             
             if struct_type == 'row':
-                w = random.randint(3, 7)
+                w = min(rng.randint(3, 7), end - x)
                 for i in range(w):
-                    self.tiles[(x+i, y_base)] = 'brick'
-                    if random.random() < 0.3:
+                    self.set_tile(x+i, y_base, 'brick')
+                    if rng.random() < 0.3:
                         self.enemies.append(Enemy((x+i)*TILE_SIZE, (y_base-1)*TILE_SIZE, 'goomba'))
             
-            elif struct_type == 'q_formation':
-                self.tiles[(x, y_base)] = 'q_block'
-                self.tiles[(x+1, y_base)] = 'brick'
-                self.tiles[(x+2, y_base)] = 'q_block'
-                self.tiles[(x+1, y_base-4)] = 'q_block'
-                if random.random() < 0.5:
+            elif struct_type == 'q_formation' and x + 3 <= end:
+                self.set_tile(x, y_base, 'q_block')
+                self.set_tile(x+1, y_base, 'brick')
+                self.set_tile(x+2, y_base, 'q_block')
+                self.set_tile(x+1, y_base-4, 'q_block')
+                if rng.random() < 0.5:
                      self.enemies.append(Enemy((x+1)*TILE_SIZE, (y_base-5)*TILE_SIZE, 'koopa'))
 
             x += 5
 
-        # 3. Castle / Flag
-        self.flag_x = (self.width - 15) * TILE_SIZE
-        self.castle_x = (self.width - 8) * TILE_SIZE
-        
+        # 3. Castle / Flag, column by column so they may straddle chunks
         # Flagpole
-        for i in range(2, 11):
-            self.tiles[(self.width - 15, self.height - i)] = 'pole' # Just visual logic handled in drawing
+        if start <= self.width - 15 < end:
+            for i in range(2, 11):
+                self.set_tile(self.width - 15, self.height - i, 'pole') # Just visual logic handled in drawing
         
         # Castle Structure
         cx = self.width - 8
         cy = self.height - 3
         # Simple blocks for castle
-        for i in range(5):
+        for x in range(max(cx, start), min(cx + 5, end)):
             for j in range(5):
-                 self.tiles[(cx+i, cy-j)] = 'hard'
+                 self.set_tile(x, cy-j, 'hard')
         
         # Bowser?
-        if self.theme == 'castle':
+        if self.theme == 'castle' and start <= self.width - 20 < end:
             self.enemies.append(Enemy((self.width - 20) * TILE_SIZE, (self.height - 5)*TILE_SIZE, 'bowser'))
 
+    def tile_id(self, x, y):
+        x -= self.origin
+        if 0 <= x < self.span and 0 <= y < self.height:
+            return self.tiles[y * self.span + x]
+        return 0
+
+    def flags(self, x, y):
+        x -= self.origin
+        if 0 <= x < self.span and 0 <= y < self.height:
+            return TILE_FLAGS[self.tiles[y * self.span + x]]
+        return 0
+
     def get_tile(self, x, y):
-        return self.tiles.get((x, y))
+        return TILE_NAMES[self.tile_id(x, y)]
+
+    def set_tile(self, x, y, name):
+        x -= self.origin
+        if 0 <= x < self.span and 0 <= y < self.height:
+            self.tiles[y * self.span + x] = TILE_IDS[name]
 
     def hit_block(self, x, y, player):
-        t = self.tiles.get((x,y))
+        t = self.get_tile(x, y)
         
         if t == 'q_block':
-            self.tiles[(x,y)] = 'used'
+            self.set_tile(x, y, 'used')
+            self.changed_tiles.append((x, y))
             player.coins += 1
             player.score += 200
             self.particles.append(Particle(x*TILE_SIZE, y*TILE_SIZE, 'score', 200))
@@ -885,7 +1186,8 @@ class Level:
                 
         elif t == 'brick':
             if player.powerup > 0:
-                del self.tiles[(x,y)]
+                self.set_tile(x, y, None)
+                self.changed_tiles.append((x, y))
                 # Debris
                 for _ in range(4):
                     self.particles.append(Particle(x*TILE_SIZE + 8, y*TILE_SIZE + 8, 'debris'))
@@ -912,9 +1214,10 @@ class Game:
         # Star effect
         self.star_timer = 0
         self.title_timer = 0
+        self.background = ScrollingBackground((SCREEN_W, SCREEN_H))
 
     def start_level(self):
-        self.level = Level(self.world, self.stage)
+        self.level = Level(self.world, self.stage, streamed=STREAM_LEVELS)
         self.player = Player(100, 100)
         self.camera_x = 0
         
@@ -1003,6 +1306,11 @@ class Game:
         # 2. Camera
         target = self.player.x - SCREEN_W // 3
         self.level.camera_x = max(self.level.camera_x, target) # Only scroll right
+        if self.level.streamed:
+            if self.player.x < self.level.camera_x: # Nor walk back into chunks already dropped
+                self.player.x = self.level.camera_x
+                self.player.vx = max(self.player.vx, 0)
+            self.level.stream(self.level.camera_x)
         
         # 3. Enemies
         player_rect = self.player.rect
@@ -1088,28 +1396,11 @@ class Game:
             self.state = 'TITLE'
 
     def draw_play(self):
-        # Background
-        bg_col = C_SKY
-        if self.level.theme == 'underground': bg_col = C_BLACK
-        elif self.level.theme == 'castle': bg_col = C_SKY_BLACK
-        self.screen.fill(bg_col)
-        
         cam = self.level.camera_x
-        
-        # Draw Scenery
-        # (Simplified cloud/bush logic could go here)
-        
-        # Draw Tiles
-        start_col = int(cam // TILE_SIZE)
-        end_col = start_col + (SCREEN_W // TILE_SIZE) + 2
-        
-        for y in range(self.level.height):
-            for x in range(start_col, end_col):
-                t = self.level.get_tile(x, y)
-                if t:
-                    draw_x = x * TILE_SIZE - cam
-                    draw_y = y * TILE_SIZE
-                    Renderer.draw_block(self.screen, draw_x, draw_y, t, self.level.theme)
+        if SCROLL_RENDER:
+            self.background.draw(self.screen, self.level)
+        else:
+            self.draw_tiles(cam)
 
         # Draw Flagpole
         fx = self.level.flag_x - cam
@@ -1148,6 +1439,31 @@ class Game:
         # HUD
         self.draw_hud()
 
+    def draw_tiles(self, cam):
+        """Clear the screen and draw every visible tile (the SCROLL_RENDER=False path)"""
+        # Background
+        bg_col = C_SKY
+        if self.level.theme == 'underground': bg_col = C_BLACK
+        elif self.level.theme == 'castle': bg_col = C_SKY_BLACK
+        self.screen.fill(bg_col)
+        
+        # Draw Scenery
+        # (Simplified cloud/bush logic could go here)
+        
+        # Draw Tiles
+        start_col = int(cam // TILE_SIZE)
+        end_col = start_col + (SCREEN_W // TILE_SIZE) + 2
+        
+        for y in range(self.level.height):
+            for x in range(start_col, end_col):
+                t = self.level.get_tile(x, y)
+                if t:
+                    draw_x = x * TILE_SIZE - cam
+                    draw_y = y * TILE_SIZE
+                    Renderer.draw_block(self.screen, draw_x, draw_y, t, self.level.theme)
+        self.level.changed_tiles.clear()
+        self.background.level = None # The cache missed these changes; rebuild it if switched back
+
     def draw_hud(self):
         ui_y = 20
         # MARIO
@@ -1166,6 +1482,483 @@ class Game:
         self.screen.blit(self.font.render("TIME", True, C_WHITE), (650, ui_y))
         self.screen.blit(self.font.render(" 300", True, C_WHITE), (660, ui_y + 30))
 
-if __name__ == "__main__":
+def _legacy_tiles(level):
+    """The (x, y) -> name dict levels used to store, rebuilt from the grid"""
+    return {(x, y): level.get_tile(x, y) for y in range(level.height) for x in range(level.width) if level.tile_id(x, y)}
+
+
+LEGACY_SOLID = ('pipe_top', 'pipe', 'ground', 'brick', 'q_block', 'hard', 'used')
+
+
+def selftest_tile_grid():
+    """The byte grid must answer like the old dict and string comparisons did"""
+    for name, tid in TILE_IDS.items():
+        assert TILE_NAMES[tid] == name
+        assert bool(TILE_FLAGS[tid] & F_SOLID) == (name in LEGACY_SOLID), name
+    for stage in (1, 2, 3, 4):
+        random.seed(stage)
+        level = Level(1, stage)
+        assert len(level.tiles) == level.width * level.height
+        legacy = _legacy_tiles(level)
+        for y in range(-2, level.height + 2):
+            for x in range(-2, level.width + 2):
+                name = legacy.get((x, y))
+                assert level.get_tile(x, y) == name, (stage, x, y)
+                assert bool(level.flags(x, y) & F_SOLID) == (name in LEGACY_SOLID)
+        # Bumping from below: q_block -> used, brick breaks only when big
+        player = Player(0, 0)
+        q = next(k for k, v in legacy.items() if v == 'q_block')
+        level.hit_block(*q, player)
+        assert level.get_tile(*q) == 'used' and player.coins == 1
+        b = next(k for k, v in legacy.items() if v == 'brick')
+        player.powerup = 0
+        level.hit_block(*b, player)
+        assert level.get_tile(*b) == 'brick'
+        player.powerup = 1
+        level.hit_block(*b, player)
+        assert level.tile_id(*b) == 0 and level.flags(*b) == 0
+        # Falling into the floor lands on top of it
+        col = next(x for x in range(level.width) if level.get_tile(x, level.height - 2) == 'ground'
+                   and level.get_tile(x + 1, level.height - 2) == 'ground' and not level.tile_id(x, level.height - 3))
+        player = Player(col * TILE_SIZE + 4, (level.height - 2) * TILE_SIZE - TILE_SIZE + 6)
+        player.vy = 6
+        player.resolve_collisions(level, False)
+        assert player.on_ground and player.y == (level.height - 2) * TILE_SIZE - player.h
+    print("tile grid ok")
+
+
+def benchmark_tile_grid(queries=50000):
+    """Player-sized collision scans/sec and storage size, old dict vs byte grid"""
+    random.seed(1)
+    level = Level(1, 1)
+    legacy = _legacy_tiles(level)
+    # The 3x4 neighbourhood Player.resolve_collisions scans around a big Mario
+    boxes = [(random.randint(-2, level.width), random.randint(-2, level.height - 2)) for _ in range(queries)]
+
+    def dict_scan():
+        n = 0
+        for x0, y0 in boxes:
+            for row in range(y0, y0 + 4):
+                for col in range(x0, x0 + 3):
+                    tile = legacy.get((col, row))
+                    if tile and tile not in ('bush', 'cloud', 'hill'):
+                        if tile in ('pipe_top', 'pipe') or tile == 'ground' or tile == 'brick' or tile == 'q_block' or tile == 'hard' or tile == 'used':
+                            n += 1
+        return n
+
+    def flags_scan():
+        n = 0
+        flags = level.flags
+        for x0, y0 in boxes:
+            for row in range(y0, y0 + 4):
+                for col in range(x0, x0 + 3):
+                    if flags(col, row) & F_SOLID: n += 1
+        return n
+
+    def row_scan():
+        n = 0
+        tiles, w, h = level.tiles, level.width, level.height
+        for x0, y0 in boxes:
+            c0 = x0 if x0 > 0 else 0
+            c1 = x0 + 3 if x0 + 3 < w else w
+            for row in range(y0 if y0 > 0 else 0, y0 + 4 if y0 + 4 < h else h):
+                base = row * w
+                for col, tid in enumerate(tiles[base + c0:base + c1], c0):
+                    if TILE_FLAGS[tid] & F_SOLID: n += 1
+        return n
+
+    results = []
+    for label, fn in (("dict + names", dict_scan), ("grid.flags()", flags_scan), ("grid row slice", row_scan)):
+        dt = float('inf')
+        for _ in range(3):
+            t0 = time.perf_counter()
+            hits = fn()
+            dt = min(dt, time.perf_counter() - t0)
+        results.append(hits)
+        print(f"{label:<16}{queries / dt / 1e3:>8.0f} k scans/s {queries * 12 / dt / 1e6:>6.2f} M cells/s")
+    assert len(set(results)) == 1
+    dict_bytes = sys.getsizeof(legacy) + sum(sys.getsizeof(k) for k in legacy)
+    print(f"{level.width}x{level.height} level: dict {dict_bytes} bytes ({len(legacy)} cells), "
+          f"bytearray {sys.getsizeof(level.tiles)} bytes")
+
+
+def _headless_audio():
+    import os
+    os.environ.setdefault('SDL_AUDIODRIVER', 'dummy')
+    return AudioEngine()
+
+
+def _sandbox_level(floor_row=13):
+    """An empty 1-1 with only a floor row, for placing test walls by hand"""
+    random.seed(0)
+    level = Level(1, 1)
+    level.tiles[:] = bytes(len(level.tiles))
+    level.enemies = []
+    for x in range(level.width):
+        level.set_tile(x, floor_row, 'ground')
+    return level
+
+
+def _overlaps_cell(x, y, w, h, col, row):
+    return (x < (col + 1) * TILE_SIZE and x + w > col * TILE_SIZE
+            and y < (row + 1) * TILE_SIZE and y + h > row * TILE_SIZE)
+
+
+def _first_overlap(level, x, y, w, h, dx, dy, samples=2000):
+    """Brute-force first sample time at which the box enters a solid cell it did not start in"""
+    def solid_cells(bx, by):
+        c0, c1 = int(bx // TILE_SIZE), int(-(-(bx + w) // TILE_SIZE))
+        r0, r1 = int(by // TILE_SIZE), int(-(-(by + h) // TILE_SIZE))
+        return {(c, r) for r in range(r0, r1) for c in range(c0, c1) if level.flags(c, r) & F_SOLID}
+    start = solid_cells(x, y)
+    for i in range(1, samples + 1):
+        t = i / samples
+        if solid_cells(x + dx * t, y + dy * t) - start:
+            return t
+    return None
+
+
+def selftest_sweep():
+    """Swept collision must match brute-force sampling and stop tunnelling at any speed"""
+    random.seed(7)
+    level = Level(1, 1)
+    for _ in range(1000):
+        w, h = random.choice((12, 24, TILE_SIZE - 10, TILE_SIZE)), random.choice((12, TILE_SIZE, TILE_SIZE * 2))
+        x, y = random.uniform(0, (level.width - 20) * TILE_SIZE), random.uniform(-TILE_SIZE, SCREEN_H - h)
+        speed = random.choice((1, 10, 60, 8 * TILE_SIZE))
+        dx, dy = random.uniform(-speed, speed), random.choice((0.0, random.uniform(-speed, speed)))
+        if random.random() < 0.1: dx = 0.0
+        hit = sweep_tiles(level, x, y, w, h, dx, dy)
+        brute = _first_overlap(level, x, y, w, h, dx, dy)
+        if hit is None:
+            assert brute is None, (x, y, w, h, dx, dy, brute)
+            continue
+        t, nx, ny, col, row = hit
+        assert 0 <= t < 1 and abs(nx) + abs(ny) == 1
+        # Nothing is entered before the reported contact...
+        assert brute is None or brute >= t - 1e-9, (x, y, dx, dy, t, brute)
+        # ...and the reported cell is solid and penetrated right after it
+        assert level.flags(col, row) & F_SOLID
+        t2 = min(1.0, t + 1e-3)
+        assert _overlaps_cell(x + dx * t2, y + dy * t2, w, h, col, row), (x, y, dx, dy, hit)
+        if brute is not None:
+            assert brute <= t + 1e-3 + 1.0 / 2000, (t, brute)
+    # Box sweeps against their brute-force counterparts
+    for _ in range(2000):
+        ox, oy, ow, oh = 0.0, 0.0, random.uniform(4, 96), random.uniform(4, 96)
+        x, y = random.uniform(-400, 400), random.uniform(-400, 400)
+        w, h = random.uniform(4, 96), random.uniform(4, 96)
+        dx, dy = random.uniform(-800, 800), random.choice((0.0, random.uniform(-800, 800)))
+        t = sweep_box(x, y, w, h, dx, dy, ox, oy, ow, oh)
+        inside = lambda s: x + dx * s < ox + ow and x + w + dx * s > ox and y + dy * s < oy + oh and y + h + dy * s > oy
+        brute = next((i / 4000 for i in range(4000) if inside(i / 4000)), None)
+        if t is not None:
+            assert inside(t + 1e-9), (x, y, dx, dy, t)
+        if brute is not None:
+            assert t is not None and t <= brute + 1e-9 and brute - t <= 1.0 / 4000 + 1e-9, (t, brute)
+
+    audio = _headless_audio()
+    floor = 13
+    # A fireball at any speed explodes on a one-tile wall instead of passing it
+    for speed in (8.0, 47.0, 48.0, 200.0, 5000.0):
+        level = _sandbox_level(floor)
+        level.set_tile(30, floor - 1, 'brick')
+        fb = Fireball(20 * TILE_SIZE, (floor - 1) * TILE_SIZE + 20, 1)
+        fb.vx = speed
+        for _ in range(400):
+            fb.update(level, audio)
+            assert fb.x + fb.w <= 30 * TILE_SIZE + 1e-6, speed
+            if not fb.alive: break
+        assert not fb.alive, speed
+    # Bouncing keeps a fast fireball above the floor and it still reaches the far side
+    level = _sandbox_level(floor)
+    fb = Fireball(2 * TILE_SIZE, (floor - 3) * TILE_SIZE, 1)
+    fb.vx = 3 * TILE_SIZE
+    for _ in range(60):
+        fb.update(level, audio)
+        assert fb.y + fb.h <= floor * TILE_SIZE + 1e-6
+    assert fb.alive and fb.x > 100 * TILE_SIZE
+    # A fireball hits a goomba it would otherwise jump clean over in one step
+    level = _sandbox_level(floor)
+    goomba = Enemy(26 * TILE_SIZE, (floor - 1) * TILE_SIZE, 'goomba')
+    goomba.active = True
+    level.enemies.append(goomba)
+    fb = Fireball(20 * TILE_SIZE, (floor - 1) * TILE_SIZE + 20, 1)
+    fb.vx, fb.vy = 20 * TILE_SIZE, 0.0
+    fb.update(level, audio)
+    assert goomba.state == 'dead' and not fb.alive and fb.x + fb.w <= goomba.x + 1e-6
+    # A shell at absurd speed stays between two pillars and kills what it passes
+    for speed in (SHELL_SPEED, 60.0, 500.0, 4321.0):
+        level = _sandbox_level(floor)
+        level.set_tile(10, floor - 1, 'hard')
+        level.set_tile(40, floor - 1, 'hard')
+        shell = Enemy(20 * TILE_SIZE, (floor - 1) * TILE_SIZE, 'koopa')
+        shell.active, shell.state, shell.vx = True, 'shell', speed
+        victim = Enemy(35 * TILE_SIZE, (floor - 1) * TILE_SIZE, 'goomba')
+        victim.vx = 0.0
+        level.enemies += [shell, victim]
+        player = Player(0, 0)
+        for _ in range(200):
+            shell.update(level, player, audio)
+            assert 11 * TILE_SIZE - 1e-6 <= shell.x and shell.x + shell.w <= 40 * TILE_SIZE + 1e-6, (speed, shell.x)
+            assert shell.y == (floor - 1) * TILE_SIZE
+        assert victim.state == 'dead', speed
+        assert abs(shell.vx) == speed
+    print("sweep ok")
+
+
+def benchmark_sweep(steps=100000):
+    """Per-step cost of the old point probes vs the swept checks at normal speeds"""
+    random.seed(3)
+    level = Level(1, 1)
+    for e in level.enemies:
+        e.active = True
+    cases = [(random.uniform(0, (level.width - 20) * TILE_SIZE), random.uniform(0, (level.height - 3) * TILE_SIZE),
+              random.choice((-8.0, 8.0)), random.uniform(-6.0, MAX_FALL)) for _ in range(steps)]
+
+    def probe_fireball():
+        n = 0
+        for x, y, vx, vy in cases:
+            cx, cy = int((x + vx) // TILE_SIZE), int((y + vy) // TILE_SIZE)
+            if vy > 0 and level.flags(cx, cy + 1) & F_SOLID: n += 1
+            if level.flags(int((x + vx + vx) // TILE_SIZE), cy) & F_SOLID: n += 1
+        return n
+
+    def sweep_fireball():
+        n = 0
+        for x, y, vx, vy in cases:
+            if sweep_tiles(level, x, y, 12, 12, vx, vy): n += 1
+        return n
+
+    def probe_shell():
+        n = 0
+        for x, y, vx, _ in cases:
+            vx *= SHELL_SPEED / 8.0
+            if level.tile_id(int((x + vx + TILE_SIZE / 2) // TILE_SIZE), int((y + TILE_SIZE / 2) // TILE_SIZE)): n += 1
+            rect = pygame.Rect(x, y, TILE_SIZE, TILE_SIZE)
+            for other in level.enemies:
+                if other.alive and other.state != 'dead' and rect.colliderect(other.rect): n += 1
+        return n
+
+    def sweep_shell():
+        n = 0
+        for x, y, vx, _ in cases:
+            vx *= SHELL_SPEED / 8.0
+            hit = sweep_tiles(level, x, y, TILE_SIZE, TILE_SIZE, vx, 0)
+            n += len(sweep_enemies(level, x, y, TILE_SIZE, TILE_SIZE, vx, 0, hit[0] if hit else 1.0)) + bool(hit)
+        return n
+
+    for label, fn in (("fireball probes", probe_fireball), ("fireball sweep", sweep_fireball),
+                      ("shell probes", probe_shell), ("shell sweep", sweep_shell)):
+        dt = float('inf')
+        for _ in range(3):
+            t0 = time.perf_counter()
+            fn()
+            dt = min(dt, time.perf_counter() - t0)
+        print(f"{label:<18}{dt / steps * 1e6:>7.2f} us/step")
+    print(f"({len(level.enemies)} enemies in the shell checks)")
+
+
+def _play_script(seed, frames):
+    """Snapshots of a scripted run-and-jump through 1-1 until the player dies or frames run out"""
+    import os
+    os.environ.setdefault('SDL_VIDEODRIVER', 'dummy')
+    os.environ.setdefault('SDL_AUDIODRIVER', 'dummy')
     game = Game()
-    game.run()
+    random.seed(seed)
+    game.state = 'PLAY'
+    game.start_level()
+    keys = {k: False for k in KEY_JUMP + KEY_RUN + KEY_LEFT + KEY_RIGHT}
+    shots = []
+    for f in range(frames):
+        keys[pygame.K_RIGHT] = True
+        keys[pygame.K_x] = f % 200 < 150
+        keys[pygame.K_z] = f % 40 < 18
+        game.update_play(keys)
+        if game.state != 'PLAY': break
+        p, cam = game.player, game.level.camera_x
+        shots.append((p.x, p.y, p.vx, p.vy, p.powerup, p.score, p.coins, cam,
+                      tuple((e.type, e.x, e.y, e.vx, e.state, e.alive) for e in game.level.enemies
+                            if cam - SCREEN_W < e.x < cam + SCREEN_W * 2)))
+    return shots
+
+
+def selftest_streaming():
+    """A level built chunk by chunk around the camera must match building it all up front"""
+    global STREAM_LEVELS
+    for stage in (1, 2, 3, 4):
+        for seed in (1, 2, 3):
+            full = Level(1, stage, seed=seed)
+            level = Level(1, stage, seed=seed, streamed=True)
+            size = len(level.tiles)
+            spawned, seen = [], {} # Holding each enemy keeps its id from being reused
+            window = None
+            for cam in range(0, (level.width - 10) * TILE_SIZE, 7):
+                level.stream(cam)
+                assert len(level.tiles) == size
+                # Everything from the camera to a chunk past the screen is built
+                assert level.origin * TILE_SIZE <= cam
+                assert min(level.next_chunk * CHUNK_W, level.width) * TILE_SIZE >= min(cam + SCREEN_W + CHUNK_W * TILE_SIZE, level.width * TILE_SIZE)
+                for e in level.enemies:
+                    if id(e) not in seen:
+                        seen[id(e)] = e
+                        spawned.append((e.type, e.x, e.y))
+                if window == (level.origin, level.next_chunk): continue
+                window = (level.origin, level.next_chunk)
+                for y in range(-1, level.height + 1):
+                    for x in range(level.origin - 2, level.origin + level.span + 2):
+                        built = level.origin <= x < level.next_chunk * CHUNK_W
+                        assert level.tile_id(x, y) == (full.tile_id(x, y) if built else 0), (stage, seed, x, y)
+            assert spawned == [(e.type, e.x, e.y) for e in full.enemies], (stage, seed)
+            assert level.next_chunk == full.chunk_count
+
+    # Endless levels hold the same few chunks however far the camera goes
+    level = Level(1, 1, width=20000, seed=7, streamed=True)
+    size, most = len(level.tiles), 0
+    for cam in range(0, (level.width - 20) * TILE_SIZE, 300):
+        level.stream(cam)
+        most = max(most, len(level.enemies))
+    assert len(level.tiles) == size and level.next_chunk == level.chunk_count
+    assert most < CHUNKS_RESIDENT * CHUNK_W, most
+
+    # Playing through crosses chunk seams the same way in both modes
+    covered = 0
+    for seed in (3, 5, 8, 13):
+        runs = []
+        for streamed in (False, True):
+            STREAM_LEVELS = streamed
+            runs.append(_play_script(seed, 2000))
+        STREAM_LEVELS = True
+        assert runs[0] == runs[1], seed
+        covered += int(runs[0][-1][0] // TILE_SIZE)
+    assert covered > 2 * CHUNK_W, covered
+    print(f"streaming ok ({covered} columns played)")
+
+
+def benchmark_streaming():
+    """Up-front vs streamed level cost and the grid memory each keeps"""
+    for width in (LEVEL_WIDTH, 3000, 30000):
+        dt_full = dt_stream = worst = float('inf')
+        for _ in range(3):
+            t0 = time.perf_counter()
+            full = Level(1, 1, width=width, seed=1)
+            dt_full = min(dt_full, time.perf_counter() - t0)
+            t0 = time.perf_counter()
+            level = Level(1, 1, width=width, seed=1, streamed=True)
+            spike = 0
+            for cam in range(0, (width - 16) * TILE_SIZE, int(MAX_RUN)):
+                t1 = time.perf_counter()
+                level.stream(cam)
+                spike = max(spike, time.perf_counter() - t1)
+            dt_stream = min(dt_stream, time.perf_counter() - t0)
+            worst = min(worst, spike)
+        frames = (width - 16) * TILE_SIZE // int(MAX_RUN)
+        print(f"{width:>6} columns: up front {dt_full * 1e3:>8.1f} ms {len(full.tiles):>7} bytes | "
+              f"streamed {dt_stream / frames * 1e6:>5.1f} us/frame, worst {worst * 1e3:.2f} ms, {len(level.tiles)} bytes")
+
+
+def selftest_scroll_render(frames=1200):
+    """The scrolled tile cache must match a fresh redraw every frame, and the full-redraw path on screen"""
+    import os
+    global SCROLL_RENDER
+    os.environ.setdefault('SDL_VIDEODRIVER', 'dummy')
+    os.environ.setdefault('SDL_AUDIODRIVER', 'dummy')
+    game = Game()
+    cache = game.background
+    fresh = ScrollingBackground((SCREEN_W, SCREEN_H))
+    scratch = pygame.Surface((SCREEN_W, SCREEN_H)).convert()
+    keys = {k: False for k in KEY_JUMP + KEY_RUN + KEY_LEFT + KEY_RIGHT}
+    view = pygame.Rect(TILE_SIZE, 0, SCREEN_W - TILE_SIZE * 2, SCREEN_H)
+
+    def check(level):
+        fresh.level = None
+        fresh.draw(scratch, level)
+        assert pygame.image.tostring(cache.surface, 'RGB') == pygame.image.tostring(fresh.surface, 'RGB'), level.camera_x
+        assert cache.flashing == fresh.flashing, level.camera_x
+
+    compared = 0
+    for stage in (1, 2, 3, 4):
+        random.seed(stage)
+        game.stage = stage
+        game.state = 'PLAY'
+        game.start_level()
+        for f in range(frames):
+            keys[pygame.K_RIGHT] = True
+            keys[pygame.K_x] = f % 200 < 150
+            keys[pygame.K_z] = f % 40 < 18
+            game.update_play(keys) # Draws through the cache
+            if game.state != 'PLAY': break
+            level = game.level
+            check(level)
+            if f % 40: continue
+            # Whole frames against the full redraw, at a whole-pixel camera since
+            # pygame truncates the float tile positions that path draws at, and
+            # without the tiles cut by the screen edges, whose lines it rounds
+            # differently when clipped
+            cam = level.camera_x
+            level.camera_x = float(int(cam))
+            phase = pygame.time.get_ticks() // 200 # Question blocks flash on this clock
+            shots = []
+            for SCROLL_RENDER in (False, True):
+                game.draw_play()
+                shots.append(pygame.image.tostring(game.screen.subsurface(view), 'RGB'))
+            if phase == pygame.time.get_ticks() // 200:
+                assert shots[0] == shots[1], (stage, f)
+                compared += 1
+            level.camera_x = cam
+        # Jumping the camera back, or further than a screen, redraws everything
+        for jump in (-TILE_SIZE * 3 - 5, SCREEN_W * 2 + 7):
+            before = cache.redraws
+            level.camera_x = max(0, level.camera_x + jump)
+            game.draw_play()
+            assert cache.redraws == before + 1
+            check(level)
+    assert cache.strips > frames and cache.patches > 0 and compared > 20, (cache.strips, cache.patches, compared)
+    print(f"scroll render ok ({cache.strips} strips, {cache.patches} patched cells, {cache.redraws} full redraws)")
+
+
+def benchmark_scroll_render(frames=600):
+    """draw_play ms/frame with the camera running right at top speed: full redraw vs scrolled cache"""
+    import os
+    global SCROLL_RENDER
+    os.environ.setdefault('SDL_VIDEODRIVER', 'dummy')
+    os.environ.setdefault('SDL_AUDIODRIVER', 'dummy')
+    game = Game()
+    print(f"{'theme':<12}{'redraw ms':>10}{'scroll ms':>10}{'worst ms':>10}")
+    for stage in (1, 2, 3, 4):
+        times = []
+        for SCROLL_RENDER in (False, True):
+            random.seed(1)
+            game.stage = stage
+            game.state = 'PLAY'
+            game.start_level()
+            level, p = game.level, game.player
+            total = worst = 0
+            for f in range(frames):
+                level.camera_x += MAX_RUN
+                p.x = level.camera_x + SCREEN_W // 3
+                level.stream(level.camera_x)
+                t0 = time.perf_counter()
+                game.draw_play()
+                dt = time.perf_counter() - t0
+                total += dt
+                worst = max(worst, dt)
+            times.append(total * 1000 / frames)
+        print(f"{level.theme:<12}{times[0]:>10.2f}{times[1]:>10.2f}{worst * 1000:>10.2f}")
+    SCROLL_RENDER = True
+
+
+if __name__ == "__main__":
+    if '--selftest' in sys.argv:
+        selftest_tile_grid()
+        selftest_sweep()
+        selftest_streaming()
+        selftest_scroll_render()
+    elif '--bench' in sys.argv:
+        benchmark_tile_grid()
+        benchmark_sweep()
+        benchmark_streaming()
+        benchmark_scroll_render()
+    else:
+        game = Game()
+        game.run()
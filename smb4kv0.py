@@ -10,10 +10,12 @@ custom 2A03-style sound emulation, and procedural levels.
 """
 
 import pygame
+import os
 import sys
 import math
 import random
 import array
+import time
 
 # ─── Constants ───────────────────────────────────────────────────────────────
 SCREEN_W, SCREEN_H = 768, 720
@@ -38,6 +40,15 @@ SCROLL_THRESHOLD = SCREEN_W // 2.5
 LEVEL_WIDTH_TILES = 224  # 14 screens wide
 LEVEL_HEIGHT_TILES = 15
 
+# Rendering
+TILE_ATLAS = True  # Blit tiles from a pre-baked atlas instead of drawing each one
+
+# Timing
+FIXED_TIMESTEP = True  # Logic at exactly FPS ticks/sec, drawing interpolated between ticks
+TICK_MS = 1000.0 / FPS
+MAX_CATCHUP = 5        # Most ticks one drawn frame may run; older lag is dropped (slows, never spirals)
+RENDER_FPS = int(os.environ.get('SMB_RENDER_FPS', FPS))  # Draw-rate cap; 0 (or --uncapped) = uncapped
+
 # NES Palette (Authentic Hex Values)
 C_SKY          = (92, 148, 252)   # NES Sky Blue
 C_SKY_NIGHT    = (0, 0, 0)
@@ -322,6 +333,37 @@ def draw_castle(surf, x, y):
     for i in range(5):
         pygame.draw.rect(surf, C_CASTLE_GRAY, (x + i*30, y-20, 15, 20))
 
+class TileAtlas:
+    """Every tile draw_game uses, drawn once with draw_block into one strip surface.
+
+    Question blocks get one cell per shimmer offset; the offset for a frame
+    is shimmer(frame), the same value draw_block computes.
+    """
+    TILES = {1: 'ground', 2: 'brick'}
+
+    @staticmethod
+    def shimmer(frame):
+        return int(math.sin(frame * 0.2) * 2)
+
+    def __init__(self):
+        entries = [(tile, 0, name, 0) for tile, name in self.TILES.items()]
+        # One representative frame per distinct question-mark offset
+        offsets = {}
+        for frame in range(64):
+            offsets.setdefault(self.shimmer(frame), frame)
+        entries += [(3, off, 'q_block', frame) for off, frame in sorted(offsets.items())]
+        self.surface = pygame.Surface((TILE * len(entries), TILE)).convert()
+        self.areas = {}
+        for i, (tile, off, name, frame) in enumerate(entries):
+            draw_block(self.surface, i * TILE, 0, name, frame)
+            self.areas[(tile, off)] = pygame.Rect(i * TILE, 0, TILE, TILE)
+
+    def tile_areas(self, frame):
+        """Tile id -> atlas rect for this frame"""
+        areas = {tile: self.areas[(tile, 0)] for tile in self.TILES}
+        areas[3] = self.areas[(3, self.shimmer(frame))]
+        return areas
+
 # ─── Level Generation ────────────────────────────────────────────────────────
 CONTENTS_COIN = 'coin'
 CONTENTS_MUSHROOM = 'mushroom'
@@ -458,33 +500,87 @@ class Game:
         self.state = 'menu'
         self.world = 1
         self.level = 1
-        self.frame_count = 0
+        self.frame_count = 0 # Logic ticks
         self.popup_texts = []
+        self.lag = 0.0 # Real time banked towards the next tick, in ms
         self.reset_level()
         
     def reset_level(self):
         self.level_data = LevelData(self.world, self.level)
+        self.atlas = TileAtlas()
         self.player = Player(100, 100)
         self.cam_x = 0
         self.audio.theme = 'underground' if self.level_data.underground else 'overworld'
         self.particles = []
+        self.prev = None # Positions before the last tick; nothing to interpolate from yet
+        self.pressed = [] # Key-downs waiting for the next tick
         
     def run(self):
+        last = time.perf_counter()
         while True:
-            self.frame_count += 1
-            dt = self.clock.tick(FPS)
+            if not FIXED_TIMESTEP:
+                self.clock.tick(FPS) # Physics speed follows the frame rate
+            now = time.perf_counter()
+            elapsed, last = (now - last) * 1000, now
             self.handle_events()
             
-            if self.state == 'menu':
-                self.draw_menu()
-            elif self.state == 'playing':
-                self.update_game()
-                self.draw_game()
-                self.audio.update_music()
-            elif self.state == 'game_over':
-                self.draw_game_over()
+            if FIXED_TIMESTEP:
+                alpha = self.advance(elapsed)
+            else:
+                self.tick()
+                alpha = 1.0
+            self.render(alpha)
             
             pygame.display.flip()
+            if FIXED_TIMESTEP and RENDER_FPS:
+                self.clock.tick(RENDER_FPS)
+
+    def advance(self, ms):
+        """Bank ms of real time, run the ticks it pays for and return how far into the next tick we are"""
+        self.lag = min(self.lag + ms, MAX_CATCHUP * TICK_MS)
+        while self.lag >= TICK_MS:
+            self.lag -= TICK_MS
+            self.tick()
+        return self.lag / TICK_MS
+
+    def tick(self):
+        """One 1/FPS step of game logic"""
+        self.frame_count += 1
+        if self.state == 'playing':
+            pressed, self.pressed = self.pressed, []
+            for key in pressed:
+                self.press_key(key)
+            self.prev = self.positions()
+            self.update_game()
+            self.update_particles()
+            self.audio.update_music()
+
+    def positions(self):
+        p = self.player
+        return p.x, p.y, self.cam_x, [(e['x'], e['y']) for e in self.level_data.enemies]
+
+    def render(self, alpha=1.0):
+        """Draw the current state, or alpha of the way from the previous tick to it"""
+        if self.state == 'menu':
+            self.draw_menu()
+        elif self.state == 'playing':
+            if self.prev is None or alpha >= 1.0:
+                self.draw_game()
+                return
+            # Draw from blended positions, then put the simulated ones back
+            p, enemies = self.player, self.level_data.enemies
+            px, py, cam, spots = self.prev
+            nx, ny, ncam, now = self.positions()
+            p.x, p.y = px + (nx - px) * alpha, py + (ny - py) * alpha
+            self.cam_x = cam + (ncam - cam) * alpha
+            for e, (ex, ey), (fx, fy) in zip(enemies, spots, now):
+                e['x'], e['y'] = ex + (fx - ex) * alpha, ey + (fy - ey) * alpha
+            self.draw_game()
+            p.x, p.y, self.cam_x = nx, ny, ncam
+            for e, (fx, fy) in zip(enemies, now):
+                e['x'], e['y'] = fx, fy
+        elif self.state == 'game_over':
+            self.draw_game_over()
             
     def handle_events(self):
         for e in pygame.event.get():
@@ -496,22 +592,25 @@ class Game:
                         self.audio.play('coin')
                         self.reset_level()
                 elif self.state == 'playing':
-                    if e.key == pygame.K_z or e.key == pygame.K_SPACE:
-                         # Coyote time allows jumping shortly after leaving ground
-                         if self.player.on_ground or self.player.coyote_timer > 0:
-                             self.player.vy = JUMP_FORCE
-                             self.audio.play('jump_big' if self.player.big else 'jump')
-                             self.player.coyote_timer = 0
-                             self.player.on_ground = False
-                    if e.key == pygame.K_x:
-                        if self.player.fire:
-                             self.fireball()
-                    if e.key == pygame.K_ESCAPE:
-                        self.state = 'menu'
+                    self.pressed.append(e.key) # Applied at the start of the next tick
                 elif self.state == 'game_over':
                      if e.key == pygame.K_RETURN:
                          self.state = 'menu'
 
+    def press_key(self, key):
+        if key == pygame.K_z or key == pygame.K_SPACE:
+             # Coyote time allows jumping shortly after leaving ground
+             if self.player.on_ground or self.player.coyote_timer > 0:
+                 self.player.vy = JUMP_FORCE
+                 self.audio.play('jump_big' if self.player.big else 'jump')
+                 self.player.coyote_timer = 0
+                 self.player.on_ground = False
+        if key == pygame.K_x:
+            if self.player.fire:
+                 self.fireball()
+        if key == pygame.K_ESCAPE:
+            self.state = 'menu'
+
     def fireball(self):
         if len(self.player.fireballs) < 2:
             self.player.fireballs.append({
@@ -746,6 +845,13 @@ class Game:
         self.player.vy = JUMP_FORCE
         self.audio.play('die')
         
+    def update_particles(self):
+        for part in self.particles[:]:
+            part['life'] -= 1
+            part['y'] -= 1
+            if part['life'] <= 0:
+                self.particles.remove(part)
+
     def add_particle(self, x, y, ptype, val):
         self.particles.append({'x': x, 'y': y, 'type': ptype, 'val': val, 'life': 60})
 
@@ -791,7 +897,7 @@ class Game:
         
         cam = self.cam_x
         start_col = int(cam // TILE)
-        end_col = start_col + (SCREEN_W // TILE) + 2
+        end_col = start_col + (self.screen.get_width() // TILE) + 2
         
         # Scenery
         for type_name, x, y in ld.decor:
@@ -803,12 +909,24 @@ class Game:
             draw_castle(self.screen, ld.castle_x - cam, (LEVEL_HEIGHT_TILES-5)*TILE - 40)
             
         # Tiles
-        for x in range(start_col, min(end_col, LEVEL_WIDTH_TILES)):
-            for y in range(LEVEL_HEIGHT_TILES):
-                t = ld.tiles[y][x]
-                if t == 1: draw_block(self.screen, x*TILE - cam, y*TILE, 'ground')
-                elif t == 2: draw_block(self.screen, x*TILE - cam, y*TILE, 'brick')
-                elif t == 3: draw_block(self.screen, x*TILE - cam, y*TILE, 'q_block', self.frame_count)
+        if TILE_ATLAS:
+            # One batched blit of atlas cells for everything on screen
+            sheet = self.atlas.surface
+            areas = self.atlas.tile_areas(self.frame_count)
+            batch = []
+            for x in range(start_col, min(end_col, LEVEL_WIDTH_TILES)):
+                sx = int(x*TILE - cam)
+                for y in range(LEVEL_HEIGHT_TILES):
+                    area = areas.get(ld.tiles[y][x])
+                    if area: batch.append((sheet, (sx, y*TILE), area))
+            self.screen.blits(batch, doreturn=False)
+        else:
+            for x in range(start_col, min(end_col, LEVEL_WIDTH_TILES)):
+                for y in range(LEVEL_HEIGHT_TILES):
+                    t = ld.tiles[y][x]
+                    if t == 1: draw_block(self.screen, x*TILE - cam, y*TILE, 'ground')
+                    elif t == 2: draw_block(self.screen, x*TILE - cam, y*TILE, 'brick')
+                    elif t == 3: draw_block(self.screen, x*TILE - cam, y*TILE, 'q_block', self.frame_count)
         
         # Pipes
         for px, py, ph in ld.pipes:
@@ -840,12 +958,7 @@ class Game:
              pygame.draw.circle(self.screen, C_FIREBALL, (int(f['x'] - cam), int(f['y'])), 6)
 
         # Particles
-        for part in self.particles[:]:
-            part['life'] -= 1
-            part['y'] -= 1
-            if part['life'] <= 0:
-                self.particles.remove(part)
-                continue
+        for part in self.particles:
             if part['type'] == 'text':
                 txt = self.hud_font.render(str(part['val']), True, C_WHITE)
                 self.screen.blit(txt, (part['x'] - cam, part['y']))
@@ -859,7 +972,138 @@ class Game:
         self.screen.blit(hud_coins, (300, 20))
         self.screen.blit(hud_world, (500, 20))
 
+# ─── Self-test / Benchmark (--selftest, --bench) ─────────────────────────────
+def _headless_game(seed=11):
+    import os
+    os.environ.setdefault('SDL_VIDEODRIVER', 'dummy')
+    os.environ.setdefault('SDL_AUDIODRIVER', 'dummy')
+    game = Game()
+    game.state = 'playing'
+    # Dense level: every empty cell above the ground becomes a block
+    rng = random.Random(seed)
+    tiles = game.level_data.tiles
+    for y in range(2, LEVEL_HEIGHT_TILES - 2):
+        for x in range(LEVEL_WIDTH_TILES):
+            if tiles[y][x] == 0:
+                tiles[y][x] = rng.choice((1, 2, 3))
+    return game
+
+def selftest_atlas():
+    """Atlas blits must be pixel-identical to drawing every tile"""
+    global TILE_ATLAS
+    game = _headless_game()
+    for cam, frame in ((0, 0), (333.5, 7), (1024.25, 23), (4000, 40), (8.75, 55)):
+        game.cam_x, game.frame_count = cam, frame
+        # pygame rounds a float outline rect differently from a fill, so the
+        # half-visible leftmost column can differ by a pixel at subpixel cams
+        left = 0 if cam == int(cam) else TILE
+        view = pygame.Rect(left, 0, SCREEN_W - left, SCREEN_H)
+        shots = []
+        for TILE_ATLAS in (False, True):
+            game.draw_game()
+            shots.append(pygame.image.tostring(game.screen.subsurface(view), 'RGB'))
+        assert shots[0] == shots[1], (cam, frame)
+    TILE_ATLAS = True
+    print("tile atlas selftest ok")
+
+def benchmark_atlas(frames=120):
+    """draw_game ms/frame on a dense level, procedural vs atlas, at 1x and 4x window scale"""
+    import time
+    global TILE_ATLAS
+    game = _headless_game()
+    print(f"{'scale':<8}{'procedural ms':>15}{'atlas ms':>10}")
+    for scale in (1, 4):
+        game.screen = pygame.Surface((SCREEN_W * scale, SCREEN_H * scale)).convert()
+        times = []
+        for TILE_ATLAS in (False, True):
+            t0 = time.perf_counter()
+            for f in range(frames):
+                game.frame_count = f
+                game.cam_x = (f * 37) % ((LEVEL_WIDTH_TILES - 16 * scale) * TILE)
+                game.draw_game()
+            times.append((time.perf_counter() - t0) * 1000 / frames)
+        print(f"{str(scale) + 'x':<8}{times[0]:>15.2f}{times[1]:>10.2f}")
+    TILE_ATLAS = True
+
+def _bot_input(tick):
+    """Held keys and fresh key-downs for a tick: run right in bursts, jumping every 45 ticks"""
+    held = [pygame.K_RIGHT]
+    if tick % 300 < 200: held.append(pygame.K_x)
+    if tick % 45 < 20: held.append(pygame.K_z)
+    return held, ([pygame.K_z] if tick % 45 == 0 else [])
+
+def _tick_state(game):
+    p = game.player
+    return (p.x, p.y, p.vx, p.vy, p.dead, p.score, game.cam_x, len(game.particles),
+            tuple((e['x'], e['y'], e['alive']) for e in game.level_data.enemies))
+
+def selftest_timestep(ticks=900):
+    """Positions after N ticks must not depend on how often frames are drawn"""
+    class Held(frozenset):
+        def __getitem__(self, key): return key in self
+
+    game = _headless_game()
+    get_pressed = pygame.key.get_pressed
+    pygame.key.get_pressed = lambda: Held(_bot_input(game.frame_count)[0])
+    shots = {}
+    rng = random.Random(44)
+    # Frame lengths in ms; None steps one tick per drawn frame like the old clock-paced loop
+    rates = {'per frame': None, '30 Hz': lambda: 1000 / 30, '60 Hz': lambda: TICK_MS, '144 Hz': lambda: 1000 / 144,
+             '240 Hz': lambda: 1000 / 240, 'jitter': lambda: rng.uniform(0.3, 45), 'slow': lambda: 120.0}
+    try:
+        for label, frame_ms in rates.items():
+            game.reset_level()
+            game.state, game.frame_count, game.lag = 'playing', 0, 0.0
+            run, real, worst = [], 0.0, 0
+
+            def scripted_tick():
+                game.pressed.extend(_bot_input(game.frame_count + 1)[1])
+                Game.tick(game)
+                if game.frame_count % 100 == 0: run.append(_tick_state(game))
+            game.tick = scripted_tick
+
+            def draw_checked():
+                # Drawn positions lie between the last two ticks
+                (px, _, cam, _), (nx, _, ncam, _) = game.prev, game.positions()
+                assert min(px, nx) <= game.player.x <= max(px, nx) and min(cam, ncam) <= game.cam_x <= max(cam, ncam)
+            draw_game = game.draw_game
+            game.draw_game = lambda: (draw_checked() if game.prev else None, draw_game())
+
+            while game.frame_count < ticks:
+                before = game.frame_count
+                if frame_ms is None:
+                    game.tick()
+                    alpha = 1.0
+                else:
+                    dt = frame_ms()
+                    real += dt
+                    alpha = game.advance(dt)
+                worst = max(worst, game.frame_count - before)
+                state = _tick_state(game)
+                game.render(alpha)
+                assert _tick_state(game) == state # Drawing never disturbs the simulation
+            del game.tick, game.draw_game
+            assert worst <= MAX_CATCHUP
+            if frame_ms and label != 'slow':
+                assert abs(game.frame_count - real / TICK_MS) <= MAX_CATCHUP, (label, game.frame_count, real)
+            shots[label] = run
+    finally:
+        pygame.key.get_pressed = get_pressed
+    base = shots['per frame']
+    assert len(base) == ticks // 100 and base[0] != base[-1]
+    for label, run in shots.items():
+        assert run == base, label
+    print(f"fixed timestep ok ({ticks} ticks at {len(rates)} draw rates)")
+
 # ─── Entry Point ─────────────────────────────────────────────────────────────
 if __name__ == '__main__':
-    game = Game()
-    game.run()
+    if '--selftest' in sys.argv:
+        selftest_atlas()
+        selftest_timestep()
+    elif '--bench' in sys.argv:
+        benchmark_atlas()
+    else:
+        if '--uncapped' in sys.argv:
+            RENDER_FPS = 0
+        game = Game()
+        game.run()
@@ -2,6 +2,7 @@ import pygame
 import math
 import sys
 import random
+import time
 
 # --- CONFIGURATION ---
 WIDTH, HEIGHT = 800, 600
@@ -32,6 +33,20 @@ MAX_SPEED = 14               # Max ground speed
 SPRINT_MULT = 1.6            # Sprint multiplier (shift)
 # Analog-style turning when not using mouse
 KEY_TURN_SPEED = 0.06        # Keyboard rotation speed (C-buttons equivalent)
+# Procedural materials
+CHECKER_MATERIALS = True     # Checkered floors as one material quad (False = per-tile cubes)
+NEAR_CLIP = 5                # Camera-space near plane
+# Collision
+MARIO_RADIUS = 16            # Body sphere radius
+STEP_HEIGHT = 26             # Ledges up to this height are stepped onto (castle stairs rise 25)
+SLOPE_LIMIT = 0.64           # Min surface normal Y that counts as walkable floor (~50 degrees)
+BASE_FLOOR_Y = 0             # Old implicit ground plane, kept under every course
+BVH_LEAF_SIZE = 4            # Triangles per BVH leaf
+# Trigger volumes
+TRIGGER_CELL = 128           # XZ cell size of the trigger grid
+STAR_RADIUS = 60             # Star pickup sphere
+COIN_RADIUS = 40             # Coin / red coin pickup sphere
+PAINTING_REACH = 150         # Half-width of the XZ box in front of a painting
 
 # --- COLORS ---
 DD_SKY_TOP = (26, 26, 77)
@@ -102,10 +117,18 @@ class Vector3:
     def __init__(self, x, y, z):
         self.x = x; self.y = y; self.z = z
 
+class CheckerMaterial:
+    """World-space checkerboard, evaluated per scanline span by the rasterizer"""
+    __slots__ = ['period', 'color_a', 'color_b', 'origin_x', 'origin_z']
+    def __init__(self, period, color_a, color_b, origin_x=0, origin_z=0):
+        self.period = period; self.color_a = color_a; self.color_b = color_b
+        self.origin_x = origin_x; self.origin_z = origin_z
+
 class Face:
-    __slots__ = ['indices', 'color', 'avg_z', 'normal']
-    def __init__(self, indices, color):
+    __slots__ = ['indices', 'color', 'avg_z', 'normal', 'material']
+    def __init__(self, indices, color, material=None):
         self.indices = indices; self.color = color; self.avg_z = 0; self.normal = None
+        self.material = material
 
 class Mesh:
     def __init__(self, x=0, y=0, z=0):
@@ -136,6 +159,27 @@ class Mesh:
             face.normal=(nx/l,ny/l,nz/l) if l!=0 else (0,0,1)
             self.faces.append(face)
 
+    def add_checker_floor(self, x_range, z_range, size, oy, color_a, color_b, thickness=10):
+        """Checkered ground over tiles x_range x z_range (tile centers at i*size), top at oy"""
+        x0, x1 = x_range
+        z0, z1 = z_range
+        if not CHECKER_MATERIALS:
+            for x in range(x0, x1):
+                for z in range(z0, z1):
+                    c = color_a if (x+z)%2==0 else color_b
+                    self.add_cube(size, thickness, size, x*size, oy-thickness/2, z*size, c)
+            return
+        half = size / 2
+        min_x, max_x = x0*size - half, (x1-1)*size + half
+        min_z, max_z = z0*size - half, (z1-1)*size + half
+        si = len(self.vertices)
+        for vx, vz in [(min_x, min_z), (max_x, min_z), (max_x, max_z), (min_x, max_z)]:
+            self.vertices.append(Vector3(vx, oy, vz))
+        face = Face([si, si+1, si+2, si+3], color_a,
+                    CheckerMaterial(size, color_a, color_b, -half, -half))
+        face.normal = (0, 1, 0)
+        self.faces.append(face)
+
     def add_ramp(self, w, h, d, ox, oy, oz, color):
         """Sloped surface - front is higher"""
         si = len(self.vertices)
@@ -193,6 +237,226 @@ class Mesh:
             self.faces.append(face)
 
 
+# ================================================================
+# COLLISION - triangle BVH + sphere movement
+# ================================================================
+def extract_triangles(mesh):
+    """World-space collision triangles with outward unit normals.
+
+    Mesh faces are wound so the vertex cross product points inward, so the
+    outward normal is its negation. Returns [(a, b, c, n), ...].
+    """
+    m_cos = math.cos(mesh.yaw); m_sin = math.sin(mesh.yaw)
+    world = [(v.x*m_cos - v.z*m_sin + mesh.x, v.y + mesh.y, v.x*m_sin + v.z*m_cos + mesh.z)
+             for v in mesh.vertices]
+    tris = []
+    for face in mesh.faces:
+        pts = [world[i] for i in face.indices]
+        for k in range(1, len(pts) - 1):
+            a, b, c = pts[0], pts[k], pts[k+1]
+            ux, uy, uz = b[0]-a[0], b[1]-a[1], b[2]-a[2]
+            vx, vy, vz = c[0]-a[0], c[1]-a[1], c[2]-a[2]
+            nx = -(uy*vz - uz*vy); ny = -(uz*vx - ux*vz); nz = -(ux*vy - uy*vx)
+            l = math.sqrt(nx*nx + ny*ny + nz*nz)
+            if l == 0:
+                continue
+            tris.append((a, b, c, (nx/l, ny/l, nz/l)))
+    return tris
+
+def closest_point_on_triangle(p, a, b, c):
+    """Closest point to p on triangle abc (Ericson, Real-Time Collision Detection 5.1.5)"""
+    abx, aby, abz = b[0]-a[0], b[1]-a[1], b[2]-a[2]
+    acx, acy, acz = c[0]-a[0], c[1]-a[1], c[2]-a[2]
+    apx, apy, apz = p[0]-a[0], p[1]-a[1], p[2]-a[2]
+    d1 = abx*apx + aby*apy + abz*apz
+    d2 = acx*apx + acy*apy + acz*apz
+    if d1 <= 0 and d2 <= 0:
+        return a
+    bpx, bpy, bpz = p[0]-b[0], p[1]-b[1], p[2]-b[2]
+    d3 = abx*bpx + aby*bpy + abz*bpz
+    d4 = acx*bpx + acy*bpy + acz*bpz
+    if d3 >= 0 and d4 <= d3:
+        return b
+    vc = d1*d4 - d3*d2
+    if vc <= 0 and d1 >= 0 and d3 <= 0:
+        t = d1 / (d1 - d3)
+        return (a[0]+abx*t, a[1]+aby*t, a[2]+abz*t)
+    cpx, cpy, cpz = p[0]-c[0], p[1]-c[1], p[2]-c[2]
+    d5 = abx*cpx + aby*cpy + abz*cpz
+    d6 = acx*cpx + acy*cpy + acz*cpz
+    if d6 >= 0 and d5 <= d6:
+        return c
+    vb = d5*d2 - d1*d6
+    if vb <= 0 and d2 >= 0 and d6 <= 0:
+        t = d2 / (d2 - d6)
+        return (a[0]+acx*t, a[1]+acy*t, a[2]+acz*t)
+    va = d3*d6 - d5*d4
+    if va <= 0 and (d4 - d3) >= 0 and (d5 - d6) >= 0:
+        t = (d4 - d3) / ((d4 - d3) + (d5 - d6))
+        return (b[0]+(c[0]-b[0])*t, b[1]+(c[1]-b[1])*t, b[2]+(c[2]-b[2])*t)
+    denom = 1.0 / (va + vb + vc)
+    v = vb * denom; w = vc * denom
+    return (a[0]+abx*v+acx*w, a[1]+aby*v+acy*w, a[2]+abz*v+acz*w)
+
+class CollisionBVH:
+    """Static bounding volume hierarchy over a level's collision triangles.
+
+    Nodes are flat lists [min_x, min_y, min_z, max_x, max_y, max_z, left, right, first, count];
+    leaves have left == -1 and own tris[first:first+count].
+    """
+    def __init__(self, tris):
+        self.nodes = []
+        boxes = []
+        for a, b, c, n in tris:
+            boxes.append((min(a[0], b[0], c[0]), min(a[1], b[1], c[1]), min(a[2], b[2], c[2]),
+                          max(a[0], b[0], c[0]), max(a[1], b[1], c[1]), max(a[2], b[2], c[2])))
+        order = list(range(len(tris)))
+        if order:
+            self._build(order, boxes)
+        self.tris = [tris[i] for i in order]
+        self.boxes = [boxes[i] for i in order]
+
+    def _build(self, order, boxes, lo=0, hi=None):
+        if hi is None:
+            hi = len(order)
+        bx = [boxes[i] for i in order[lo:hi]]
+        node = [min(b[0] for b in bx), min(b[1] for b in bx), min(b[2] for b in bx),
+                max(b[3] for b in bx), max(b[4] for b in bx), max(b[5] for b in bx), -1, -1, lo, hi - lo]
+        idx = len(self.nodes)
+        self.nodes.append(node)
+        if hi - lo <= BVH_LEAF_SIZE:
+            return idx
+        # Median split on the longest axis of the node box
+        axis = max(range(3), key=lambda k: node[k+3] - node[k])
+        order[lo:hi] = sorted(order[lo:hi], key=lambda i: boxes[i][axis] + boxes[i][axis+3])
+        mid = (lo + hi) // 2
+        node[6] = self._build(order, boxes, lo, mid)
+        node[7] = self._build(order, boxes, mid, hi)
+        return idx
+
+    def query_box(self, min_x, min_y, min_z, max_x, max_y, max_z):
+        """Indices of triangles whose bounds overlap the box"""
+        out = []
+        if not self.nodes:
+            return out
+        nodes = self.nodes; boxes = self.boxes
+        stack = [0]
+        while stack:
+            n = nodes[stack.pop()]
+            if (n[0] > max_x or n[3] < min_x or n[1] > max_y or n[4] < min_y
+                    or n[2] > max_z or n[5] < min_z):
+                continue
+            if n[6] < 0:
+                for i in range(n[8], n[8] + n[9]):
+                    b = boxes[i]
+                    if not (b[0] > max_x or b[3] < min_x or b[1] > max_y or b[4] < min_y
+                            or b[2] > max_z or b[5] < min_z):
+                        out.append(i)
+            else:
+                stack.append(n[6]); stack.append(n[7])
+        return out
+
+class CollisionWorld:
+    """Level collision: triangles extracted from the level Mesh, indexed by a BVH"""
+    def __init__(self, mesh):
+        self.bvh = CollisionBVH(extract_triangles(mesh))
+
+    def floor_height(self, x, z, max_y, default=BASE_FLOOR_Y):
+        """Highest walkable surface at (x, z) that is not above max_y"""
+        best = default
+        bvh = self.bvh
+        for i in bvh.query_box(x, best, z, x, max_y, z):
+            a, b, c, n = bvh.tris[i]
+            if n[1] < SLOPE_LIMIT:
+                continue
+            # XZ barycentric point-in-triangle, then plane height
+            d = (b[2]-c[2])*(a[0]-c[0]) + (c[0]-b[0])*(a[2]-c[2])
+            if d == 0:
+                continue
+            l1 = ((b[2]-c[2])*(x-c[0]) + (c[0]-b[0])*(z-c[2])) / d
+            l2 = ((c[2]-a[2])*(x-c[0]) + (a[0]-c[0])*(z-c[2])) / d
+            l3 = 1 - l1 - l2
+            if l1 < -1e-9 or l2 < -1e-9 or l3 < -1e-9:
+                continue
+            h = l1*a[1] + l2*b[1] + l3*c[1]
+            if best < h <= max_y:
+                best = h
+        return best
+
+    def sphere_contacts(self, cx, cy, cz, r):
+        """(nx, ny, nz, depth) pushes for front-facing triangles the sphere overlaps"""
+        out = []
+        bvh = self.bvh
+        p = (cx, cy, cz)
+        for i in bvh.query_box(cx - r, cy - r, cz - r, cx + r, cy + r, cz + r):
+            a, b, c, n = bvh.tris[i]
+            # One-sided: ignore triangles seen from behind (inside overlapping props)
+            if (cx-a[0])*n[0] + (cy-a[1])*n[1] + (cz-a[2])*n[2] < 0:
+                continue
+            q = closest_point_on_triangle(p, a, b, c)
+            dx, dy, dz = cx - q[0], cy - q[1], cz - q[2]
+            dist = math.sqrt(dx*dx + dy*dy + dz*dz)
+            if dist >= r:
+                continue
+            if dist > 1e-6:
+                out.append((dx/dist, dy/dist, dz/dist, r - dist))
+            else:
+                out.append((n[0], n[1], n[2], r))
+        return out
+
+    def move_sphere(self, x, y, z, vx, vz):
+        """Sweep Mario's body sphere horizontally from feet position (x, y, z).
+
+        The sphere rides STEP_HEIGHT above the feet so low ledges pass under it
+        and are climbed by the floor snap instead. The sweep is sub-stepped to
+        half a radius so walls cannot be skipped, and blocking velocity is
+        removed along each contact normal (slide response).
+        Returns (x, z, vx, vz).
+        """
+        r = MARIO_RADIUS
+        cy = y + STEP_HEIGHT + r
+        steps = max(1, int(math.ceil(math.sqrt(vx*vx + vz*vz) / (r * 0.5))))
+        sx, sz = vx / steps, vz / steps
+        for _ in range(steps):
+            x += sx; z += sz
+            for _ in range(3):
+                contacts = self.sphere_contacts(x, cy, z, r)
+                pushed = False
+                for nx, ny, nz, depth in contacts:
+                    if ny >= SLOPE_LIMIT or ny <= -SLOPE_LIMIT:
+                        continue    # floors snap, ceilings stop jumps (Mario.update)
+                    h = math.sqrt(nx*nx + nz*nz)
+                    hx, hz = nx / h, nz / h
+                    x += hx * depth; z += hz * depth
+                    pushed = True
+                    # Slide: drop the velocity component into the wall
+                    for_v = vx*hx + vz*hz
+                    if for_v < 0:
+                        vx -= hx*for_v; vz -= hz*for_v
+                    for_s = sx*hx + sz*hz
+                    if for_s < 0:
+                        sx -= hx*for_s; sz -= hz*for_s
+                if not pushed:
+                    break
+        return x, z, vx, vz
+
+    def hits_ceiling(self, x, y, z):
+        """True if the body sphere at feet position (x, y, z) touches a ceiling"""
+        for nx, ny, nz, depth in self.sphere_contacts(x, y + STEP_HEIGHT + MARIO_RADIUS, z, MARIO_RADIUS):
+            if ny <= -SLOPE_LIMIT:
+                return True
+        return False
+
+COLLISION_CACHE = {}
+
+def get_level_collision(level_id, mesh):
+    """Level BVHs are built once and reused on every reload of the level"""
+    world = COLLISION_CACHE.get(level_id)
+    if world is None:
+        world = COLLISION_CACHE[level_id] = CollisionWorld(mesh)
+    return world
+
+
 # ================================================================
 # MARIO CHARACTER
 # ================================================================
@@ -234,13 +498,34 @@ class Mario(Mesh):
         self.add_cube(4,4,1,6,24,-9,WHITE)
         self.add_cube(2,2,1,5,24,-10,EYE_BLUE)
 
-    def update(self, floor_y=0):
+    def move(self, world, vel_x, vel_z):
+        """Horizontal move with wall slide; returns the slid velocity"""
+        if world is None:
+            self.x += vel_x; self.z += vel_z
+            return vel_x, vel_z
+        self.x, self.z, vel_x, vel_z = world.move_sphere(self.x, self.y, self.z, vel_x, vel_z)
+        return vel_x, vel_z
+
+    def update(self, world=None, floor_y=0):
         self.dy -= GRAVITY
+        if world is not None:
+            # Stand on anything up to a step above the feet; stick to the
+            # ground when walking down ramps and stairs
+            floor_y = world.floor_height(self.x, self.z, self.y + STEP_HEIGHT)
+            if not self.is_jumping and self.dy <= 0 and floor_y >= self.y - STEP_HEIGHT:
+                self.y = floor_y
+                self.dy = 0
+                return
         self.y += self.dy
+        if self.dy > 0 and world is not None and world.hits_ceiling(self.x, self.y, self.z):
+            self.y -= self.dy
+            self.dy = 0
         if self.y < floor_y:
             self.y = floor_y
             self.dy = 0
             self.is_jumping = False
+        elif world is not None:
+            self.is_jumping = True   # walked off a ledge: airborne
 
 
 # ================================================================
@@ -287,6 +572,87 @@ class Painting:
         self.mesh.add_cube(70, 70, 4, 0, 0, -3, color)
 
 
+# ================================================================
+# TRIGGER VOLUMES - collectibles and warps in a uniform XZ grid
+# ================================================================
+class Trigger:
+    """Sphere (r) or box (hx, hy, hz) volume with a payload and enter/exit callbacks"""
+    __slots__ = ['x', 'y', 'z', 'r', 'hx', 'hy', 'hz', 'payload', 'on_enter', 'on_exit', 'order', 'cells']
+    def __init__(self, x, y, z, payload, on_enter, on_exit, r=None, hx=0, hy=0, hz=0):
+        self.x = x; self.y = y; self.z = z
+        self.r = r; self.hx = hx; self.hy = hy; self.hz = hz
+        self.payload = payload; self.on_enter = on_enter; self.on_exit = on_exit
+        self.order = 0; self.cells = []
+
+    def contains(self, x, y, z):
+        dx = x - self.x; dy = y - self.y; dz = z - self.z
+        if self.r is not None:
+            return math.sqrt(dx*dx + dy*dy + dz*dz) < self.r
+        return abs(dx) < self.hx and abs(dy) < self.hy and abs(dz) < self.hz
+
+class TriggerGrid:
+    """Triggers bucketed into every XZ cell their bounds touch.
+
+    update() only tests the bucket of the cell Mario is in, and remove()
+    only touches the few buckets the trigger was filed under.
+    """
+    def __init__(self, cell=TRIGGER_CELL):
+        self.cell = cell
+        self.cells = {}
+        self.inside = {}    # triggers currently containing Mario (ordered set)
+        self.count = 0
+
+    def _add(self, t, ext_x, ext_z):
+        c = self.cell
+        t.order = self.count
+        self.count += 1
+        for gx in range(math.floor((t.x - ext_x) / c), math.floor((t.x + ext_x) / c) + 1):
+            for gz in range(math.floor((t.z - ext_z) / c), math.floor((t.z + ext_z) / c) + 1):
+                self.cells.setdefault((gx, gz), {})[t] = None
+                t.cells.append((gx, gz))
+        return t
+
+    def add_sphere(self, x, y, z, r, payload, on_enter=None, on_exit=None):
+        return self._add(Trigger(x, y, z, payload, on_enter, on_exit, r=r), r, r)
+
+    def add_box(self, x, y, z, hx, hy, hz, payload, on_enter=None, on_exit=None):
+        return self._add(Trigger(x, y, z, payload, on_enter, on_exit, hx=hx, hy=hy, hz=hz), hx, hz)
+
+    def remove(self, t):
+        for key in t.cells:
+            bucket = self.cells[key]
+            del bucket[t]
+            if not bucket:
+                del self.cells[key]
+        t.cells = []
+        self.inside.pop(t, None)
+
+    def query(self, x, y, z):
+        bucket = self.cells.get((math.floor(x / self.cell), math.floor(z / self.cell)))
+        if not bucket:
+            return []
+        return [t for t in bucket if t.contains(x, y, z)]
+
+    def update(self, x, y, z):
+        """Fire on_exit for volumes Mario left and on_enter for ones he entered"""
+        now = self.query(x, y, z)
+        if self.inside:
+            still = set(now)
+            for t in [t for t in self.inside if t not in still]:
+                del self.inside[t]
+                if t.on_exit:
+                    t.on_exit(t)
+        for t in now:
+            if t.cells and t not in self.inside:
+                self.inside[t] = None
+                if t.on_enter:
+                    t.on_enter(t)
+
+    def active(self):
+        """Triggers Mario is inside, in registration order"""
+        return sorted(self.inside, key=lambda t: t.order)
+
+
 # ================================================================
 # LEVEL BUILDERS
 # ================================================================
@@ -295,10 +661,7 @@ def build_castle_grounds():
     """Castle Grounds - exterior courtyard, moat, bridge, castle front"""
     m = Mesh()
     # Main ground
-    for x in range(-8, 8):
-        for z in range(-8, 8):
-            color = CHECKER_LIGHT if (x+z)%2==0 else CHECKER_DARK
-            m.add_cube(200,10,200, x*200,-5, z*200, color)
+    m.add_checker_floor((-8, 8), (-8, 8), 200, 0, CHECKER_LIGHT, CHECKER_DARK)
     # Moat (water around castle)
     for i in range(-4, 5):
         m.add_cube(200, 6, 200, i*200, -8, -800, WATER_BLUE)
@@ -347,10 +710,7 @@ def build_castle_interior_f1():
     """Castle Interior - First Floor / Main Hall"""
     m = Mesh()
     # Floor
-    for x in range(-5, 5):
-        for z in range(-5, 5):
-            color = FLOOR_TILE if (x+z)%2==0 else FLOOR_TILE_ALT
-            m.add_cube(200, 10, 200, x*200, -5, z*200, color)
+    m.add_checker_floor((-5, 5), (-5, 5), 200, 0, FLOOR_TILE, FLOOR_TILE_ALT)
     # Red carpet
     for z in range(-4, 4):
         m.add_cube(120, 2, 200, 0, 1, z*200, CARPET_RED)
@@ -401,10 +761,7 @@ def build_castle_basement():
     """Castle Basement - dark corridors, leads to more levels"""
     m = Mesh()
     # Dark floor
-    for x in range(-6, 6):
-        for z in range(-6, 6):
-            color = DARK_STONE if (x+z)%2==0 else DARK_GREY
-            m.add_cube(200, 10, 200, x*200, -5, z*200, color)
+    m.add_checker_floor((-6, 6), (-6, 6), 200, 0, DARK_STONE, DARK_GREY)
     # Walls
     m.add_cube(2400, 300, 40, 0, 150, -1200, DARK_STONE)
     m.add_cube(2400, 300, 40, 0, 150, 1200, DARK_STONE)
@@ -440,10 +797,7 @@ def build_castle_basement():
 def build_castle_upper():
     """Castle Upper Floor - Floor 2"""
     m = Mesh()
-    for x in range(-4, 4):
-        for z in range(-4, 4):
-            color = FLOOR_TILE if (x+z)%2==0 else FLOOR_TILE_ALT
-            m.add_cube(200, 10, 200, x*200, -5, z*200, color)
+    m.add_checker_floor((-4, 4), (-4, 4), 200, 0, FLOOR_TILE, FLOOR_TILE_ALT)
     m.add_cube(1600, 350, 40, 0, 175, -800, CASTLE_WALL)
     m.add_cube(1600, 350, 40, 0, 175, 800, CASTLE_WALL)
     m.add_cube(40, 350, 1600, -800, 175, 0, CASTLE_WALL)
@@ -492,10 +846,7 @@ def build_bob_omb_battlefield():
     """Course 1: Bob-omb Battlefield"""
     m = Mesh()
     # Green fields
-    for x in range(-6, 6):
-        for z in range(-6, 6):
-            c = CHECKER_LIGHT if (x+z)%2==0 else CHECKER_DARK
-            m.add_cube(200,10,200, x*200,-5,z*200, c)
+    m.add_checker_floor((-6, 6), (-6, 6), 200, 0, CHECKER_LIGHT, CHECKER_DARK)
     # Mountain (center)
     m.add_cube(400,200,400, 0,100,0, DARK_BROWN)
     m.add_cube(300,150,300, 0,275,0, BROWN)
@@ -630,10 +981,7 @@ def build_big_boos_haunt():
     """Course 5: Big Boo's Haunt"""
     m = Mesh()
     # Courtyard (dark)
-    for x in range(-4,4):
-        for z in range(-4,4):
-            c = DARK_GREY if (x+z)%2==0 else BLACK
-            m.add_cube(200,10,200, x*200,-5,z*200, c)
+    m.add_checker_floor((-4, 4), (-4, 4), 200, 0, DARK_GREY, BLACK)
     # Haunted mansion
     m.add_cube(400,300,400, 0,150,0, DARK_PURPLE)
     # Roof
@@ -672,10 +1020,7 @@ def build_hazy_maze_cave():
     """Course 6: Hazy Maze Cave"""
     m = Mesh()
     # Cave floor (dark)
-    for x in range(-6,6):
-        for z in range(-6,6):
-            c = DARK_STONE if (x+z)%2==0 else DARK_BROWN
-            m.add_cube(200,10,200, x*200,-5,z*200, c)
+    m.add_checker_floor((-6, 6), (-6, 6), 200, 0, DARK_STONE, DARK_BROWN)
     # Cave ceiling
     m.add_cube(2400,20,2400, 0,300,0, DARK_STONE)
     # Maze walls
@@ -710,10 +1055,7 @@ def build_lethal_lava_land():
     """Course 7: Lethal Lava Land"""
     m = Mesh()
     # Lava floor
-    for x in range(-6,6):
-        for z in range(-6,6):
-            c = LAVA_RED if (x+z)%2==0 else LAVA_ORANGE
-            m.add_cube(200,6,200, x*200,-3,z*200, c)
+    m.add_checker_floor((-6, 6), (-6, 6), 200, 0, LAVA_RED, LAVA_ORANGE, thickness=6)
     # Stone platforms over lava
     platforms = [(0,0,200),(300,0,150),(-300,0,150),(0,0,400),(500,0,100),
                  (-500,0,100),(200,0,300),(-200,0,300),(0,0,-200),(0,0,-500)]
@@ -744,10 +1086,7 @@ def build_shifting_sand_land():
     """Course 8: Shifting Sand Land"""
     m = Mesh()
     # Sand floor
-    for x in range(-6,6):
-        for z in range(-6,6):
-            c = SAND if (x+z)%2==0 else (190,160,100)
-            m.add_cube(200,10,200, x*200,-5,z*200, c)
+    m.add_checker_floor((-6, 6), (-6, 6), 200, 0, SAND, (190,160,100))
     # Pyramid (main structure)
     m.add_cube(400,300,400, 0,150,0, SAND)
     m.add_pyramid(420, 100, 0, 300, 0, (200,170,100))
@@ -814,10 +1153,7 @@ def build_snowmans_land():
     """Course 10: Snowman's Land"""
     m = Mesh()
     # Snow floor
-    for x in range(-6,6):
-        for z in range(-6,6):
-            c = SNOW_WHITE if (x+z)%2==0 else ICE_BLUE
-            m.add_cube(200,10,200, x*200,-5,z*200, c)
+    m.add_checker_floor((-6, 6), (-6, 6), 200, 0, SNOW_WHITE, ICE_BLUE)
     # Giant snowman mountain
     m.add_cube(300,200,300, 0,100,0, SNOW_WHITE)
     m.add_cube(200,150,200, 0,275,0, SNOW_WHITE)
@@ -851,10 +1187,7 @@ def build_wet_dry_world():
     """Course 11: Wet-Dry World"""
     m = Mesh()
     # Base floor
-    for x in range(-4,4):
-        for z in range(-4,4):
-            c = FLOOR_TILE if (x+z)%2==0 else FLOOR_TILE_ALT
-            m.add_cube(200,10,200, x*200,-5,z*200, c)
+    m.add_checker_floor((-4, 4), (-4, 4), 200, 0, FLOOR_TILE, FLOOR_TILE_ALT)
     # Water (variable height platforms indicated)
     m.add_cube(1600,4,1600, 0,50,0, WATER_LIGHT)
     # City structures
@@ -885,10 +1218,7 @@ def build_tall_tall_mountain():
     """Course 12: Tall, Tall Mountain"""
     m = Mesh()
     # Base
-    for x in range(-4,4):
-        for z in range(-4,4):
-            c = CHECKER_LIGHT if (x+z)%2==0 else CHECKER_DARK
-            m.add_cube(200,10,200, x*200,-5,z*200, c)
+    m.add_checker_floor((-4, 4), (-4, 4), 200, 0, CHECKER_LIGHT, CHECKER_DARK)
     # Mountain (tall!)
     m.add_cube(500,300,500, 0,150,0, BROWN)
     m.add_cube(400,250,400, 0,425,0, DARK_BROWN)
@@ -1079,10 +1409,7 @@ def build_wing_mario_rainbow():
 def build_metal_cap_cavern():
     """Secret: Cavern of the Metal Cap"""
     m = Mesh()
-    for x in range(-4,4):
-        for z in range(-4,4):
-            c = DARK_STONE if (x+z)%2==0 else DARK_GREY
-            m.add_cube(200,10,200, x*200,-5,z*200, c)
+    m.add_checker_floor((-4, 4), (-4, 4), 200, 0, DARK_STONE, DARK_GREY)
     m.add_cube(1600,20,1600, 0,250,0, DARK_STONE)
     m.add_cube(800,4,800, 0,-1,0, WATER_BLUE)
     # Metal cap switch
@@ -1169,10 +1496,7 @@ def build_bowser_fire_sea():
     """Bowser in the Fire Sea"""
     m = Mesh()
     # Lava everywhere
-    for x in range(-6,6):
-        for z in range(-6,6):
-            c = LAVA_RED if (x+z)%2==0 else LAVA_ORANGE
-            m.add_cube(200,6,200, x*200,-3,z*200, c)
+    m.add_checker_floor((-6, 6), (-6, 6), 200, 0, LAVA_RED, LAVA_ORANGE, thickness=6)
     # Platforms
     m.add_cube(200,20,200, 0,10,0, DARK_STONE)
     # Moving mesh platforms
@@ -1310,6 +1634,31 @@ UPPER_PAINTINGS = [
     {"pos": (0, 75, -790), "level": "c15_rainbow", "color": RAINBOW_R, "label": "Rainbow Ride"},
 ]
 
+LEVEL_PAINTINGS = {
+    "castle_f1": CASTLE_F1_PAINTINGS,
+    "castle_basement": BASEMENT_PAINTINGS,
+    "castle_upper": UPPER_PAINTINGS,
+}
+
+def build_level_triggers(stars, coins, on_star, on_coin):
+    """Pickup grid for a level: stars, coins and red coins as spheres"""
+    grid = TriggerGrid()
+    for star in stars:
+        if not star.collected:
+            grid.add_sphere(star.x, star.y, star.z, STAR_RADIUS, star, on_star)
+    for coin in coins:
+        if not coin.collected:
+            grid.add_sphere(coin.x, coin.y, coin.z, COIN_RADIUS, coin, on_coin)
+    return grid
+
+def build_warp_triggers(paintings, on_enter, on_exit):
+    """Painting warps as XZ boxes (any height) in front of each canvas"""
+    grid = TriggerGrid()
+    for p in paintings:
+        px, py, pz = p["pos"]
+        grid.add_box(px, py, pz, PAINTING_REACH, float('inf'), PAINTING_REACH, p, on_enter, on_exit)
+    return grid
+
 
 # ================================================================
 # RENDERER - Full FPS Camera with Pitch + Yaw + N64 Vertex Jitter
@@ -1317,6 +1666,89 @@ UPPER_PAINTINGS = [
 # N64 fixed-point vertex snapping grid (Super FX style jitter)
 N64_SNAP = 2  # Snap vertices to this grid to emulate N64 fixed-point
 
+def clip_near(verts):
+    """Sutherland-Hodgman clip of a camera-space polygon against the near plane"""
+    out = []
+    n = len(verts)
+    for i in range(n):
+        a = verts[i]; b = verts[(i+1) % n]
+        a_in = a[2] >= NEAR_CLIP; b_in = b[2] >= NEAR_CLIP
+        if a_in:
+            out.append(a)
+        if a_in != b_in:
+            t = (NEAR_CLIP - a[2]) / (b[2] - a[2])
+            out.append((a[0] + (b[0]-a[0])*t, a[1] + (b[1]-a[1])*t, NEAR_CLIP))
+    return out
+
+def material_spans(poly, material, plane_y, cam_x, cam_y, cam_z, c_cos, c_sin, p_cos, p_sin, cx, cy):
+    """Scanline-rasterize a horizontal material polygon into checker runs.
+
+    Along one screen row a horizontal plane has constant camera depth, so the
+    world position is affine in screen x and the checker edges can be solved
+    analytically instead of evaluating every pixel.
+    Returns [(y, depth, [(x0, x1, color), ...]), ...] with rows N64_SNAP tall.
+    """
+    ys = [pt[1] for pt in poly]
+    spans = []
+    n = len(poly)
+    period = material.period
+    ox, oz = material.origin_x, material.origin_z
+    for y in range(max(0, int(min(ys))), min(HEIGHT, int(max(ys))), N64_SNAP):
+        yc = y + N64_SNAP * 0.5
+        # Polygon extent on this row
+        xs = []
+        for i in range(n):
+            ax, ay = poly[i]; bx, by = poly[(i+1) % n]
+            if (ay <= yc < by) or (by <= yc < ay):
+                xs.append(ax + (yc - ay) * (bx - ax) / (by - ay))
+        if len(xs) < 2:
+            continue
+        x0 = max(0, int(min(xs))); x1 = min(WIDTH, int(max(xs)))
+        if x1 <= x0:
+            continue
+        # Camera-space ray for this row -> world ray (undo pitch, then yaw)
+        ry = -(yc - cy) / FOV
+        wy = ry*p_cos + p_sin
+        rz = -ry*p_sin + p_cos
+        if wy == 0:
+            continue
+        depth = (plane_y - cam_y) / wy
+        if depth <= 0:
+            continue
+        rx0 = (x0 - cx) / FOV; rx1 = (x1 - cx) / FOV
+        wx0 = cam_x + depth * (rx0*c_cos + rz*c_sin)
+        wz0 = cam_z + depth * (-rx0*c_sin + rz*c_cos)
+        wx1 = cam_x + depth * (rx1*c_cos + rz*c_sin)
+        wz1 = cam_z + depth * (-rx1*c_sin + rz*c_cos)
+        # Checker edge crossings along the span, as fractions of its width
+        ix0 = math.floor((wx0 - ox) / period); ix1 = math.floor((wx1 - ox) / period)
+        iz0 = math.floor((wz0 - oz) / period); iz1 = math.floor((wz1 - oz) / period)
+        width = x1 - x0
+        if abs(ix1 - ix0) + abs(iz1 - iz0) > width // 2:
+            # Cells smaller than 2px: blend instead of aliasing (cheap LOD)
+            a = material.color_a; b = material.color_b
+            spans.append((y, depth, [(x0, x1, ((a[0]+b[0])//2, (a[1]+b[1])//2, (a[2]+b[2])//2))]))
+            continue
+        cuts = []
+        for k in range(min(ix0, ix1) + 1, max(ix0, ix1) + 1):
+            cuts.append((ox + k*period - wx0) / (wx1 - wx0))
+        for k in range(min(iz0, iz1) + 1, max(iz0, iz1) + 1):
+            cuts.append((oz + k*period - wz0) / (wz1 - wz0))
+        cuts.sort()
+        parity = (ix0 + iz0) % 2
+        runs = []
+        sx = x0
+        for u in cuts:
+            ex = x0 + int(u * width)
+            if ex > sx:
+                runs.append((sx, ex, material.color_b if parity else material.color_a))
+                sx = ex
+            parity ^= 1
+        if x1 > sx:
+            runs.append((sx, x1, material.color_b if parity else material.color_a))
+        spans.append((y, depth, runs))
+    return spans
+
 def render_mesh(screen, mesh, cam_x, cam_y, cam_z, cam_yaw, cam_pitch, cx, cy, is_menu=False):
     render_list = []
     # Camera yaw rotation
@@ -1334,6 +1766,7 @@ def render_mesh(screen, mesh, cam_x, cam_y, cam_z, cam_yaw, cam_pitch, cx, cy, i
     for face in mesh.faces:
         transformed_verts = []
         avg_z = 0
+        y_lo = y_hi = None
         valid = True
         for i in face.indices:
             v = mesh.vertices[i]
@@ -1349,6 +1782,8 @@ def render_mesh(screen, mesh, cam_x, cam_y, cam_z, cam_yaw, cam_pitch, cx, cy, i
             wx = rx + mesh.x
             wy = ry + mesh.y
             wz = rz + mesh.z
+            if y_lo is None or wy < y_lo: y_lo = wy
+            if y_hi is None or wy > y_hi: y_hi = wy
             # 3. Camera translate
             dcx = wx - cam_x
             dcy = wy - cam_y
@@ -1364,13 +1799,35 @@ def render_mesh(screen, mesh, cam_x, cam_y, cam_z, cam_yaw, cam_pitch, cx, cy, i
                 xx, yy, zz = xx, yy2, zz2
             else:
                 xx = dcx; yy = dcy; zz = dcz
-            # Near clip
-            if zz < 5:
+            # Near clip (material faces are clipped as polygons below)
+            if zz < NEAR_CLIP and face.material is None:
                 valid = False; break
             transformed_verts.append((xx, yy, zz))
             avg_z += zz
         if not valid:
             continue
+        if face.material is not None and not is_menu:
+            transformed_verts = clip_near(transformed_verts)
+            if len(transformed_verts) < 3:
+                continue
+            poly = [(xx * FOV / zz + cx, -yy * FOV / zz + cy) for xx, yy, zz in transformed_verts]
+            area = 0
+            for i in range(len(poly)):
+                j = (i+1) % len(poly)
+                area += (poly[j][0]-poly[i][0]) * (poly[j][1]+poly[i][1])
+            if area > 0:
+                plane_y = mesh.vertices[face.indices[0]].y + mesh.y
+                render_list.append({
+                    'poly': poly,
+                    'depth': sum(v[2] for v in transformed_verts) / len(transformed_verts),
+                    'color': face.color,
+                    # Layered against other faces by draw_render_list
+                    'plane_y': plane_y,
+                    'above': cam_y > plane_y,
+                    'spans': material_spans(poly, face.material, plane_y, cam_x, cam_y, cam_z,
+                                            c_cos, c_sin, p_cos, p_sin, cx, cy)
+                })
+            continue
         # 5. Project to screen with N64 vertex snapping
         screen_points = []
         for xx, yy, zz in transformed_verts:
@@ -1395,11 +1852,64 @@ def render_mesh(screen, mesh, cam_x, cam_y, cam_z, cam_yaw, cam_pitch, cx, cy, i
                 render_list.append({
                     'poly': screen_points,
                     'depth': avg_z / len(transformed_verts),
-                    'color': face.color
+                    'color': face.color,
+                    'y_lo': y_lo,
+                    'y_hi': y_hi
                 })
     return render_list
 
 
+def fog_color(color, depth, sky):
+    """N64 distance fog + 15-bit color reduction"""
+    fog = min(1.0, depth / VIEW_DISTANCE)
+    r, g, b = color
+    sr, sg, sb = sky
+    # Fog blend
+    fr = int(r + (sr - r) * fog)
+    fg = int(g + (sg - g) * fog)
+    fb = int(b + (sb - b) * fog)
+    # N64 color depth reduction (Super FX 15-bit color)
+    fr = (fr >> 3) << 3  # 5-bit per channel
+    fg = (fg >> 3) << 3
+    fb = (fb >> 3) << 3
+    return (max(0, min(255, fr)), max(0, min(255, fg)), max(0, min(255, fb)))
+
+def plane_layer(item, planes):
+    """How many ground planes separate item from the camera (a plane half-covers itself)
+
+    A horizontal plane splits the view: seen from above, nothing wholly under
+    it can cover it and nothing on it can be covered by what lies under it, so
+    painting far layers first is exact where one depth per face is not.
+    """
+    layer = 0
+    plane_y = item.get('plane_y')
+    for y, above in planes:
+        if plane_y is not None:
+            if plane_y == y:
+                layer += 1
+            elif (plane_y < y) if above else (plane_y > y):
+                layer += 2
+        elif 'y_lo' in item and ((item['y_hi'] < y) if above else (item['y_lo'] > y)):
+            layer += 2
+    return layer
+
+def draw_render_list(screen, polys, sky):
+    """Super FX pipeline: painter's algorithm over flat polys and material spans"""
+    planes = {(item['plane_y'], item['above']) for item in polys if 'plane_y' in item}
+    if planes:
+        polys.sort(key=lambda x: (plane_layer(x, planes), x['depth']), reverse=True)
+    else:
+        polys.sort(key=lambda x: x['depth'], reverse=True)
+    for item in polys:
+        spans = item.get('spans')
+        if spans is None:
+            pygame.draw.polygon(screen, fog_color(item['color'], item['depth'], sky), item['poly'])
+            continue
+        for y, depth, runs in spans:
+            for x0, x1, color in runs:
+                screen.fill(fog_color(color, depth, sky), (x0, y, x1 - x0, N64_SNAP))
+
+
 # ================================================================
 # MENU HEAD
 # ================================================================
@@ -1418,6 +1928,255 @@ def create_menu_head():
     return m
 
 
+# ================================================================
+# BENCHMARK (python ultramario1.x1.16.26.py --bench)
+# ================================================================
+CHECKER_COURSES = ["castle_grounds", "castle_f1", "castle_basement", "c01_bob",
+                   "c05_boo", "c06_hazy", "c07_lava", "c08_sand", "c10_snow",
+                   "c11_wet", "c12_tall", "s_metal", "b2_fire"]
+
+def benchmark_checker_floors(frames=60):
+    """Face counts and ms/frame: per-tile checker cubes vs one checker material quad"""
+    global CHECKER_MATERIALS
+    pygame.init()
+    surf = pygame.Surface((WIDTH, HEIGHT))
+    cx, cy = WIDTH//2, HEIGHT//2
+    saved = CHECKER_MATERIALS
+    print(f"{'level':<18}{'faces(tiles)':>13}{'faces(mat)':>11}{'ms(tiles)':>11}{'ms(mat)':>9}")
+    for level_id in CHECKER_COURSES:
+        row = []
+        for use_material in (False, True):
+            CHECKER_MATERIALS = use_material
+            info = LEVELS[level_id]
+            result = info["builder"]()
+            mesh = result[0] if isinstance(result, tuple) else result
+            sky = info["sky"]
+            start = time.perf_counter()
+            for f in range(frames):
+                # Spawn view, slowly turning and looking slightly down
+                yaw = math.pi + f * (2 * math.pi / frames)
+                surf.fill(sky)
+                polys = render_mesh(surf, mesh, 0, 50 + EYE_HEIGHT, 400, yaw, -0.2, cx, cy)
+                draw_render_list(surf, polys, sky)
+            row.append((len(mesh.faces), (time.perf_counter() - start) * 1000 / frames))
+        (ft, mt), (fm, mm) = row
+        print(f"{level_id:<18}{ft:>13}{fm:>11}{mt:>11.2f}{mm:>9.2f}")
+    CHECKER_MATERIALS = saved
+
+def _floor_scene(under):
+    """Checkered ground with a pillar on it; under adds a lower plane and moat tiles beneath"""
+    m = Mesh()
+    m.add_checker_floor((-4, 4), (-4, 4), 200, 0, CHECKER_LIGHT, CHECKER_DARK)
+    m.add_cube(60, 200, 60, 0, 100, -300, CASTLE_WALL)
+    if under:
+        m.add_checker_floor((-8, 8), (-8, 8), 200, -40, WATER_BLUE, WATER_LIGHT)
+        for i in range(-3, 4):
+            m.add_cube(200, 6, 200, i*200, -8, -400, WATER_BLUE)
+    return m
+
+def selftest_floor_layers():
+    """Faces under a checker plane never paint over it, from any heading"""
+    pygame.init()
+    sky = (0, 0, 0)
+    surf = pygame.Surface((WIDTH, HEIGHT))
+    cx, cy = WIDTH//2, HEIGHT//2
+    scenes = [_floor_scene(False), _floor_scene(True)]
+    covered = shown = 0
+    for step in range(8):
+        yaw = math.pi + step * math.pi / 4
+        shots = []
+        for mesh in scenes:
+            surf.fill(sky)
+            draw_render_list(surf, render_mesh(surf, mesh, 0, 300, 500, yaw, -0.35, cx, cy), sky)
+            shots.append(pygame.image.tobytes(surf, 'RGB'))
+        ref, full = shots
+        for i in range(0, len(ref), 3):
+            if ref[i:i+3] != b'\0\0\0':
+                assert full[i:i+3] == ref[i:i+3], (step, i // 3 % WIDTH, i // 3 // WIDTH)
+                covered += 1
+            elif full[i:i+3] != b'\0\0\0':
+                shown += 1
+    # The lower plane still shows wherever the ground does not cover it
+    assert covered and shown, (covered, shown)
+    print(f"floor layers ok ({covered} ground pixels unchanged, {shown} lower pixels shown)")
+
+def benchmark_collision(queries=20000, seed=64):
+    """Floor and sphere queries/sec on the course with the most collision triangles"""
+    rng = random.Random(seed)
+    worlds = []
+    for level_id, info in LEVELS.items():
+        result = info["builder"]()
+        mesh = result[0] if isinstance(result, tuple) else result
+        worlds.append((len(extract_triangles(mesh)), level_id, mesh))
+    n_tris, level_id, mesh = max(worlds, key=lambda w: w[0])
+    start = time.perf_counter()
+    world = CollisionWorld(mesh)
+    build_ms = (time.perf_counter() - start) * 1000
+    b = world.bvh.boxes
+    lo_x = min(x[0] for x in b); hi_x = max(x[3] for x in b)
+    lo_z = min(x[2] for x in b); hi_z = max(x[5] for x in b)
+    pts = [(rng.uniform(lo_x, hi_x), rng.uniform(0, 300), rng.uniform(lo_z, hi_z)) for _ in range(queries)]
+    print(f"{level_id}: {n_tris} triangles, {len(world.bvh.nodes)} BVH nodes, build {build_ms:.1f} ms")
+    start = time.perf_counter()
+    for x, y, z in pts:
+        world.floor_height(x, z, y + STEP_HEIGHT)
+    print(f"  floor_height    {queries / (time.perf_counter() - start):>10.0f} queries/s")
+    start = time.perf_counter()
+    for x, y, z in pts:
+        world.sphere_contacts(x, y + STEP_HEIGHT + MARIO_RADIUS, z, MARIO_RADIUS)
+    print(f"  sphere_contacts {queries / (time.perf_counter() - start):>10.0f} queries/s")
+    # Linear scan over every triangle, for scale
+    tris = world.bvh.tris
+    start = time.perf_counter()
+    for x, y, z in pts[:queries // 20]:
+        for a, b2, c, n in tris:
+            if min(a[0], b2[0], c[0]) <= x <= max(a[0], b2[0], c[0]) and min(a[2], b2[2], c[2]) <= z <= max(a[2], b2[2], c[2]):
+                pass
+    print(f"  linear scan     {(queries // 20) / (time.perf_counter() - start):>10.0f} queries/s")
+
+def selftest_collision():
+    """Regression checks for standing on ramps, stepping, walls and the BVH"""
+    def walk(mesh, x, y, z, vx, vz, ticks):
+        world = CollisionWorld(mesh)
+        mario = Mario(x, y, z)
+        trace = []
+        for _ in range(ticks):
+            vx, vz = mario.move(world, vx, vz)
+            mario.update(world)
+            trace.append((mario.x, mario.y, mario.z))
+        return mario, trace
+
+    # Walkable ramp (rises 100 over 200 toward -z): Mario follows the slope
+    ramp = Mesh()
+    ramp.add_ramp(200, 100, 200, 0, 0, 0, STONE_GREY)
+    mario, trace = walk(ramp, 0, 0, 150, 0, -4, 80)
+    for x, y, z in trace:
+        if -90 < z < 90:
+            assert abs(y - 100 * (100 - z) / 200) < 1.0, (z, y)
+    # ...and stands still on it without sinking or sliding
+    mario, trace = walk(ramp, 0, 50, 0, 0, 0, 60)
+    assert abs(mario.y - 50) < 1.0 and abs(mario.z) < 1e-6, (mario.y, mario.z)
+
+    # Steep ramp (rises 400 over 100) blocks instead of being climbed
+    steep = Mesh()
+    steep.add_ramp(200, 400, 100, 0, 0, 0, STONE_GREY)
+    mario, trace = walk(steep, 0, 0, 150, 0, -4, 80)
+    assert mario.y < STEP_HEIGHT and mario.z > 0, (mario.y, mario.z)
+
+    # Walls stop fast movement without tunneling and slide sideways motion
+    wall = Mesh()
+    wall.add_cube(40, 200, 400, 100, 100, 0, STONE_GREY)
+    mario, trace = walk(wall, 0, 0, 0, 30, 0, 30)
+    assert max(x for x, y, z in trace) <= 80 - MARIO_RADIUS + 1e-6, max(x for x, y, z in trace)
+    mario, trace = walk(wall, 0, 0, 0, 8, 8, 15)
+    assert mario.x <= 80 - MARIO_RADIUS + 1e-6 and mario.z > 100, (mario.x, mario.z)
+
+    # Low ledges are stepped onto, high ones are walls
+    step = Mesh()
+    step.add_cube(200, 20, 200, 200, 10, 0, STONE_GREY)
+    mario, trace = walk(step, 0, 0, 0, 6, 0, 40)
+    assert mario.x > 150 and abs(mario.y - 20) < 1e-6, (mario.x, mario.y)
+    ledge = Mesh()
+    ledge.add_cube(200, 60, 200, 200, 30, 0, STONE_GREY)
+    mario, trace = walk(ledge, 0, 0, 0, 6, 0, 40)
+    assert mario.x <= 100 - MARIO_RADIUS + 1e-6 and mario.y == 0, (mario.x, mario.y)
+
+    # BVH box queries match a brute-force scan; levels are built once
+    rng = random.Random(64)
+    result = build_castle_grounds()
+    world = get_level_collision("castle_grounds", result)
+    assert get_level_collision("castle_grounds", build_castle_grounds()) is world
+    bvh = world.bvh
+    for _ in range(500):
+        x, y, z = rng.uniform(-2000, 2000), rng.uniform(-50, 600), rng.uniform(-2000, 2000)
+        box = (x, y, z, x + rng.uniform(0, 300), y + rng.uniform(0, 300), z + rng.uniform(0, 300))
+        ref = [i for i, b in enumerate(bvh.boxes) if not (b[0] > box[3] or b[3] < box[0] or
+               b[1] > box[4] or b[4] < box[1] or b[2] > box[5] or b[5] < box[2])]
+        assert sorted(bvh.query_box(*box)) == ref
+    print("collision selftest ok")
+
+
+def _coin_field(n, seed):
+    rng = random.Random(seed)
+    return [Coin(rng.uniform(-3000, 3000), rng.uniform(0, 60), rng.uniform(-3000, 3000)) for _ in range(n)]
+
+def _walk_path(ticks, seed):
+    rng = random.Random(seed)
+    x = z = 0.0; heading = 0.0; path = []
+    for _ in range(ticks):
+        heading += rng.uniform(-0.2, 0.2)
+        x = max(-3000, min(3000, x + math.cos(heading) * MAX_SPEED))
+        z = max(-3000, min(3000, z + math.sin(heading) * MAX_SPEED))
+        path.append((x, rng.uniform(0, 60), z))
+    return path
+
+def selftest_triggers(coins=3000, ticks=3000):
+    """Grid pickups match the old per-frame distance loop on a dense coin field"""
+    path = _walk_path(ticks, 7)
+    ref_coins = _coin_field(coins, 3)
+    ref = []
+    for tick, (x, y, z) in enumerate(path):
+        for i, coin in enumerate(ref_coins):
+            if not coin.collected:
+                dx = x - coin.x; dy = y - coin.y; dz = z - coin.z
+                if math.sqrt(dx*dx + dy*dy + dz*dz) < COIN_RADIUS:
+                    coin.collected = True
+                    ref.append((tick, i))
+    grid_coins = _coin_field(coins, 3)
+    index = {id(c): i for i, c in enumerate(grid_coins)}
+    got = []
+    tick = 0
+    def on_coin(t):
+        t.payload.collected = True
+        got.append((tick, index[id(t.payload)]))
+        grid.remove(t)
+    grid = build_level_triggers([], grid_coins, None, on_coin)
+    for tick, (x, y, z) in enumerate(path):
+        grid.update(x, y, z)
+    assert sorted(got) == sorted(ref) and ref, (len(got), len(ref))
+    # Removed coins leave no trace in the grid
+    live = {t.payload for b in grid.cells.values() for t in b}
+    assert all(not c.collected for c in live)
+
+    # Painting boxes: one enter on approach, one exit on leaving, first painting wins overlaps
+    events = []
+    warps = build_warp_triggers(CASTLE_F1_PAINTINGS,
+                                lambda t: events.append(("enter", t.payload["level"])),
+                                lambda t: events.append(("exit", t.payload["level"])))
+    for x, z in [(0, 0), (-900, -300), (-880, -310), (-900, -400), (-900, -900), (0, 0)]:
+        warps.update(x, 50, z)
+        if (x, z) == (-900, -400):
+            assert [t.payload["level"] for t in warps.active()] == ["c01_bob", "c02_whomp"]
+    assert events == [("enter", "c01_bob"), ("enter", "c02_whomp"), ("exit", "c01_bob"),
+                      ("exit", "c02_whomp")], events
+    print(f"trigger selftest ok ({len(ref)} pickups over {ticks} ticks, {coins} coins)")
+
+def benchmark_triggers(coins=5000, ticks=600):
+    """Per-tick pickup cost: distance loop over every coin vs the trigger grid"""
+    path = _walk_path(ticks, 7)
+    field = _coin_field(coins, 3)
+    start = time.perf_counter()
+    for x, y, z in path:
+        for coin in field:
+            if not coin.collected:
+                dx = x - coin.x; dy = y - coin.y; dz = z - coin.z
+                if math.sqrt(dx*dx + dy*dy + dz*dz) < COIN_RADIUS:
+                    coin.collected = True
+    brute = (time.perf_counter() - start) * 1e6 / ticks
+    field = _coin_field(coins, 3)
+    def on_coin(t):
+        t.payload.collected = True
+        grid.remove(t)
+    start = time.perf_counter()
+    grid = build_level_triggers([], field, None, on_coin)
+    build_ms = (time.perf_counter() - start) * 1000
+    start = time.perf_counter()
+    for x, y, z in path:
+        grid.update(x, y, z)
+    fast = (time.perf_counter() - start) * 1e6 / ticks
+    print(f"triggers: {coins} coins  loop {brute:.1f} us/tick  grid {fast:.2f} us/tick  (grid build {build_ms:.1f} ms)")
+
+
 # ================================================================
 # MAIN
 # ================================================================
@@ -1461,6 +2220,7 @@ def main():
     # Game
     mario = None
     current_level_mesh = None
+    current_level_collision = None
     current_level_stars = []
     current_level_coins = []
     current_level_id = None
@@ -1479,6 +2239,9 @@ def main():
     cx, cy = WIDTH//2, HEIGHT//2
     collected_stars = set()
     total_coins = 0
+    level_triggers = None      # Stars / coins for the current level
+    warp_triggers = None       # Paintings for the current level
+    warp_hint = ""
 
     # HUD animation
     star_flash = 0
@@ -1486,8 +2249,35 @@ def main():
     level_name_timer = 0
     level_display_name = ""
 
+    def collect_star(trigger):
+        nonlocal star_flash
+        star = trigger.payload
+        star.collected = True
+        sid = f"{current_level_id}_{star.star_id}"
+        collected_stars.add(sid)
+        star_flash = 30
+        level_triggers.remove(trigger)
+
+    def collect_coin(trigger):
+        nonlocal total_coins, coin_flash
+        trigger.payload.collected = True
+        total_coins += 1
+        coin_flash = 15
+        if total_coins % 50 == 0:
+            mario.lives += 1
+        level_triggers.remove(trigger)
+
+    def near_painting(trigger):
+        nonlocal warp_hint
+        warp_hint = trigger.payload["label"]
+
+    def leave_painting(trigger):
+        nonlocal warp_hint
+        warp_hint = ""
+
     def load_level(level_id):
-        nonlocal mario, current_level_mesh, current_level_stars, current_level_coins
+        nonlocal mario, current_level_mesh, current_level_collision, current_level_stars, current_level_coins
+        nonlocal level_triggers, warp_triggers, warp_hint
         nonlocal current_level_id, cam_x, cam_y, cam_z, cam_yaw, cam_pitch
         nonlocal cam_target_x, cam_target_y, cam_target_z, cam_target_yaw, cam_target_pitch
         nonlocal vel_x, vel_z, head_bob_phase, bob_x, bob_y, mouse_captured
@@ -1514,7 +2304,14 @@ def main():
             current_level_stars = []
             current_level_coins = []
 
+        current_level_collision = get_level_collision(level_id, current_level_mesh)
         mario = Mario(0, 50, 400)
+        level_triggers = build_level_triggers(current_level_stars, current_level_coins,
+                                              collect_star, collect_coin)
+        warp_hint = ""
+        warp_triggers = build_warp_triggers(LEVEL_PAINTINGS.get(level_id, []),
+                                            near_painting, leave_painting)
+        warp_triggers.update(mario.x, mario.y, mario.z)
         # First-person: camera IS Mario's eyes
         cam_yaw = math.pi       # Face into the level (toward -Z)
         cam_pitch = 0.0
@@ -1659,12 +2456,9 @@ def main():
                                 load_level("castle_f1")
                         elif current_level_id == "castle_f1":
                             # Check paintings
-                            for p in CASTLE_F1_PAINTINGS:
-                                dx = mario.x - p["pos"][0]
-                                dz = mario.z - p["pos"][2]
-                                if abs(dx)<150 and abs(dz)<150:
-                                    load_level(p["level"])
-                                    break
+                            warps = warp_triggers.active()
+                            if warps:
+                                load_level(warps[0].payload["level"])
                             else:
                                 # Basement access
                                 if abs(mario.x-600)<100 and abs(mario.z-600)<100:
@@ -1679,12 +2473,9 @@ def main():
                                 elif abs(mario.x)<100 and abs(mario.z)<100 and mario.y > 50:
                                     load_level("s_slide")
                         elif current_level_id == "castle_basement":
-                            for p in BASEMENT_PAINTINGS:
-                                dx = mario.x - p["pos"][0]
-                                dz = mario.z - p["pos"][2]
-                                if abs(dx)<150 and abs(dz)<150:
-                                    load_level(p["level"])
-                                    break
+                            warps = warp_triggers.active()
+                            if warps:
+                                load_level(warps[0].payload["level"])
                             else:
                                 if abs(mario.x-800)<100 and abs(mario.z-800)<100:
                                     load_level("s_metal")
@@ -1696,12 +2487,9 @@ def main():
                                 elif abs(mario.x)<100 and abs(mario.z+600)<100:
                                     load_level("b1_dark")
                         elif current_level_id == "castle_upper":
-                            for p in UPPER_PAINTINGS:
-                                dx = mario.x - p["pos"][0]
-                                dz = mario.z - p["pos"][2]
-                                if abs(dx)<150 and abs(dz)<150:
-                                    load_level(p["level"])
-                                    break
+                            warps = warp_triggers.active()
+                            if warps:
+                                load_level(warps[0].payload["level"])
                             else:
                                 if abs(mario.x)<200 and mario.z < -600:
                                     load_level("castle_top")
@@ -1969,13 +2757,12 @@ def main():
                 if abs(vel_z) < 0.1: vel_z = 0
 
             if mario:
-                # Apply velocity to Mario position
-                mario.x += vel_x
-                mario.z += vel_z
+                # Apply velocity to Mario position (walls slide the velocity)
+                vel_x, vel_z = mario.move(current_level_collision, vel_x, vel_z)
                 mario.yaw = cam_yaw  # Face camera direction
 
                 # Update physics (gravity, jump, floor)
-                mario.update()
+                mario.update(current_level_collision)
 
                 # --- HEAD BOB (authentic FPS feel when walking) ---
                 ground_speed = math.sqrt(vel_x*vel_x + vel_z*vel_z)
@@ -2000,34 +2787,9 @@ def main():
                 cam_y += (cam_target_y - cam_y) * CAM_LERP_POS
                 cam_z += (cam_target_z - cam_z) * CAM_LERP_POS
 
-                # --- STAR COLLECTION ---
-                for star in current_level_stars:
-                    if not star.collected:
-                        star.yaw += 0.05
-                        dx = mario.x - star.x
-                        dy = mario.y - star.y
-                        dz = mario.z - star.z
-                        dist = math.sqrt(dx*dx + dy*dy + dz*dz)
-                        if dist < 60:
-                            star.collected = True
-                            sid = f"{current_level_id}_{star.star_id}"
-                            collected_stars.add(sid)
-                            star_flash = 30
-
-                # --- COIN COLLECTION ---
-                for coin in current_level_coins:
-                    if not coin.collected:
-                        coin.yaw += 0.08
-                        dx = mario.x - coin.x
-                        dy = mario.y - coin.y
-                        dz = mario.z - coin.z
-                        dist = math.sqrt(dx*dx + dy*dy + dz*dz)
-                        if dist < 40:
-                            coin.collected = True
-                            total_coins += 1
-                            coin_flash = 15
-                            if total_coins % 50 == 0:
-                                mario.lives += 1
+                # --- STAR / COIN COLLECTION + PAINTING PROXIMITY ---
+                level_triggers.update(mario.x, mario.y, mario.z)
+                warp_triggers.update(mario.x, mario.y, mario.z)
 
             # ============================================================
             # RENDER WORLD (First-Person — no Mario model rendered)
@@ -2039,39 +2801,21 @@ def main():
             # Render stars
             for star in current_level_stars:
                 if not star.collected:
+                    star.yaw += 0.05
                     all_polys.extend(render_mesh(screen, star,
                         cam_x, cam_y, cam_z, cam_yaw, cam_pitch, cx, cy))
             # Render coins
             for coin in current_level_coins:
                 if not coin.collected:
+                    coin.yaw += 0.08
                     all_polys.extend(render_mesh(screen, coin,
                         cam_x, cam_y, cam_z, cam_yaw, cam_pitch, cx, cy))
             # NOTE: Mario is NOT rendered — first-person view
 
-            # Depth sort (painter's algorithm)
-            all_polys.sort(key=lambda x: x['depth'], reverse=True)
-
             # ============================================================
-            # SUPER FX RENDERING PIPELINE
+            # SUPER FX RENDERING PIPELINE (depth sort + fog + materials)
             # ============================================================
-            for item in all_polys:
-                depth = item['depth']
-                # N64 distance fog
-                fog = min(1.0, depth / VIEW_DISTANCE)
-                r, g, b = item['color']
-                sr, sg, sb = sky
-                # Fog blend
-                fr = int(r + (sr - r) * fog)
-                fg = int(g + (sg - g) * fog)
-                fb = int(b + (sb - b) * fog)
-                # N64 color depth reduction (Super FX 15-bit color)
-                fr = (fr >> 3) << 3  # 5-bit per channel
-                fg = (fg >> 3) << 3
-                fb = (fb >> 3) << 3
-                fr = max(0, min(255, fr))
-                fg = max(0, min(255, fg))
-                fb = max(0, min(255, fb))
-                pygame.draw.polygon(screen, (fr, fg, fb), item['poly'])
+            draw_render_list(screen, all_polys, sky)
 
             # ============================================================
             # FIRST-PERSON HUD OVERLAY
@@ -2122,7 +2866,9 @@ def main():
 
             # Navigation hints
             hint = ""
-            if current_level_id and "castle" in current_level_id:
+            if warp_hint:
+                hint = f"E: Enter {warp_hint}"
+            elif current_level_id and "castle" in current_level_id:
                 hint = "E: Enter Door/Painting"
             elif current_level_id:
                 hint = "E: Exit Level"
@@ -2189,4 +2935,13 @@ def main():
     sys.exit()
 
 if __name__ == "__main__":
-    main()
+    if "--bench" in sys.argv:
+        benchmark_checker_floors()
+        benchmark_collision()
+        benchmark_triggers()
+    elif "--selftest" in sys.argv:
+        selftest_floor_layers()
+        selftest_collision()
+        selftest_triggers()
+    else:
+        main()
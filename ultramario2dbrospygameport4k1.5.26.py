@@ -9,10 +9,15 @@ All 32 levels: World 1-1 through World 8-4
 """
 
 import pygame
+import os
 import sys
 import math
+import mmap
 import random
 import array
+import struct
+import zlib
+from collections import OrderedDict
 
 # ─── Constants ───────────────────────────────────────────────────────────────
 SCREEN_W, SCREEN_H = 768, 720
@@ -33,6 +38,41 @@ FIREBALL_SPEED = 8.0
 LEVEL_WIDTH_TILES = 224
 LEVEL_HEIGHT_TILES = 15
 
+# Static layer cache
+CHUNK_CACHE = True         # Blit pre-rendered chunks instead of drawing every tile
+CHUNK_TILES = 16           # Chunk width in tiles
+CHUNK_CACHE_SIZE = 4       # Chunks kept before the least recently drawn is evicted
+CHUNK_PAD = 4              # Spare pixels so tile lines that poke past the chunk edge survive
+CHUNK_COLORKEY = (255, 0, 255)
+
+# Sprite cache
+SPRITE_CACHE = True        # Blit pre-rasterized character sprites
+SPRITE_WARMUP = True       # Rasterize every variant during the world intro screen
+
+# Particles
+PARTICLE_POOL = True       # Preallocated particle arrays instead of a list of dicts
+PARTICLE_CAP = 512         # Live particles; spawns past this are dropped
+PARTICLE_LOD = 128         # Beyond this many debris/sparkles only every Nth is drawn (0 = draw all)
+POPUP_LABELS = ('100', '200', '400', '500', '800', '1000', '2000', '4000', '5000', '8000',
+                '1UP', 'SUPER!', 'FIRE!', 'CLEAR!', 'STAR!')
+
+# Enemy contacts
+ENEMY_CONTACTS = True      # Enemies bump each other, koopas shell up and stars kill (False: enemies pass through)
+SHELL_SPEED = 9.0
+SHELL_CHAIN = (500, 800, 1000, 2000, 4000, 5000, 8000)  # Score per enemy a kicked shell takes out in a row
+STAR_TIME = 600            # Frames of star power from a star block
+
+# Rewind
+REWIND = True              # Record play state every frame; hold REWIND_KEY to step back through it
+REWIND_KEY = pygame.K_r
+REWIND_SECONDS = 5         # History kept in the ring buffer
+REWIND_KEYFRAME = 30       # Frames between full snapshots; the ones between are stored as XOR deltas
+
+# Level pack (build with --compile-levels; levels are generated when it's missing or stale)
+LEVEL_PACK = True          # Load levels from the compiled pack when one is present
+LEVEL_PACK_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'ultramario2d.levels')
+LEVEL_PACK_VERSION = 1     # Bump whenever generation or the record layout changes
+
 # NES Palette
 C_SKY          = (92, 148, 252)
 C_SKY_NIGHT    = (12, 12, 56)
@@ -242,6 +282,13 @@ def draw_koopa(surf, x, y, frame, facing):
     pygame.draw.rect(surf, C_KOOPA_GREEN, (lx + 16, ry + 34, 8, 10))
 
 
+def draw_shell(surf, x, y):
+    rx, ry = int(x), int(y)
+    pygame.draw.ellipse(surf, C_KOOPA_GREEN, (rx + 6, ry + 18, TILE - 12, 26))
+    pygame.draw.ellipse(surf, C_WHITE, (rx + 11, ry + 22, TILE - 22, 16), 2)
+    pygame.draw.rect(surf, C_WHITE, (rx + 6, ry + 38, TILE - 12, 5))
+
+
 def draw_bowser(surf, x, y, frame):
     rx, ry = int(x), int(y)
     pygame.draw.rect(surf, C_BOWSER_GREEN, (rx, ry + 10, 56, 50))
@@ -302,6 +349,21 @@ def draw_block(surf, x, y, type_name, frame=0, underground=False):
         pygame.draw.line(surf, C_CASTLE_DARK, (x + TILE // 2, y), (x + TILE // 2, y + TILE), 2)
 
 
+def draw_static_tile(surf, x, y, t, underground=False):
+    """Tiles that never animate: ground, brick, hard block and castle bridge"""
+    if t == 1:
+        draw_block(surf, x, y, 'ground', underground=underground)
+    elif t == 2:
+        draw_block(surf, x, y, 'brick', underground=underground)
+    elif t == 4:
+        draw_block(surf, x, y, 'hard')
+    elif t == 5:
+        pygame.draw.rect(surf, C_BRIDGE, (x, y, TILE, TILE // 3))
+        pygame.draw.rect(surf, (120, 80, 0), (x, y, TILE, TILE // 3), 2)
+        for cx in range(0, TILE, 12):
+            pygame.draw.rect(surf, (120, 80, 0), (x + cx + 2, y + 4, 8, 4))
+
+
 def draw_pipe(surf, x, y, w, h):
     lip_h = 12
     body_x = x + 4
@@ -362,9 +424,276 @@ def draw_axe(surf, x, y, frame):
     pygame.draw.line(surf, C_WHITE, (x + 4, y + 2 + bob), (x + 4, y + 18 + bob), 2)
 
 
+# ─── Sprite Cache ────────────────────────────────────────────────────────────
+class SpriteCache:
+    """Characters rasterized once per visual variant into small colorkeyed surfaces.
+
+    Keys are (character, power state / palette, animation step, facing),
+    reduced to exactly the cases the draw_* functions distinguish. The
+    left-facing sprites are drawn separately rather than flipped, because the
+    hand-placed eyes and heads are not mirror images of the right-facing ones.
+    """
+    PAD = 24  # Bowser's spikes and tail reach past his (x, y)
+
+    def __init__(self):
+        self.sprites = {}
+        self.hits = 0
+        self.misses = 0
+
+    def _get(self, key, draw, args):
+        sprite = self.sprites.get(key)
+        if sprite is None:
+            self.misses += 1
+            size = 3 * TILE
+            canvas = pygame.Surface((size, size)).convert()
+            canvas.fill(CHUNK_COLORKEY)
+            draw(canvas, self.PAD, self.PAD, *args)
+            box = self._bounds(canvas)
+            surf = canvas.subsurface(box).copy()
+            surf.set_colorkey(CHUNK_COLORKEY, pygame.RLEACCEL)
+            sprite = self.sprites[key] = (surf, box.x - self.PAD, box.y - self.PAD)
+        else:
+            self.hits += 1
+        return sprite
+
+    @staticmethod
+    def _bounds(canvas):
+        canvas.set_colorkey(CHUNK_COLORKEY)
+        box = canvas.get_bounding_rect()
+        canvas.set_colorkey(None)
+        return box
+
+    def _blit(self, surf, x, y, sprite):
+        img, dx, dy = sprite
+        surf.blit(img, (int(x) + dx, int(y) + dy))
+
+    # Variant keys mirror the branches inside each draw_* function
+    def mario(self, surf, x, y, state, frame, facing, big=False, fire=False):
+        if not SPRITE_CACHE:
+            return draw_mario(surf, x, y, state, frame, facing, big, fire)
+        if state == 'walk' and int(frame) % 2 == 0:
+            pose = 'walk'
+        elif state == 'jump':
+            pose = 'jump'
+        else:
+            pose = 'idle'
+        flip = facing == -1
+        self._blit(surf, x, y, self._get(('mario', big, fire, pose, flip), draw_mario,
+                                         (pose, 0, -1 if flip else 1, big, fire)))
+
+    def goomba(self, surf, x, y, frame):
+        if not SPRITE_CACHE:
+            return draw_goomba(surf, x, y, frame)
+        step = int(frame * 0.2) % 2
+        self._blit(surf, x, y, self._get(('goomba', step), draw_goomba, (step * 5,)))
+
+    def koopa(self, surf, x, y, frame, facing):
+        if not SPRITE_CACHE:
+            return draw_koopa(surf, x, y, frame, facing)
+        step = int(frame * 0.2) % 2
+        flip = facing < 0
+        self._blit(surf, x, y, self._get(('koopa', step, flip), draw_koopa,
+                                         (step * 5, -1 if flip else 1)))
+
+    def shell(self, surf, x, y):
+        if not SPRITE_CACHE:
+            return draw_shell(surf, x, y)
+        self._blit(surf, x, y, self._get(('shell',), draw_shell, ()))
+
+    def bowser(self, surf, x, y, frame):
+        if not SPRITE_CACHE:
+            return draw_bowser(surf, x, y, frame)
+        breath, step = int(frame * 0.05) % 2, int(frame * 0.1) % 2
+        self._blit(surf, x, y, self._get(('bowser', breath, step), draw_bowser,
+                                         (breath * 20 + step * 10,)))
+
+    def warm_up(self):
+        """Rasterize every variant up front so play never hits a miss"""
+        scratch = pygame.Surface((1, 1))
+        for big in (False, True):
+            for fire in (False, True):
+                for state in ('walk', 'jump', 'idle'):
+                    for facing in (1, -1):
+                        self.mario(scratch, 0, 0, state, 0, facing, big, fire)
+        for frame in (0, 5):
+            self.goomba(scratch, 0, 0, frame)
+            for facing in (1, -1):
+                self.koopa(scratch, 0, 0, frame, facing)
+        self.shell(scratch, 0, 0)
+        for frame in (0, 10, 20, 30):
+            self.bowser(scratch, 0, 0, frame)
+
+
+# ─── Static Layer Cache ──────────────────────────────────────────────────────
+class ChunkCache:
+    """Static tiles pre-rendered into CHUNK_TILES-wide surfaces, kept in a small LRU.
+
+    Each entry also lists its question blocks, which animate and are drawn
+    over the chunk every frame. invalidate() marks a chunk for re-rendering
+    the next time it is drawn.
+    """
+    def __init__(self, level_data, capacity=CHUNK_CACHE_SIZE):
+        self.ld = level_data
+        self.capacity = capacity
+        self.count = (LEVEL_WIDTH_TILES + CHUNK_TILES - 1) // CHUNK_TILES
+        self.chunks = OrderedDict()
+        self.dirty = set()
+        self.hits = 0
+        self.misses = 0
+        self.redraws = 0
+        self.prefetches = 0
+
+    def invalidate(self, tx):
+        idx = tx // CHUNK_TILES
+        if idx in self.chunks:
+            self.dirty.add(idx)
+
+    def get(self, idx):
+        """(surface, animated tile list) for chunk idx"""
+        entry = self.chunks.get(idx)
+        if entry is None:
+            self.misses += 1
+            entry = self._render(idx)
+        elif idx in self.dirty:
+            self.redraws += 1
+            entry = self._render(idx)
+        else:
+            self.hits += 1
+        self.dirty.discard(idx)
+        self._store(idx, entry)
+        return entry
+
+    def prefetch(self, idx):
+        """Render the chunk the camera is about to reach, ahead of time"""
+        if 0 <= idx < self.count and idx not in self.chunks:
+            self.prefetches += 1
+            self._store(idx, self._render(idx))
+
+    def _store(self, idx, entry):
+        self.chunks[idx] = entry
+        self.chunks.move_to_end(idx)
+        while len(self.chunks) > self.capacity:
+            old, _ = self.chunks.popitem(last=False)
+            self.dirty.discard(old)
+
+    def _render(self, idx):
+        ld = self.ld
+        surf = pygame.Surface((CHUNK_TILES * TILE + CHUNK_PAD, LEVEL_HEIGHT_TILES * TILE)).convert()
+        surf.fill(CHUNK_COLORKEY)
+        surf.set_colorkey(CHUNK_COLORKEY, pygame.RLEACCEL)
+        animated = []
+        x0 = idx * CHUNK_TILES
+        for x in range(x0, min(x0 + CHUNK_TILES, LEVEL_WIDTH_TILES)):
+            for y in range(LEVEL_HEIGHT_TILES):
+                t = ld.tiles[y][x]
+                if t == 3:
+                    animated.append(((x - x0) * TILE, y * TILE))
+                elif t:
+                    draw_static_tile(surf, (x - x0) * TILE, y * TILE, t, ld.underground)
+        return surf, animated
+
+
+# ─── Particles ───────────────────────────────────────────────────────────────
+class ParticleSystem:
+    """Particles in preallocated parallel arrays, recycled through a free list.
+
+    Debris and sparkles advance in one tight loop over the live slots and
+    score popups blit from a cache of pre-rendered label surfaces, so a
+    steady stream of effects allocates nothing per frame.
+    """
+    KINDS = {'debris': 1, 'sparkle': 2, 'text': 3}
+    DEBRIS, SPARKLE, TEXT = 1, 2, 3
+
+    def __init__(self, font, cap=PARTICLE_CAP):
+        self.font = font
+        self.cap = cap
+        self.x = array.array('d', [0.0]) * cap
+        self.y = array.array('d', [0.0]) * cap
+        self.vx = array.array('d', [0.0]) * cap
+        self.vy = array.array('d', [0.0]) * cap
+        self.life = array.array('i', [0]) * cap
+        self.kind = array.array('b', [0]) * cap
+        self.label = [None] * cap
+        self.free = list(range(cap - 1, -1, -1))
+        self.live = []  # slots in spawn order, which is also draw order
+        self.labels = {}
+        self.dropped = 0
+        self.renders = 0
+        for text in POPUP_LABELS:
+            self.text_surface(text)
+
+    def clear(self):
+        for i in self.live:
+            self.label[i] = None
+            self.free.append(i)
+        self.live.clear()
+
+    def text_surface(self, text):
+        surf = self.labels.get(text)
+        if surf is None:
+            surf = self.labels[text] = self.font.render(text, True, C_WHITE)
+            self.renders += 1
+        return surf
+
+    def spawn(self, ptype, x, y, vx, vy, life, val=None):
+        if not self.free:
+            self.dropped += 1
+            return
+        i = self.free.pop()
+        self.x[i], self.y[i], self.vx[i], self.vy[i] = x, y, vx, vy
+        self.life[i] = life
+        kind = self.kind[i] = self.KINDS[ptype]
+        if kind == self.TEXT:
+            self.label[i] = self.text_surface(str(val))
+        self.live.append(i)
+
+    def update(self):
+        x, y, vx, vy, life, kind = self.x, self.y, self.vx, self.vy, self.life, self.kind
+        live, free, label = self.live, self.free, self.label
+        DEBRIS = self.DEBRIS
+        n = 0
+        for i in live:
+            life[i] -= 1
+            if life[i] <= 0:
+                label[i] = None
+                free.append(i)
+                continue
+            x[i] += vx[i]
+            y[i] += vy[i]
+            if kind[i] == DEBRIS:
+                vy[i] += 0.4
+            live[n] = i
+            n += 1
+        del live[n:]
+
+    def draw(self, surf, cam):
+        x, y, life, kind, label = self.x, self.y, self.life, self.kind, self.label
+        blit, rect = surf.blit, pygame.draw.rect
+        TEXT, DEBRIS = self.TEXT, self.DEBRIS
+        stride = 1
+        if PARTICLE_LOD:
+            small = len(self.live) - sum(1 for i in self.live if kind[i] == TEXT)
+            stride += small // PARTICLE_LOD
+        seen = 0
+        for i in self.live:
+            k = kind[i]
+            if k == TEXT:
+                blit(label[i], (x[i] - cam, y[i]))
+                continue
+            seen += 1
+            if stride > 1 and seen % stride:
+                continue
+            if k == DEBRIS:
+                rect(surf, C_BRICK, (int(x[i] - cam), int(y[i]), 8, 8))
+            elif life[i] % 4:
+                rect(surf, C_COIN_GOLD, (int(x[i] - cam) - 2, int(y[i]) - 2, 4, 4))
+
+
 # ─── Level Generation ────────────────────────────────────────────────────────
 class LevelData:
-    def __init__(self, world, level):
+    _pack = None  # LevelPack once opened, False if there is no usable pack
+
+    def __init__(self, world, level, generate=True):
         self.world = world
         self.level = level
         self.tiles = [[0] * LEVEL_WIDTH_TILES for _ in range(LEVEL_HEIGHT_TILES)]
@@ -392,10 +721,24 @@ class LevelData:
         self.underground = self.level_type in ('underground', 'castle')
         self.difficulty = world
         self.time = max(250, 400 - (world - 1) * 15)
-        self.generate()
+        if generate:
+            self.generate()
+
+    @classmethod
+    def load(cls, world, level):
+        """The level from the compiled pack if there is one, else freshly generated"""
+        if LEVEL_PACK:
+            if cls._pack is None:
+                cls._pack = LevelPack.open(LEVEL_PACK_PATH) or False
+            if cls._pack:
+                ld = cls._pack.read(world, level)
+                if ld is not None:
+                    return ld
+        return cls(world, level)
 
     def generate(self):
-        random.seed(self.world * 100 + self.level * 7 + 42)
+        # A private RNG keeps the layout independent of every other random consumer
+        self.rng = random.Random(self.world * 100 + self.level * 7 + 42)
         if self.level_type == 'overworld':
             self._gen_overworld()
         elif self.level_type == 'underground':
@@ -455,16 +798,17 @@ class LevelData:
         spd = ENEMY_SPEED + (self.difficulty - 1) * 0.15
         self.enemies.append({
             'type': etype, 'x': x * TILE, 'y': y * TILE,
-            'vx': -spd, 'vy': 0, 'alive': True, 'frame': 0, 'facing': -1
+            'vx': -spd, 'vy': 0, 'alive': True, 'frame': 0, 'facing': -1,
+            'shell': False, 'chain': 0
         })
 
     def _add_scenery(self, gy):
-        for x in range(5, LEVEL_WIDTH_TILES, random.randint(8, 14)):
-            if random.random() < 0.5:
-                self.decor.append(('cloud', x * TILE, random.randint(40, 140)))
-            if random.random() < 0.4:
+        for x in range(5, LEVEL_WIDTH_TILES, self.rng.randint(8, 14)):
+            if self.rng.random() < 0.5:
+                self.decor.append(('cloud', x * TILE, self.rng.randint(40, 140)))
+            if self.rng.random() < 0.4:
                 self.decor.append(('bush', x * TILE, (gy - 1) * TILE + 24))
-            if random.random() < 0.25:
+            if self.rng.random() < 0.25:
                 self.decor.append(('hill', x * TILE, (gy - 1) * TILE - 10))
 
     def _gen_overworld(self):
@@ -475,16 +819,16 @@ class LevelData:
         num_gaps = min(2 + self.difficulty, 8)
         gap_x = 30
         for _ in range(num_gaps):
-            gap_x += random.randint(12, max(14, 35 - self.difficulty * 2))
+            gap_x += self.rng.randint(12, max(14, 35 - self.difficulty * 2))
             if gap_x > LEVEL_WIDTH_TILES - 45:
                 break
-            gw = random.randint(2, min(2 + self.difficulty // 3, 4))
+            gw = self.rng.randint(2, min(2 + self.difficulty // 3, 4))
             self._place_gap(gap_x, gw, gy)
             gap_x += gw + 5
 
         px = 28
         while px < LEVEL_WIDTH_TILES - 45:
-            px += random.randint(14, 28)
+            px += self.rng.randint(14, 28)
             self._place_pipe(px, gy)
 
         self._gen_block_formations(gy)
@@ -503,35 +847,35 @@ class LevelData:
                 self.tiles[ceil_y + 1][x] = 1
 
         if self.difficulty >= 3:
-            for sx in range(40, LEVEL_WIDTH_TILES - 50, random.randint(35, 60)):
-                sw = random.randint(4, 8)
+            for sx in range(40, LEVEL_WIDTH_TILES - 50, self.rng.randint(35, 60)):
+                sw = self.rng.randint(4, 8)
                 for x in range(sx, min(sx + sw, LEVEL_WIDTH_TILES)):
                     self.tiles[ceil_y][x] = 0
                     self.tiles[ceil_y - 1][x] = 0
 
         for section in range(3 + self.difficulty):
-            cx = random.randint(15 + section * 20, 25 + section * 25)
+            cx = self.rng.randint(15 + section * 20, 25 + section * 25)
             if cx >= LEVEL_WIDTH_TILES - 30:
                 break
-            cy = gy - random.randint(2, 4)
-            cw = random.randint(4, 8)
+            cy = gy - self.rng.randint(2, 4)
+            cw = self.rng.randint(4, 8)
             for i in range(cw):
                 if cx + i < LEVEL_WIDTH_TILES:
                     self._place_q_block(cx + i, cy, CONTENTS_COIN)
 
         for section in range(2 + self.difficulty // 2):
-            bx = random.randint(20 + section * 30, 40 + section * 30)
+            bx = self.rng.randint(20 + section * 30, 40 + section * 30)
             if bx >= LEVEL_WIDTH_TILES - 30:
                 break
-            bw = random.randint(3, 7)
-            by = gy - random.randint(3, 5)
+            bw = self.rng.randint(3, 7)
+            by = gy - self.rng.randint(3, 5)
             for i in range(bw):
                 self._place_brick(bx + i, by)
 
         num_gaps = self.difficulty // 2
         gx = 40
         for _ in range(num_gaps):
-            gx += random.randint(25, 45)
+            gx += self.rng.randint(25, 45)
             if gx > LEVEL_WIDTH_TILES - 40:
                 break
             self._place_gap(gx, 2, gy)
@@ -539,10 +883,10 @@ class LevelData:
         if self.difficulty >= 2:
             ppx = 50
             while ppx < LEVEL_WIDTH_TILES - 50:
-                ppx += random.randint(30, 50)
+                ppx += self.rng.randint(30, 50)
                 self._place_pipe(ppx, gy)
 
-        mx = random.randint(20, 60)
+        mx = self.rng.randint(20, 60)
         self._place_q_block(mx, gy - 4, CONTENTS_MUSHROOM)
         self._gen_enemies_ground(gy)
 
@@ -552,25 +896,25 @@ class LevelData:
 
         px = 16
         while px < LEVEL_WIDTH_TILES - 20:
-            pw = random.randint(max(3, 7 - self.difficulty // 2), 8)
-            target_y = random.randint(max(4, gy - 5 - self.difficulty // 2), gy - 1)
+            pw = self.rng.randint(max(3, 7 - self.difficulty // 2), 8)
+            target_y = self.rng.randint(max(4, gy - 5 - self.difficulty // 2), gy - 1)
 
             for i in range(pw):
                 if px + i < LEVEL_WIDTH_TILES:
                     self.tiles[target_y][px + i] = 1
 
-            if random.random() < 0.4 + self.difficulty * 0.05:
-                etype = 'koopa' if random.random() < 0.4 else 'goomba'
+            if self.rng.random() < 0.4 + self.difficulty * 0.05:
+                etype = 'koopa' if self.rng.random() < 0.4 else 'goomba'
                 self._add_enemy(px + pw // 2, target_y - 1, etype)
 
-            if random.random() < 0.3:
+            if self.rng.random() < 0.3:
                 by = target_y - 3
-                content = CONTENTS_MUSHROOM if random.random() < 0.2 else CONTENTS_COIN
+                content = CONTENTS_MUSHROOM if self.rng.random() < 0.2 else CONTENTS_COIN
                 self._place_q_block(px + pw // 2, by, content)
 
             gap_lo = max(2, 3 - self.difficulty // 4)
             gap_hi = max(gap_lo + 1, min(5, 2 + self.difficulty // 3 + 1))
-            gap = random.randint(gap_lo, gap_hi)
+            gap = self.rng.randint(gap_lo, gap_hi)
             px += pw + gap
 
         for x in range(LEVEL_WIDTH_TILES - 16, LEVEL_WIDTH_TILES):
@@ -578,10 +922,10 @@ class LevelData:
             self.tiles[gy + 1][x] = 1
 
         for x in range(8, LEVEL_WIDTH_TILES, 16):
-            if random.random() < 0.3:
-                self.decor.append(('mushroom_tree', x * TILE, random.randint(200, 450)))
-            if random.random() < 0.5:
-                self.decor.append(('cloud', x * TILE, random.randint(30, 120)))
+            if self.rng.random() < 0.3:
+                self.decor.append(('mushroom_tree', x * TILE, self.rng.randint(200, 450)))
+            if self.rng.random() < 0.5:
+                self.decor.append(('cloud', x * TILE, self.rng.randint(30, 120)))
 
     def _gen_castle(self):
         gy = self._ground_row()
@@ -597,28 +941,28 @@ class LevelData:
         num_pits = 2 + self.difficulty
         pit_x = 20
         for _ in range(num_pits):
-            pit_x += random.randint(10, max(12, 30 - self.difficulty * 2))
+            pit_x += self.rng.randint(10, max(12, 30 - self.difficulty * 2))
             if pit_x > LEVEL_WIDTH_TILES - 60:
                 break
-            pw = random.randint(2, min(2 + self.difficulty // 2, 5))
+            pw = self.rng.randint(2, min(2 + self.difficulty // 2, 5))
             self._place_gap(pit_x, pw, gy)
             self.lava_ranges.append((pit_x, pit_x + pw))
             pit_x += pw + 5
 
         for section in range(4 + self.difficulty):
-            sx = random.randint(15 + section * 20, 30 + section * 20)
+            sx = self.rng.randint(15 + section * 20, 30 + section * 20)
             if sx >= LEVEL_WIDTH_TILES - 65:
                 break
-            py = gy - random.randint(2, 5)
-            ppw = random.randint(2, 5)
+            py = gy - self.rng.randint(2, 5)
+            ppw = self.rng.randint(2, 5)
             for i in range(ppw):
                 self._place_hard(sx + i, py)
 
         for section in range(2 + self.difficulty // 3):
-            bx = random.randint(25 + section * 35, 50 + section * 35)
+            bx = self.rng.randint(25 + section * 35, 50 + section * 35)
             if bx >= LEVEL_WIDTH_TILES - 65:
                 break
-            by = gy - random.randint(3, 4)
+            by = gy - self.rng.randint(3, 4)
             content = CONTENTS_MUSHROOM if section == 0 else CONTENTS_COIN
             self._place_q_block(bx, by, content)
             self._place_brick(bx - 1, by)
@@ -626,11 +970,11 @@ class LevelData:
 
         enemy_count = 3 + self.difficulty
         for i in range(enemy_count):
-            ex = random.randint(20 + i * 15, 30 + i * 18)
+            ex = self.rng.randint(20 + i * 15, 30 + i * 18)
             if ex >= LEVEL_WIDTH_TILES - 65:
                 break
             if self.tiles[gy][ex] != 0:
-                etype = 'koopa' if random.random() < 0.3 + self.difficulty * 0.05 else 'goomba'
+                etype = 'koopa' if self.rng.random() < 0.3 + self.difficulty * 0.05 else 'goomba'
                 self._add_enemy(ex, gy - 1, etype)
 
         bridge_start = LEVEL_WIDTH_TILES - 30
@@ -673,11 +1017,11 @@ class LevelData:
     def _gen_block_formations(self, gy):
         x = 16
         while x < LEVEL_WIDTH_TILES - 35:
-            x += random.randint(6, max(8, 18 - self.difficulty))
+            x += self.rng.randint(6, max(8, 18 - self.difficulty))
             if self.tiles[gy][x] == 0:
                 continue
-            r = random.random()
-            h = random.randint(3, 4)
+            r = self.rng.random()
+            h = self.rng.randint(3, 4)
             by = gy - h
             if r < 0.06:
                 self._place_brick(x, by)
@@ -686,18 +1030,18 @@ class LevelData:
                 x += 3
             elif r < 0.14:
                 content = CONTENTS_COIN
-                if random.random() < 0.1:
+                if self.rng.random() < 0.1:
                     content = CONTENTS_1UP
                 self._place_q_block(x, by, content)
             elif r < 0.20:
-                bw = random.randint(3, 6)
+                bw = self.rng.randint(3, 6)
                 for i in range(bw):
                     self._place_brick(x + i, by)
-                if random.random() < 0.3:
+                if self.rng.random() < 0.3:
                     self._place_q_block(x + bw // 2, by, CONTENTS_COIN)
                 x += bw
             elif r < 0.25:
-                sh = random.randint(2, min(3 + self.difficulty // 3, 6))
+                sh = self.rng.randint(2, min(3 + self.difficulty // 3, 6))
                 for row in range(sh):
                     for col in range(row + 1):
                         bx = x + col
@@ -709,18 +1053,361 @@ class LevelData:
     def _gen_enemies_ground(self, gy):
         spacing = max(8, 16 - self.difficulty)
         for x in range(22, LEVEL_WIDTH_TILES - 35, spacing):
-            if random.random() < 0.35 + self.difficulty * 0.04:
+            if self.rng.random() < 0.35 + self.difficulty * 0.04:
                 if self.tiles[gy][x] != 1 and self.tiles[gy][x] != 4:
                     continue
                 if self.tiles[gy - 1][x] != 0:
                     continue
-                etype = 'goomba' if random.random() < max(0.5, 0.9 - self.difficulty * 0.05) else 'koopa'
+                etype = 'goomba' if self.rng.random() < max(0.5, 0.9 - self.difficulty * 0.05) else 'koopa'
                 self._add_enemy(x, gy - 1, etype)
-                if self.difficulty >= 4 and random.random() < 0.3:
+                if self.difficulty >= 4 and self.rng.random() < 0.3:
                     if x + 2 < LEVEL_WIDTH_TILES and self.tiles[gy - 1][x + 2] == 0:
                         self._add_enemy(x + 2, gy - 1, etype)
 
 
+class LevelPack:
+    """Every generated level serialized into one versioned binary file.
+
+    The file is a header, an index of (world, level, offset, length) entries
+    and one record per level. It is memory-mapped when first opened and a
+    record is only decoded when that level starts.
+    """
+    MAGIC = b'UMLP'
+    HEADER = struct.Struct('<4sHH')        # magic, version, level count
+    ENTRY = struct.Struct('<BBII')         # world, level, offset, length
+    COUNTS = struct.Struct('<HHHHHH')      # blocks, enemies, decor, pipes, lava ranges, bridge tiles
+    BLOCK = struct.Struct('<BBB')          # x, y, content
+    ENEMY = struct.Struct('<Biid')         # type, x, y, vx
+    DECOR = struct.Struct('<Bii')          # kind, x, y
+    PIPE = struct.Struct('<BBB')           # x, top, height
+    SPAN = struct.Struct('<hh')            # lava range start, end
+    CELL = struct.Struct('<BB')            # bridge tile x, y
+    TAIL = struct.Struct('<BiB')           # has_flag, axe_x, has_bowser
+    BOWSER = struct.Struct('<dddBii')      # x, y, vx, hp, left_bound, right_bound
+    CONTENTS = (CONTENTS_COIN, CONTENTS_MUSHROOM, CONTENTS_FIRE, CONTENTS_STAR, CONTENTS_1UP)
+    ENEMIES = ('goomba', 'koopa')
+    DECOR_KINDS = ('cloud', 'bush', 'hill', 'mushroom_tree')
+    LEVELS = [(w, l) for w in range(1, 9) for l in range(1, 5)]
+
+    def __init__(self, buf):
+        self.buf = buf
+        magic, version, count = self.HEADER.unpack_from(buf, 0)
+        if magic != self.MAGIC or version != LEVEL_PACK_VERSION:
+            raise ValueError(f"not a version {LEVEL_PACK_VERSION} level pack")
+        self.index = {}
+        for i in range(count):
+            world, level, offset, length = self.ENTRY.unpack_from(buf, self.HEADER.size + i * self.ENTRY.size)
+            self.index[(world, level)] = (offset, length)
+
+    @classmethod
+    def open(cls, path):
+        """Map the pack at path, or None if it is missing or from another version"""
+        try:
+            with open(path, 'rb') as f:
+                return cls(mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ))
+        except (OSError, ValueError, struct.error):
+            return None
+
+    @classmethod
+    def compile(cls, path, levels=None):
+        """Generate every level and write the pack; returns its size in bytes"""
+        levels = levels or cls.LEVELS
+        records = [cls.encode(LevelData(world, level)) for world, level in levels]
+        offset = cls.HEADER.size + cls.ENTRY.size * len(levels)
+        out = [cls.HEADER.pack(cls.MAGIC, LEVEL_PACK_VERSION, len(levels))]
+        for (world, level), record in zip(levels, records):
+            out.append(cls.ENTRY.pack(world, level, offset, len(record)))
+            offset += len(record)
+        data = b''.join(out + records)
+        with open(path, 'wb') as f:
+            f.write(data)
+        return len(data)
+
+    @classmethod
+    def encode(cls, ld):
+        out = [bytes(t for row in ld.tiles for t in row),
+               cls.COUNTS.pack(len(ld.blocks), len(ld.enemies), len(ld.decor), len(ld.pipes),
+                               len(ld.lava_ranges), len(ld.bridge_tiles))]
+        for (x, y), content in ld.blocks.items():
+            out.append(cls.BLOCK.pack(x, y, cls.CONTENTS.index(content)))
+        for e in ld.enemies:
+            out.append(cls.ENEMY.pack(cls.ENEMIES.index(e['type']), e['x'], e['y'], e['vx']))
+        for kind, x, y in ld.decor:
+            out.append(cls.DECOR.pack(cls.DECOR_KINDS.index(kind), x, y))
+        out += [cls.PIPE.pack(*pipe) for pipe in ld.pipes]
+        out += [cls.SPAN.pack(*span) for span in ld.lava_ranges]
+        out += [cls.CELL.pack(*cell) for cell in ld.bridge_tiles]
+        b = ld.bowser
+        out.append(cls.TAIL.pack(ld.has_flag, ld.axe_x, b is not None))
+        if b is not None:
+            out.append(cls.BOWSER.pack(b['x'], b['y'], b['vx'], b['hp'], b['left_bound'], b['right_bound']))
+        return b''.join(out)
+
+    def read(self, world, level):
+        """Decode one level, or None if the pack doesn't have it"""
+        entry = self.index.get((world, level))
+        if entry is None:
+            return None
+        buf, pos = self.buf, entry[0]
+        ld = LevelData(world, level, generate=False)
+        ld.tiles = [list(buf[pos + y * LEVEL_WIDTH_TILES:pos + (y + 1) * LEVEL_WIDTH_TILES])
+                    for y in range(LEVEL_HEIGHT_TILES)]
+        pos += LEVEL_WIDTH_TILES * LEVEL_HEIGHT_TILES
+        n_blocks, n_enemies, n_decor, n_pipes, n_lava, n_bridge = self.COUNTS.unpack_from(buf, pos)
+        pos += self.COUNTS.size
+        for x, y, content in self.BLOCK.iter_unpack(buf[pos:pos + n_blocks * self.BLOCK.size]):
+            ld.blocks[(x, y)] = self.CONTENTS[content]
+        pos += n_blocks * self.BLOCK.size
+        for etype, x, y, vx in self.ENEMY.iter_unpack(buf[pos:pos + n_enemies * self.ENEMY.size]):
+            ld.enemies.append({'type': self.ENEMIES[etype], 'x': x, 'y': y,
+                               'vx': vx, 'vy': 0, 'alive': True, 'frame': 0, 'facing': -1,
+                               'shell': False, 'chain': 0})
+        pos += n_enemies * self.ENEMY.size
+        ld.decor = [(self.DECOR_KINDS[kind], x, y)
+                    for kind, x, y in self.DECOR.iter_unpack(buf[pos:pos + n_decor * self.DECOR.size])]
+        pos += n_decor * self.DECOR.size
+        ld.pipes = list(self.PIPE.iter_unpack(buf[pos:pos + n_pipes * self.PIPE.size]))
+        pos += n_pipes * self.PIPE.size
+        ld.lava_ranges = list(self.SPAN.iter_unpack(buf[pos:pos + n_lava * self.SPAN.size]))
+        pos += n_lava * self.SPAN.size
+        ld.bridge_tiles = list(self.CELL.iter_unpack(buf[pos:pos + n_bridge * self.CELL.size]))
+        pos += n_bridge * self.CELL.size
+        has_flag, ld.axe_x, has_bowser = self.TAIL.unpack_from(buf, pos)
+        ld.has_flag = bool(has_flag)
+        pos += self.TAIL.size
+        if has_bowser:
+            x, y, vx, hp, left, right = self.BOWSER.unpack_from(buf, pos)
+            ld.bowser = {
+                'x': x, 'y': y, 'vx': vx,
+                'vy': 0, 'alive': True, 'hp': hp,
+                'frame': 0, 'fire_timer': 0, 'fireballs': [],
+                'left_bound': left, 'right_bound': right
+            }
+        return ld
+
+
+# ─── Enemy Contacts ──────────────────────────────────────────────────────────
+class SweepAndPrune:
+    """Finds overlapping enemies by sweeping along x.
+
+    Enemies are kept in a list ordered by x. They move only a few pixels a
+    frame, so the list is nearly sorted already, and an insertion sort
+    restores it in close to linear time. The sweep then compares each enemy
+    only with those whose left edge falls before its right edge.
+    """
+    W = H = TILE - 8 # The enemy hitbox the player is tested against
+
+    def __init__(self, enemies=()):
+        self.reset(enemies)
+
+    def reset(self, enemies):
+        self.order = sorted(enemies, key=lambda e: e['x'])
+        self.swaps = self.tests = 0
+
+    def sort(self):
+        """Drop dead enemies and insertion-sort the rest back into x order"""
+        order = [e for e in self.order if e['alive']]
+        for i in range(1, len(order)):
+            e = order[i]
+            x = e['x']
+            j = i
+            while j and order[j - 1]['x'] > x:
+                order[j] = order[j - 1]
+                j -= 1
+            if j != i:
+                order[j] = e
+                self.swaps += i - j
+        self.order = order
+
+    def pairs(self, left, right):
+        """Overlapping (a, b) pairs, a left of b, among enemies with left <= x <= right"""
+        self.sort()
+        order, w, h = self.order, self.W, self.H
+        n = len(order)
+        found = []
+        for i in range(n):
+            a = order[i]
+            ax = a['x']
+            if ax < left: continue
+            if ax > right: break
+            reach, ay = ax + w, a['y']
+            for j in range(i + 1, n):
+                b = order[j]
+                bx = b['x']
+                if bx >= reach or bx > right: break
+                self.tests += 1
+                if -h < b['y'] - ay < h:
+                    found.append((a, b))
+        return found
+
+
+# ─── Rewind ──────────────────────────────────────────────────────────────────
+class StateCodec:
+    """Packs the play state of one level into bytes and back.
+
+    A snapshot is the game timers, the player, the tile grid, which of the
+    level's blocks are still unhit, every enemy and Bowser, laid out with
+    fixed structs so consecutive frames line up byte for byte. Blocks and
+    enemies are tied to the level the codec was made for; particles are
+    cosmetic and not recorded.
+    """
+    HEAD = struct.Struct('<diiiiiBB')      # cam_x, frame_count, death/level/tick/clear timers, fireballs, bowser fireballs
+    PLAYER = struct.Struct('<5dBbBhHiiihh') # x, y, vx, vy, frame, flags, facing, state, lives, coins, score,
+                                            # invincible, star, coyote_timer, grow_timer
+    FIREBALL = struct.Struct('<4d')        # x, y, vx, vy
+    ENEMY = struct.Struct('<4dibBH')       # x, y, vx, vy, frame, facing, alive | shell << 1, chain
+    BOWSER = struct.Struct('<4dBhii')      # x, y, vx, vy, alive, hp, frame, fire_timer
+    BOWSER_FIREBALL = struct.Struct('<3d') # x, y, vx
+    STATES = ('idle', 'walk', 'skid', 'jump')
+    FLAGS = ('big', 'fire', 'on_ground', 'dead', 'reached_flag')
+
+    def __init__(self, level_data):
+        self.ld = level_data
+        self.block_keys = list(level_data.blocks)
+        self.block_contents = dict(level_data.blocks)
+        self.mask_size = (len(self.block_keys) + 7) // 8
+
+    def capture(self, game):
+        p, ld, b = game.player, self.ld, self.ld.bowser
+        bowser_fireballs = b['fireballs'] if b else ()
+        flags = 0
+        for i, name in enumerate(self.FLAGS):
+            if getattr(p, name):
+                flags |= 1 << i
+        out = [self.HEAD.pack(game.cam_x, game.frame_count, game.death_timer, game.level_timer,
+                              game.timer_tick, game.clear_timer, len(p.fireballs), len(bowser_fireballs)),
+               self.PLAYER.pack(p.x, p.y, p.vx, p.vy, p.frame, flags, p.facing, self.STATES.index(p.state),
+                                p.lives, p.coins, p.score, p.invincible, p.star, p.coyote_timer, p.grow_timer)]
+        out += [self.FIREBALL.pack(f['x'], f['y'], f['vx'], f['vy']) for f in p.fireballs]
+        out += [bytes(row) for row in ld.tiles]
+        blocks = ld.blocks
+        mask = 0
+        for i, key in enumerate(self.block_keys):
+            if key in blocks:
+                mask |= 1 << i
+        out.append(mask.to_bytes(self.mask_size, 'little'))
+        pack = self.ENEMY.pack
+        out += [pack(e['x'], e['y'], e['vx'], e['vy'], e['frame'], e['facing'],
+                     e['alive'] | e['shell'] << 1, e['chain']) for e in ld.enemies]
+        if b:
+            out.append(self.BOWSER.pack(b['x'], b['y'], b['vx'], b['vy'], b['alive'], b['hp'],
+                                        b['frame'], b['fire_timer']))
+            out += [self.BOWSER_FIREBALL.pack(f['x'], f['y'], f['vx']) for f in bowser_fireballs]
+        return b''.join(out)
+
+    def restore(self, game, data):
+        """Put a captured state back, re-rendering any chunk whose tiles differ"""
+        p, ld, b = game.player, self.ld, self.ld.bowser
+        (game.cam_x, game.frame_count, game.death_timer, game.level_timer, game.timer_tick,
+         game.clear_timer, n_fireballs, n_bowser_fireballs) = self.HEAD.unpack_from(data, 0)
+        pos = self.HEAD.size
+        (p.x, p.y, p.vx, p.vy, p.frame, flags, p.facing, state, p.lives, p.coins, p.score,
+         p.invincible, p.star, p.coyote_timer, p.grow_timer) = self.PLAYER.unpack_from(data, pos)
+        pos += self.PLAYER.size
+        for i, name in enumerate(self.FLAGS):
+            setattr(p, name, bool(flags >> i & 1))
+        p.state = self.STATES[state]
+        p.fireballs = [{'x': x, 'y': y, 'vx': vx, 'vy': vy}
+                       for x, y, vx, vy in self.FIREBALL.iter_unpack(data[pos:pos + n_fireballs * self.FIREBALL.size])]
+        pos += n_fireballs * self.FIREBALL.size
+        for y, row in enumerate(ld.tiles):
+            saved = data[pos:pos + LEVEL_WIDTH_TILES]
+            pos += LEVEL_WIDTH_TILES
+            if bytes(row) != saved:
+                for x, t in enumerate(saved):
+                    if row[x] != t:
+                        row[x] = t
+                        game.chunk_cache.invalidate(x)
+        mask = int.from_bytes(data[pos:pos + self.mask_size], 'little')
+        pos += self.mask_size
+        ld.blocks = {key: self.block_contents[key] for i, key in enumerate(self.block_keys) if mask >> i & 1}
+        for e in ld.enemies:
+            (e['x'], e['y'], e['vx'], e['vy'], e['frame'], e['facing'],
+             flags, e['chain']) = self.ENEMY.unpack_from(data, pos)
+            e['alive'], e['shell'] = bool(flags & 1), bool(flags & 2)
+            pos += self.ENEMY.size
+        if b:
+            (b['x'], b['y'], b['vx'], b['vy'], alive, b['hp'],
+             b['frame'], b['fire_timer']) = self.BOWSER.unpack_from(data, pos)
+            b['alive'] = bool(alive)
+            pos += self.BOWSER.size
+            end = pos + n_bowser_fireballs * self.BOWSER_FIREBALL.size
+            b['fireballs'] = [{'x': x, 'y': y, 'vx': vx}
+                              for x, y, vx in self.BOWSER_FIREBALL.iter_unpack(data[pos:end])]
+        game.contacts.reset(ld.enemies) # Revived enemies rejoin the sweep
+        game.particles = []
+        game.fx.clear()
+
+
+class RewindBuffer:
+    """The last few seconds of snapshots in a fixed ring of slots.
+
+    Every REWIND_KEYFRAME frames a snapshot is kept whole as a keyframe.
+    The frames in between are XORed against it, which zeroes every byte
+    that hasn't changed, and zlib squeezes the zeros out. Each slot holds
+    its own reference to its keyframe, so overwriting the keyframe's slot
+    when the ring wraps never orphans the deltas after it. A snapshot of a
+    different length (a fireball appeared or vanished) starts a new keyframe.
+    """
+    def __init__(self, size=REWIND_SECONDS * FPS, keyframe=REWIND_KEYFRAME):
+        self.slots = [None] * size
+        self.keyframe = keyframe
+        self.clear()
+        self.keyframes = 0
+        self.deltas = 0
+
+    def clear(self):
+        self.slots[:] = [None] * len(self.slots)
+        self.head = 0
+        self.count = 0
+        self.key = None
+        self.since_key = 0
+
+    def __len__(self):
+        return self.count
+
+    @staticmethod
+    def _xor(data, key):
+        return (int.from_bytes(data, 'little') ^ int.from_bytes(key, 'little')).to_bytes(len(data), 'little')
+
+    def push(self, data):
+        key = self.key
+        if key is None or self.since_key >= self.keyframe or len(data) != len(key):
+            self.key, self.since_key = data, 1
+            self.slots[self.head] = (data, None)
+            self.keyframes += 1
+        else:
+            self.slots[self.head] = (key, zlib.compress(self._xor(data, key), 1))
+            self.since_key += 1
+            self.deltas += 1
+        self.head = (self.head + 1) % len(self.slots)
+        self.count = min(self.count + 1, len(self.slots))
+
+    def pop(self):
+        """The newest snapshot, removed from the ring, or None once it's empty"""
+        if not self.count:
+            return None
+        self.head = (self.head - 1) % len(self.slots)
+        key, delta = self.slots[self.head]
+        self.slots[self.head] = None
+        self.count -= 1
+        self.key = None # Recording resumes with a fresh keyframe
+        return key if delta is None else self._xor(zlib.decompress(delta), key)
+
+    def size_bytes(self):
+        """Bytes held by the ring, counting each keyframe once"""
+        keys, total = set(), 0
+        for slot in self.slots:
+            if slot is None: continue
+            key, delta = slot
+            if delta is not None:
+                total += len(delta)
+            if id(key) not in keys:
+                keys.add(id(key))
+                total += len(key)
+        return total
+
+
 # ─── Player ─────────────────────────────────────────────────────────────────
 class Player:
     def __init__(self, x, y):
@@ -738,6 +1425,7 @@ class Player:
         self.state = 'idle'
         self.frame = 0.0
         self.invincible = 0
+        self.star = 0
         self.coyote_timer = 0
         self.fireballs = []
         self.grow_timer = 0
@@ -769,6 +1457,7 @@ class Game:
         self.level = 1
         self.frame_count = 0
         self.particles = []
+        self.fx = ParticleSystem(self.hud_font)
         self.death_timer = 0
         self.level_timer = 400
         self.timer_tick = 0
@@ -777,6 +1466,10 @@ class Game:
         self.player = None
         self.level_data = None
         self.cam_x = 0
+        self.chunk_cache = None
+        self.sprites = SpriteCache()
+        self.rewind = RewindBuffer()
+        self.codec = None
         self.saved_big = False
         self.saved_fire = False
         self.saved_lives = 3
@@ -785,7 +1478,11 @@ class Game:
         self.reset_level()
 
     def reset_level(self):
-        self.level_data = LevelData(self.world, self.level)
+        self.level_data = LevelData.load(self.world, self.level)
+        self.chunk_cache = ChunkCache(self.level_data)
+        self.contacts = SweepAndPrune(self.level_data.enemies)
+        self.codec = StateCodec(self.level_data)
+        self.rewind.clear()
         gy = LEVEL_HEIGHT_TILES - 2
         spawn_y = (gy - 1) * TILE
         if self.level_data.level_type == 'athletic':
@@ -804,6 +1501,7 @@ class Game:
             self.player.y -= TILE
         self.cam_x = 0
         self.particles = []
+        self.fx.clear()
         self.death_timer = 0
         self.clear_timer = 0
         self.level_timer = self.level_data.time
@@ -841,7 +1539,11 @@ class Game:
                     self.state = 'playing'
                     self.reset_level()
             elif self.state == 'playing':
-                self.update_game()
+                if REWIND and pygame.key.get_pressed()[REWIND_KEY]:
+                    self.rewind_frame()
+                else:
+                    self.update_game()
+                    self.record_frame()
                 self.draw_game()
                 self.audio.update_music()
             elif self.state == 'game_over':
@@ -885,6 +1587,18 @@ class Game:
                     if e.key == pygame.K_RETURN:
                         self.state = 'menu'
 
+    def record_frame(self):
+        if REWIND and self.state == 'playing':
+            self.rewind.push(self.codec.capture(self))
+
+    def rewind_frame(self):
+        """Step back one recorded frame; False once the history is used up"""
+        data = self.rewind.pop()
+        if data is None:
+            return False
+        self.codec.restore(self, data)
+        return True
+
     def fireball(self):
         p = self.player
         if len(p.fireballs) < 2:
@@ -935,6 +1649,8 @@ class Game:
 
         if p.invincible > 0:
             p.invincible -= 1
+        if p.star > 0:
+            p.star -= 1
 
         self.timer_tick += 1
         if self.timer_tick >= 24:
@@ -1025,7 +1741,7 @@ class Game:
                 p.vy = 0
                 self.audio.play('bowser_fall')
                 for bx, by in ld.bridge_tiles:
-                    ld.tiles[by][bx] = 0
+                    self.set_tile(bx, by, 0)
                 if ld.bowser['alive']:
                     ld.bowser['alive'] = False
                     ld.bowser['vy'] = 2
@@ -1087,7 +1803,7 @@ class Game:
                         p.score += 5000
                         self.add_particle(b['x'], b['y'], 'text', '5000')
                         for btx, bty in ld.bridge_tiles:
-                            ld.tiles[bty][btx] = 0
+                            self.set_tile(btx, bty, 0)
                         p.reached_flag = True
                         p.vx = 0
                     break
@@ -1126,7 +1842,7 @@ class Game:
             if 0 <= floor_y < LEVEL_HEIGHT_TILES and 0 <= floor_ahead_x < LEVEL_WIDTH_TILES:
                 if ld.tiles[floor_y][floor_ahead_x] != 0:
                     no_floor = False
-            if wall_hit or no_floor:
+            if wall_hit or (no_floor and not e['shell']): # Shells slide off ledges
                 e['vx'] *= -1
                 e['facing'] *= -1
             if e['x'] < self.cam_x - TILE:
@@ -1136,8 +1852,11 @@ class Game:
                 e['alive'] = False
                 continue
             e_rect = pygame.Rect(e['x'] + 4, e['y'] + 8, TILE - 8, TILE - 8)
-            if p.rect.colliderect(e_rect) and not p.invincible:
-                if p.vy > 0 and p.rect.bottom < e['y'] + TILE // 2 + 8:
+            if p.rect.colliderect(e_rect) and (p.star or not p.invincible):
+                stomp = p.vy > 0 and p.rect.bottom < e['y'] + TILE // 2 + 8
+                if ENEMY_CONTACTS:
+                    self.touch_enemy(e, stomp)
+                elif stomp:
                     e['alive'] = False
                     p.vy = BOUNCE_FORCE
                     self.audio.play('stomp')
@@ -1146,6 +1865,11 @@ class Game:
                 else:
                     self.damage_player()
 
+        if ENEMY_CONTACTS:
+            for a, b in self.contacts.pairs(p.x - SCREEN_W - 100, p.x + SCREEN_W + 100):
+                if a['alive'] and b['alive']:
+                    self.enemy_contact(a, b)
+
         for f in p.fireballs[:]:
             f['x'] += f['vx']
             f['y'] += f['vy']
@@ -1174,6 +1898,64 @@ class Game:
             if hit and f in p.fireballs:
                 p.fireballs.remove(f)
 
+    def touch_enemy(self, e, stomp):
+        """The player touching an enemy: stars kill, koopas retreat into shells, still shells get kicked"""
+        p = self.player
+        if p.star:
+            self.defeat_enemy(e, 200)
+        elif stomp:
+            p.vy = BOUNCE_FORCE
+            if e['type'] != 'koopa':
+                self.defeat_enemy(e, 100)
+            elif e['shell'] and e['vx'] == 0:
+                self.kick_shell(e)
+            else: # A walking koopa shells up, a moving shell stops
+                e['shell'], e['vx'], e['chain'] = True, 0, 0
+                self.audio.play('stomp')
+                self.add_particle(e['x'], e['y'], 'text', '100')
+                p.score += 100
+        elif e['shell'] and e['vx'] == 0:
+            self.kick_shell(e)
+        else:
+            self.damage_player()
+
+    def kick_shell(self, e):
+        """Send a still shell away from the player, clear of his hitbox so it can't hit him back"""
+        p = self.player
+        rect = p.rect
+        if rect.centerx < e['x'] + TILE // 2:
+            e['vx'], e['x'] = SHELL_SPEED, float(rect.right - 4)
+        else:
+            e['vx'], e['x'] = -SHELL_SPEED, float(rect.left - TILE + 4)
+        e['facing'] = 1 if e['vx'] > 0 else -1
+        e['chain'] = 0
+        self.audio.play('stomp')
+        self.add_particle(e['x'], e['y'], 'text', '400')
+        p.score += 400
+
+    def defeat_enemy(self, e, score):
+        e['alive'] = False
+        self.audio.play('stomp')
+        self.add_particle(e['x'], e['y'], 'text', str(score))
+        self.player.score += score
+
+    def enemy_contact(self, a, b):
+        """Two overlapping enemies, a left of b: moving shells take out the other, walkers turn apart"""
+        a_moving = a['shell'] and a['vx'] != 0
+        b_moving = b['shell'] and b['vx'] != 0
+        if a_moving and b_moving:
+            self.defeat_enemy(a, SHELL_CHAIN[0])
+            self.defeat_enemy(b, SHELL_CHAIN[0])
+        elif a_moving or b_moving:
+            shell, victim = (a, b) if a_moving else (b, a)
+            self.defeat_enemy(victim, SHELL_CHAIN[min(shell['chain'], len(SHELL_CHAIN) - 1)])
+            shell['chain'] += 1
+        else:
+            if not (a['shell'] or a['vx'] < 0): # A still shell is a wall
+                a['vx'], a['facing'] = -a['vx'], -1
+            if not (b['shell'] or b['vx'] > 0):
+                b['vx'], b['facing'] = -b['vx'], 1
+
     def check_collision(self, ent, axis):
         ld = self.level_data
         rect = ent.rect
@@ -1207,10 +1989,15 @@ class Game:
                             if tile not in (9, 5):
                                 self.hit_block(tx, ty)
 
+    def set_tile(self, x, y, t):
+        """Change a level tile at runtime, re-rendering only its chunk"""
+        self.level_data.tiles[y][x] = t
+        self.chunk_cache.invalidate(x)
+
     def hit_block(self, x, y):
         ld = self.level_data
         if ld.tiles[y][x] == 3:
-            ld.tiles[y][x] = 2
+            self.set_tile(x, y, 2)
             self.audio.play('bump')
             if (x, y) in ld.blocks:
                 content = ld.blocks.pop((x, y))
@@ -1219,6 +2006,8 @@ class Game:
                     self.player.score += 200
                     self.audio.play('coin')
                     self.add_particle(x * TILE, y * TILE - 20, 'text', '200')
+                    for sx, sy in ((-1.5, -3.0), (1.5, -3.0), (-0.75, -4.5), (0.75, -4.5)):
+                        self.add_particle(x * TILE + TILE // 2, y * TILE, 'sparkle', None, sx, sy, 20)
                     if self.player.coins >= 100:
                         self.player.coins -= 100
                         self.player.lives += 1
@@ -1243,20 +2032,18 @@ class Game:
                     self.player.fire = True
                     self.player.big = True
                     self.audio.play('powerup')
+                elif content == CONTENTS_STAR and ENEMY_CONTACTS:
+                    self.player.star = STAR_TIME
+                    self.audio.play('powerup')
+                    self.add_particle(x * TILE, y * TILE - 20, 'text', 'STAR!')
         elif ld.tiles[y][x] == 2:
             if self.player.big:
-                ld.tiles[y][x] = 0
+                self.set_tile(x, y, 0)
                 self.audio.play('break')
                 for dx in (-1, 1):
                     for dy in (-1, 0):
-                        self.particles.append({
-                            'x': x * TILE + TILE // 2 + dx * 10,
-                            'y': y * TILE + dy * 10,
-                            'type': 'debris',
-                            'vx': dx * 3 + random.uniform(-1, 1),
-                            'vy': -6 + dy * 2,
-                            'val': None, 'life': 40
-                        })
+                        self.add_particle(x * TILE + TILE // 2 + dx * 10, y * TILE + dy * 10, 'debris', None,
+                                          dx * 3 + random.uniform(-1, 1), -6 + dy * 2, 40)
             else:
                 self.audio.play('bump')
 
@@ -1284,19 +2071,46 @@ class Game:
         self.death_timer = 0
         self.audio.play('die')
 
-    def add_particle(self, x, y, ptype, val):
+    def add_particle(self, x, y, ptype, val, vx=0, vy=-1.5, life=60):
+        if PARTICLE_POOL:
+            self.fx.spawn(ptype, x, y, vx, vy, life, val)
+            return
         self.particles.append({
-            'x': x, 'y': y, 'type': ptype, 'val': val, 'life': 60,
-            'vx': 0, 'vy': -1.5
+            'x': x, 'y': y, 'type': ptype, 'val': val, 'life': life,
+            'vx': vx, 'vy': vy
         })
 
+    def draw_particles(self, cam):
+        if PARTICLE_POOL:
+            self.fx.update()
+            self.fx.draw(self.screen, cam)
+            return
+        for part in self.particles[:]:
+            part['life'] -= 1
+            part['x'] += part.get('vx', 0)
+            part['y'] += part.get('vy', -1)
+            if part['type'] == 'debris':
+                part['vy'] = part.get('vy', 0) + 0.4
+            if part['life'] <= 0:
+                self.particles.remove(part)
+                continue
+            if part['type'] == 'text':
+                txt = self.hud_font.render(str(part['val']), True, C_WHITE)
+                self.screen.blit(txt, (part['x'] - cam, part['y']))
+            elif part['type'] == 'debris':
+                pygame.draw.rect(self.screen, C_BRICK,
+                                 (int(part['x'] - cam), int(part['y']), 8, 8))
+            elif part['type'] == 'sparkle' and part['life'] % 4:
+                pygame.draw.rect(self.screen, C_COIN_GOLD,
+                                 (int(part['x'] - cam) - 2, int(part['y']) - 2, 4, 4))
+
     def draw_menu(self):
         self.screen.fill(C_BLACK)
         title = self.big_font.render("ULTRA MARIO", True, C_MARIO_RED)
         t2 = self.big_font.render("NES EDITION", True, C_WHITE)
         self.screen.blit(title, (SCREEN_W // 2 - title.get_width() // 2, 100))
         self.screen.blit(t2, (SCREEN_W // 2 - t2.get_width() // 2, 170))
-        draw_mario(self.screen, SCREEN_W // 2 - 20, 280, 'idle', 0, 1, False, False)
+        self.sprites.mario(self.screen, SCREEN_W // 2 - 20, 280, 'idle', 0, 1, False, False)
         if (self.frame_count // 30) % 2 == 0:
             start = self.font.render("PUSH START BUTTON", True, C_QUESTION)
             self.screen.blit(start, (SCREEN_W // 2 - start.get_width() // 2, 370))
@@ -1321,11 +2135,13 @@ class Game:
         self.screen.blit(cr.render("v2.0 32-LEVEL FAMICOM EDITION", True, C_CASTLE_GRAY), (10, 10))
 
     def draw_transition(self):
+        if SPRITE_WARMUP and not self.sprites.sprites:
+            self.sprites.warm_up()
         self.screen.fill(C_BLACK)
         w_text = self.big_font.render(f"WORLD  {self.world}-{self.level}", True, C_WHITE)
         self.screen.blit(w_text, (SCREEN_W // 2 - w_text.get_width() // 2, SCREEN_H // 2 - 60))
-        draw_mario(self.screen, SCREEN_W // 2 - 50, SCREEN_H // 2 + 10, 'idle', 0, 1,
-                   self.saved_big, self.saved_fire)
+        self.sprites.mario(self.screen, SCREEN_W // 2 - 50, SCREEN_H // 2 + 10, 'idle', 0, 1,
+                           self.saved_big, self.saved_fire)
         lives = self.saved_lives
         lt = self.font.render(f"x  {lives}", True, C_WHITE)
         self.screen.blit(lt, (SCREEN_W // 2, SCREEN_H // 2 + 18))
@@ -1360,7 +2176,7 @@ class Game:
         if (self.frame_count // 40) % 2 == 0:
             self.screen.blit(self.small_font.render("PRESS ENTER", True, C_CASTLE_GRAY),
                              (SCREEN_W // 2 - 50, 460))
-        draw_mario(self.screen, SCREEN_W // 2 - 20, 500, 'idle', 0, 1, True, True)
+        self.sprites.mario(self.screen, SCREEN_W // 2 - 20, 500, 'idle', 0, 1, True, True)
         for i, line in enumerate([
             "[C] 1999-2026 AC Computing Gaming Corps.",
             "[1985-2026] [C] Nintendo"
@@ -1396,31 +2212,34 @@ class Game:
 
         gy = LEVEL_HEIGHT_TILES - 2
         for lx_start, lx_end in ld.lava_ranges:
-            for lx in range(lx_start, lx_end):
+            for lx in range(max(lx_start, start_col), min(lx_end, end_col)):
                 sx = lx * TILE - cam
                 sy = gy * TILE
                 wave = int(math.sin(self.frame_count * 0.1 + lx * 0.5) * 4)
                 pygame.draw.rect(self.screen, C_LAVA, (sx, sy + wave, TILE, TILE * 2 - wave))
                 pygame.draw.rect(self.screen, C_LAVA_BRIGHT, (sx + 4, sy + wave, TILE - 8, 6))
 
-        for x in range(start_col, end_col):
-            for y in range(LEVEL_HEIGHT_TILES):
-                t = ld.tiles[y][x]
-                sx = x * TILE - cam
-                sy = y * TILE
-                if t == 1:
-                    draw_block(self.screen, sx, sy, 'ground', underground=ld.underground)
-                elif t == 2:
-                    draw_block(self.screen, sx, sy, 'brick', underground=ld.underground)
-                elif t == 3:
-                    draw_block(self.screen, sx, sy, 'q_block', self.frame_count)
-                elif t == 4:
-                    draw_block(self.screen, sx, sy, 'hard')
-                elif t == 5:
-                    pygame.draw.rect(self.screen, C_BRIDGE, (sx, sy, TILE, TILE // 3))
-                    pygame.draw.rect(self.screen, (120, 80, 0), (sx, sy, TILE, TILE // 3), 2)
-                    for cx in range(0, TILE, 12):
-                        pygame.draw.rect(self.screen, (120, 80, 0), (sx + cx + 2, sy + 4, 8, 4))
+        if CHUNK_CACHE:
+            cache = self.chunk_cache
+            first, last = start_col // CHUNK_TILES, (end_col - 1) // CHUNK_TILES
+            for idx in range(first, last + 1):
+                surf, animated = cache.get(idx)
+                ox = idx * CHUNK_TILES * TILE - cam
+                self.screen.blit(surf, (ox, 0))
+                # Overlay: question blocks animate, so they are never baked
+                for qx, qy in animated:
+                    draw_block(self.screen, ox + qx, qy, 'q_block', self.frame_count)
+            cache.prefetch(last + 1)
+        else:
+            for x in range(start_col, end_col):
+                for y in range(LEVEL_HEIGHT_TILES):
+                    t = ld.tiles[y][x]
+                    sx = x * TILE - cam
+                    sy = y * TILE
+                    if t == 3:
+                        draw_block(self.screen, sx, sy, 'q_block', self.frame_count)
+                    elif t:
+                        draw_static_tile(self.screen, sx, sy, t, ld.underground)
 
         for ppx, ppy, pph in ld.pipes:
             draw_pipe(self.screen, ppx * TILE - cam, ppy * TILE, TILE * 2, pph * TILE)
@@ -1431,7 +2250,7 @@ class Game:
         if ld.bowser:
             b = ld.bowser
             if b['y'] < SCREEN_H + 200:
-                draw_bowser(self.screen, b['x'] - cam, b['y'], b['frame'])
+                self.sprites.bowser(self.screen, b['x'] - cam, b['y'], b['frame'])
             for bf in b.get('fireballs', []):
                 bfx = int(bf['x'] - cam)
                 bfy = int(bf['y'])
@@ -1441,15 +2260,18 @@ class Game:
         for e in ld.enemies:
             if e['alive'] and cam - 50 < e['x'] < cam + SCREEN_W + 50:
                 if e['type'] == 'goomba':
-                    draw_goomba(self.screen, e['x'] - cam, e['y'], e['frame'])
+                    self.sprites.goomba(self.screen, e['x'] - cam, e['y'], e['frame'])
+                elif e['shell']:
+                    self.sprites.shell(self.screen, e['x'] - cam, e['y'])
                 else:
-                    draw_koopa(self.screen, e['x'] - cam, e['y'], e['frame'], e['facing'])
+                    self.sprites.koopa(self.screen, e['x'] - cam, e['y'], e['frame'], e['facing'])
 
         if p and not p.dead:
-            if p.invincible == 0 or (p.invincible % 4) < 2:
-                draw_mario(self.screen, p.x - cam, p.y, p.state, p.frame, p.facing, p.big, p.fire)
+            blink = p.invincible or p.star
+            if blink == 0 or (blink % 4) < 2:
+                self.sprites.mario(self.screen, p.x - cam, p.y, p.state, p.frame, p.facing, p.big, p.fire)
         elif p:
-            draw_mario(self.screen, p.x - cam, p.y, 'jump', 0, p.facing, False, False)
+            self.sprites.mario(self.screen, p.x - cam, p.y, 'jump', 0, p.facing, False, False)
 
         if p:
             for f in p.fireballs:
@@ -1458,21 +2280,7 @@ class Game:
                 pygame.draw.circle(self.screen, C_FIREBALL, (fx, fy), 6)
                 pygame.draw.circle(self.screen, C_COIN_GOLD, (fx, fy), 3)
 
-        for part in self.particles[:]:
-            part['life'] -= 1
-            part['x'] += part.get('vx', 0)
-            part['y'] += part.get('vy', -1)
-            if part['type'] == 'debris':
-                part['vy'] = part.get('vy', 0) + 0.4
-            if part['life'] <= 0:
-                self.particles.remove(part)
-                continue
-            if part['type'] == 'text':
-                txt = self.hud_font.render(str(part['val']), True, C_WHITE)
-                self.screen.blit(txt, (part['x'] - cam, part['y']))
-            elif part['type'] == 'debris':
-                pygame.draw.rect(self.screen, C_BRICK,
-                                 (int(part['x'] - cam), int(part['y']), 8, 8))
+        self.draw_particles(cam)
 
         hud_y = 16
         self.screen.blit(self.hud_font.render(f"MARIO  {p.score:06d}", True, C_HUD), (40, hud_y))
@@ -1485,9 +2293,630 @@ class Game:
         tc = C_HUD if self.level_timer > 100 else C_MARIO_RED
         self.screen.blit(self.hud_font.render(f" {self.level_timer:3d}", True, tc), (580, hud_y + 22))
         self.screen.blit(self.hud_font.render(f"x{p.lives}", True, C_HUD), (690, hud_y))
-        draw_mario(self.screen, 660, hud_y - 8, 'idle', 0, 1, False, False)
+        self.sprites.mario(self.screen, 660, hud_y - 8, 'idle', 0, 1, False, False)
 
 
-if __name__ == '__main__':
+# ─── Self-test / Benchmark (--selftest, --bench) ─────────────────────────────
+def _headless_game():
+    import os
+    os.environ.setdefault('SDL_VIDEODRIVER', 'dummy')
+    os.environ.setdefault('SDL_AUDIODRIVER', 'dummy')
     game = Game()
-    game.run()
+    game.state = 'playing'
+    return game
+
+
+def _load(game, world, level):
+    game.world, game.level = world, level
+    game.reset_level()
+    return game.level_data
+
+
+def selftest_chunks():
+    """Cached chunks must draw the same frame as per-tile drawing, and edits only dirty one chunk"""
+    global CHUNK_CACHE
+    game = _headless_game()
+    for level in (1, 2, 3, 4):
+        ld = _load(game, 3, level)
+        for cam in (0, 200, 767, 768, 2500, 5000, LEVEL_WIDTH_TILES * TILE - SCREEN_W):
+            game.cam_x, game.frame_count = cam, cam % 97
+            # pygame draws a clipped outline rect's border along the clip edge, so
+            # per-tile drawing fakes an edge on half-visible tiles at the screen sides
+            edge = TILE if cam % TILE else 0
+            view = pygame.Rect(edge, 0, SCREEN_W - 2 * edge, SCREEN_H)
+            shots = []
+            for CHUNK_CACHE in (False, True):
+                game.draw_game()
+                shots.append(pygame.image.tostring(game.screen.subsurface(view), 'RGB'))
+            assert shots[0] == shots[1], (ld.level_type, cam)
+        CHUNK_CACHE = True
+        # Breaking a visible brick re-renders exactly one chunk
+        game.cam_x = 0
+        game.draw_game()
+        cache = game.chunk_cache
+        bricks = [(x, y) for x in range(SCREEN_W // TILE) for y in range(LEVEL_HEIGHT_TILES) if ld.tiles[y][x] in (2, 3)]
+        if bricks:
+            x, y = bricks[0]
+            game.player.big = True
+            redraws, misses = cache.redraws, cache.misses
+            game.hit_block(x, y)
+            game.draw_game()
+            assert cache.redraws == redraws + 1 and cache.misses == misses, ld.level_type
+            after = pygame.image.tostring(game.screen, 'RGB')
+            CHUNK_CACHE = False
+            game.draw_game()
+            assert pygame.image.tostring(game.screen, 'RGB') == after, ld.level_type
+            CHUNK_CACHE = True
+        print(f"{ld.level_type:<12} chunk cache ok")
+
+
+def selftest_sprites():
+    """Every cached variant must blit exactly what its draw_* call draws"""
+    game = _headless_game()
+    cache = game.sprites
+    cache.warm_up()
+    variants = len(cache.sprites)
+    a = pygame.Surface((200, 200)).convert()
+    b = pygame.Surface((200, 200)).convert()
+    calls = []
+    for big in (False, True):
+        for fire in (False, True):
+            for state in ('idle', 'walk', 'skid', 'jump'):
+                for frame in (0, 0.2, 1.4, 3):
+                    for facing in (1, -1):
+                        calls.append(('mario', draw_mario, (state, frame, facing, big, fire)))
+    for frame in range(0, 40, 3):
+        calls.append(('goomba', draw_goomba, (frame,)))
+        calls.append(('bowser', draw_bowser, (frame * 3,)))
+        for facing in (1, -1):
+            calls.append(('koopa', draw_koopa, (frame, facing)))
+    calls.append(('shell', draw_shell, ()))
+    for name, draw, args in calls:
+        for x, y in ((60, 60), (60.7, 71.3), (83.2, 40)):
+            a.fill(C_SKY); b.fill(C_SKY)
+            draw(a, x, y, *args)
+            getattr(cache, name)(b, x, y, *args)
+            assert pygame.image.tostring(a, 'RGB') == pygame.image.tostring(b, 'RGB'), (name, args, x, y)
+    assert len(cache.sprites) == variants, "warm_up missed a variant"
+    print(f"sprite cache ok  {variants} variants, {len(calls)} draw calls checked")
+
+
+def benchmark_sprites(frames=200, enemies=100):
+    """draw_game ms/frame with 100 on-screen enemies, procedural vs cached sprites"""
+    import time
+    global SPRITE_CACHE
+    game = _headless_game()
+    ld = _load(game, 1, 1)
+    rng = random.Random(5)
+    ld.enemies = [{'type': 'goomba' if i % 3 else 'koopa', 'x': rng.uniform(0, SCREEN_W - TILE),
+                   'y': rng.uniform(0, SCREEN_H - 2 * TILE), 'vx': -ENEMY_SPEED, 'vy': 0,
+                   'alive': True, 'frame': rng.randint(0, 20), 'facing': rng.choice((1, -1)),
+                   'shell': False, 'chain': 0}
+                  for i in range(enemies)]
+    game.cam_x = 0
+    times = []
+    for SPRITE_CACHE in (False, True):
+        game.draw_game()  # Warm the chunk cache either way
+        t0 = time.perf_counter()
+        for f in range(frames):
+            game.frame_count = f
+            for e in ld.enemies:
+                e['frame'] += 1
+            game.draw_game()
+        times.append((time.perf_counter() - t0) * 1000 / frames)
+    SPRITE_CACHE = True
+    print(f"{enemies} enemies on screen: procedural {times[0]:.2f} ms/frame, cached {times[1]:.2f} ms/frame "
+          f"({len(game.sprites.sprites)} variants, {game.sprites.misses} misses)")
+
+
+class _CountingFont:
+    """Font wrapper that counts render() calls, i.e. text surfaces allocated"""
+    def __init__(self, font):
+        self.font = font
+        self.renders = 0
+
+    def render(self, *args):
+        self.renders += 1
+        return self.font.render(*args)
+
+
+def _demolition(game, bricks=500, per_frame=10, tail=60):
+    """Break bricks in view per_frame at a time, plus a coin block every frame; yields once per frame"""
+    ld = _load(game, 1, 1)
+    game.cam_x = 0
+    game.player.big = True
+    cells = [(x, y) for y in range(3, 11) for x in range(1, SCREEN_W // TILE - 1)]
+    broken = 0
+    f = 0
+    while broken < bricks or f < bricks // per_frame + tail:
+        for _ in range(min(per_frame, bricks - broken)):
+            x, y = cells[broken % len(cells)]
+            game.set_tile(x, y, 2)
+            game.hit_block(x, y)
+            broken += 1
+        if broken < bricks:
+            x, y = cells[(broken * 7) % len(cells)]
+            game.set_tile(x, y, 3)
+            ld.blocks[(x, y)] = CONTENTS_COIN
+            game.hit_block(x, y)
+        game.frame_count = f
+        f += 1
+        yield f
+
+
+def selftest_particles():
+    """Pooled particles must draw the same frames as the dict list, recycle every slot and respect cap/LOD"""
+    global PARTICLE_POOL, PARTICLE_LOD
+    game = _headless_game()
+    saved_lod = PARTICLE_LOD
+    PARTICLE_LOD = 0
+    shots = []
+    for PARTICLE_POOL in (False, True):
+        random.seed(40)
+        game.fx = ParticleSystem(game.hud_font, cap=2048)
+        frames = []
+        for _ in _demolition(game, bricks=200, per_frame=4):
+            game.screen.fill(C_SKY)
+            game.draw_particles(game.cam_x)
+            frames.append(pygame.image.tostring(game.screen, 'RGB'))
+        shots.append(frames)
+    assert len(shots[0]) == len(shots[1])
+    for f, (a, b) in enumerate(zip(*shots)):
+        assert a == b, f"frame {f} differs"
+    fx = game.fx
+    assert not fx.live and not game.particles
+    assert sorted(fx.free) == list(range(fx.cap)) and not any(fx.label)
+    assert fx.renders == len(POPUP_LABELS), "popup labels were rendered during play"
+    # Cap: spawns past it are dropped, never allocated
+    fx = game.fx = ParticleSystem(game.hud_font, cap=64)
+    for i in range(100):
+        game.add_particle(i * 11, (i * 37) % 600, 'debris', None, 1, -6, 40)
+    assert len(fx.live) == 64 and fx.dropped == 36 and not fx.free
+    # LOD: past the threshold only every Nth debris is drawn, popups always are
+    PARTICLE_LOD = 16
+    counts = []
+    for lod in (0, 16):
+        PARTICLE_LOD = lod
+        game.screen.fill(C_SKY)
+        fx.draw(game.screen, 0)
+        counts.append(sum(1 for x in range(0, SCREEN_W, 2) for y in range(0, SCREEN_H, 2)
+                          if game.screen.get_at((x, y))[:3] == C_BRICK))
+    assert 0 < counts[1] < counts[0] / 3, counts
+    PARTICLE_POOL, PARTICLE_LOD = True, saved_lod
+    game.fx = ParticleSystem(game.hud_font)
+    print(f"particles ok  {len(shots[0])} frames identical, cap and LOD honoured")
+
+
+def benchmark_particles():
+    """500-brick demolition: particle update+draw ms/frame and allocations, dict list vs pool"""
+    import time, tracemalloc
+    global PARTICLE_POOL
+    game = _headless_game()
+    print(f"{'particles':<10}{'ms/frame':>10}{'peak live':>11}{'dicts':>8}{'text renders':>14}{'peak KB':>9}")
+    for PARTICLE_POOL in (False, True):
+        font = game.hud_font = _CountingFont(game.hud_font)
+        game.fx = ParticleSystem(font)
+        renders = font.renders
+        random.seed(41)
+        elapsed = 0.0
+        peak_live = dicts = kept = 0
+        for _ in _demolition(game):
+            if PARTICLE_POOL:
+                live = len(game.fx.live)
+            else:
+                live = len(game.particles)
+                dicts += live - kept  # one dict per particle spawned since the last draw
+            peak_live = max(peak_live, live)
+            t0 = time.perf_counter()
+            game.draw_particles(game.cam_x)
+            elapsed += time.perf_counter() - t0
+            kept = len(game.particles)
+        frames = game.frame_count + 1
+        game.hud_font = font.font
+        # Allocation footprint of the same scene, measured separately so tracing doesn't skew the timing
+        random.seed(41)
+        game.fx = ParticleSystem(game.hud_font)
+        tracemalloc.start()
+        for _ in _demolition(game):
+            game.draw_particles(game.cam_x)
+        peak = tracemalloc.get_traced_memory()[1]
+        tracemalloc.stop()
+        label = "pool" if PARTICLE_POOL else "dict list"
+        print(f"{label:<10}{elapsed * 1000 / frames:>10.3f}{peak_live:>11}{dicts:>8}"
+              f"{font.renders - renders:>14}{peak / 1024:>9.0f}")
+    PARTICLE_POOL = True
+
+
+def _level_fields(ld):
+    return {k: v for k, v in vars(ld).items() if k != 'rng'}
+
+
+def selftest_level_pack():
+    """Packed levels must decode to exactly what the generators build, whatever else draws from random"""
+    import tempfile
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, 'levels.bin')
+        size = LevelPack.compile(path)
+        pack = LevelPack.open(path)
+        assert sorted(pack.index) == sorted(LevelPack.LEVELS)
+        for world, level in LevelPack.LEVELS:
+            random.seed(world)  # other random consumers must not matter any more
+            generated = LevelData(world, level)
+            random.random()
+            packed = pack.read(world, level)
+            assert _level_fields(generated) == _level_fields(packed), (world, level)
+            # Decoded levels are independent copies, safe to mutate in play
+            packed.tiles[0][0] = 7
+            packed.enemies.clear()
+            assert pack.read(world, level).tiles[0][0] != 7 and _level_fields(pack.read(world, level)) == \
+                _level_fields(generated)
+        assert pack.read(9, 1) is None
+        pack.buf.close()
+        # A pack from another version is ignored rather than misread
+        with open(path, 'r+b') as f:
+            f.seek(4)
+            f.write(struct.pack('<H', LEVEL_PACK_VERSION + 1))
+        assert LevelPack.open(path) is None
+        assert LevelPack.open(os.path.join(tmp, 'missing.bin')) is None
+    print(f"level pack ok  {len(LevelPack.LEVELS)} levels identical, {size} bytes")
+
+
+def benchmark_level_pack(rounds=5):
+    """Load time of all 32 levels: generating vs decoding from the memory-mapped pack"""
+    import tempfile, time
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, 'levels.bin')
+        size = LevelPack.compile(path)
+        t0 = time.perf_counter()
+        pack = LevelPack.open(path)
+        opened = time.perf_counter() - t0
+        times = {}
+        for label, load in (("generate", LevelData), ("pack", pack.read)):
+            best = float('inf')
+            for _ in range(rounds):
+                t0 = time.perf_counter()
+                for world, level in LevelPack.LEVELS:
+                    load(world, level)
+                best = min(best, time.perf_counter() - t0)
+            times[label] = best
+        pack.buf.close()
+    n = len(LevelPack.LEVELS)
+    print(f"{n} levels: generate {times['generate'] * 1000:.1f} ms ({times['generate'] * 1000 / n:.2f} ms/level), "
+          f"pack {times['pack'] * 1000:.1f} ms ({times['pack'] * 1000 / n:.2f} ms/level); "
+          f"pack {size / 1024:.0f} KB, mmap open {opened * 1e6:.0f} us")
+
+
+def benchmark_chunks(frames=300):
+    """draw_game ms/frame scrolling through each level type, per-tile vs chunk cache"""
+    import time
+    global CHUNK_CACHE
+    game = _headless_game()
+    print(f"{'level':<12}{'per-tile ms':>12}{'chunked ms':>12}{'hits':>7}{'misses':>8}{'prefetch':>10}{'redraws':>9}")
+    for level in (1, 2, 3, 4):
+        ld = _load(game, 3, level)
+        span = LEVEL_WIDTH_TILES * TILE - SCREEN_W
+        times = []
+        for CHUNK_CACHE in (False, True):
+            game.chunk_cache = ChunkCache(ld)
+            t0 = time.perf_counter()
+            for f in range(frames):
+                game.frame_count = f
+                game.cam_x = span * f / frames
+                game.draw_game()
+            times.append((time.perf_counter() - t0) * 1000 / frames)
+        c = game.chunk_cache
+        print(f"{ld.level_type:<12}{times[0]:>12.2f}{times[1]:>12.2f}{c.hits:>7}{c.misses:>8}{c.prefetches:>10}{c.redraws:>9}")
+    CHUNK_CACHE = True
+
+
+def _corridor(game, enemies=()):
+    """1-1 flattened to bare ground with (type, x, vx) enemies on it; the player stands at x=100"""
+    ld = _load(game, 1, 1)
+    gy = LEVEL_HEIGHT_TILES - 2
+    for y, row in enumerate(ld.tiles):
+        row[:] = [1 if y >= gy else 0] * LEVEL_WIDTH_TILES
+    ld.blocks, ld.pipes, ld.enemies = {}, [], []
+    for etype, x, vx in enemies:
+        ld.enemies.append({'type': etype, 'x': float(x), 'y': float((gy - 1) * TILE), 'vx': vx, 'vy': 0,
+                           'alive': True, 'frame': 0, 'facing': 1 if vx > 0 else -1, 'shell': False, 'chain': 0})
+    game.contacts.reset(ld.enemies)
+    game.chunk_cache = ChunkCache(ld)
+    return ld
+
+
+def _naive_pairs(enemies, left, right):
+    """Every overlapping pair by testing all of them against each other, as id pairs"""
+    live = [e for e in enemies if e['alive'] and left <= e['x'] <= right]
+    w, h = SweepAndPrune.W, SweepAndPrune.H
+    return {frozenset((id(a), id(b))) for i, a in enumerate(live) for b in live[i + 1:]
+            if abs(a['x'] - b['x']) < w and abs(a['y'] - b['y']) < h}
+
+
+def selftest_enemy_contacts():
+    """Sweep-and-prune must find exactly the overlapping pairs, and the contact rules must play out"""
+    global ENEMY_CONTACTS
+    game = _headless_game()
+
+    # Pairs match an all-pairs scan while a crowd jostles out of order
+    rng = random.Random(47)
+    ld = _corridor(game)
+    ld.enemies = [{'x': rng.uniform(0, 3000), 'y': rng.choice((0, 20, 48, 200)), 'alive': True}
+                  for _ in range(400)]
+    sap = SweepAndPrune(ld.enemies)
+    for frame in range(60):
+        for e in ld.enemies:
+            e['x'] += rng.uniform(-6, 6)
+            if rng.random() < 0.01:
+                e['alive'] = False
+        left, right = (0, 1e9) if frame % 2 else (700, 2300)
+        found = {frozenset((id(a), id(b))) for a, b in sap.pairs(left, right)}
+        assert found == _naive_pairs(ld.enemies, left, right), frame
+        assert [e['x'] for e in sap.order] == sorted(e['x'] for e in ld.enemies if e['alive'])
+
+    # Goombas walking into each other turn around; without contacts they pass through
+    for ENEMY_CONTACTS in (False, True):
+        ld = _corridor(game, [('goomba', 400, ENEMY_SPEED), ('goomba', 600, -ENEMY_SPEED)])
+        a, b = ld.enemies
+        for _ in range(150):
+            game.update_game()
+            if ENEMY_CONTACTS:
+                assert b['x'] - a['x'] > TILE - 8 - 2 * ENEMY_SPEED
+        assert a['alive'] and b['alive']
+        assert (a['x'] < b['x'] and a['vx'] < 0 < b['vx']) == ENEMY_CONTACTS, (a['x'], b['x'])
+        assert not game.player.dead and not game.player.invincible
+
+    # Stomped koopa shells up, a kick sends the shell through a row of goombas for chain scores
+    ld = _corridor(game, [('koopa', 300, -ENEMY_SPEED)] + [('goomba', 700 + 90 * i, 0.0) for i in range(5)])
+    shell, goombas = ld.enemies[0], ld.enemies[1:]
+    p = game.player
+    p.x, p.y, p.vy = shell['x'], shell['y'] - p.h + 8, 2.0
+    game.update_game()
+    assert shell['alive'] and shell['shell'] and shell['vx'] == 0 and p.vy == BOUNCE_FORCE
+    p.x -= 3 * TILE # Land clear of the shell, then walk into it
+    while not p.on_ground:
+        game.update_game()
+    p.x = shell['x'] - p.w
+    score = p.score
+    for _ in range(120):
+        game.update_game()
+    assert shell['alive'] and shell['vx'] == SHELL_SPEED and not any(g['alive'] for g in goombas)
+    assert shell['chain'] == 5 and p.score - score == 400 + sum(SHELL_CHAIN[:5]), p.score - score
+    assert not p.dead and not p.invincible
+    # Stomping a moving shell stops it; two moving shells take each other out
+    p.x, p.y, p.vy = shell['x'] - 10, shell['y'] - p.h + 8, 2.0
+    game.update_game()
+    assert shell['alive'] and shell['vx'] == 0
+    ld = _corridor(game, [('koopa', 400, SHELL_SPEED), ('koopa', 700, -SHELL_SPEED)])
+    for e in ld.enemies:
+        e['shell'] = True
+    for _ in range(40):
+        game.update_game()
+    assert not any(e['alive'] for e in ld.enemies)
+
+    # A star block gives star power, and enemies walking into a star player die
+    ld = _corridor(game, [('goomba', 500, -ENEMY_SPEED), ('koopa', 700, -ENEMY_SPEED)])
+    p = game.player
+    game.set_tile(3, 5, 3)
+    ld.blocks[(3, 5)] = CONTENTS_STAR
+    game.hit_block(3, 5)
+    assert p.star == STAR_TIME
+    for _ in range(400):
+        game.update_game()
+    assert not any(e['alive'] for e in ld.enemies) and not p.dead and not p.big and not p.invincible
+    print("enemy contacts ok  pairs match all-pairs, bump/shell/chain/star rules hold")
+
+
+def _corridor_crowd(game, count, seed=48):
+    """count walkers spread along the whole flattened level, with the player parked in the middle"""
+    rng = random.Random(seed)
+    width = (LEVEL_WIDTH_TILES - 4) * TILE
+    ld = _corridor(game, [('goomba' if rng.random() < 0.8 else 'koopa', rng.uniform(2 * TILE, width),
+                           rng.choice((-ENEMY_SPEED, ENEMY_SPEED))) for _ in range(count)])
+    game.player.x = game.cam_x = width / 2
+    game.player.invincible = 10 ** 6 # Pressed by the crowd, not killed by it
+    return ld
+
+
+def benchmark_enemy_contacts(frames=120, count=1000):
+    """1,000 enemies in a corridor: contact pass ms/frame, all-pairs vs sweep-and-prune, and update_game cost"""
+    import time
+    global ENEMY_CONTACTS
+    game = _headless_game()
+    print(f"{'enemies':<9}{'all-pairs ms':>14}{'sweep ms':>10}{'tests/frame':>13}{'swaps/frame':>13}")
+    for n in (250, 500, count):
+        ld = _corridor_crowd(game, n)
+        sap = game.contacts
+        naive = sweep = 0
+        for _ in range(frames // 4):
+            for e in ld.enemies:
+                e['x'] += e['vx']
+            t0 = time.perf_counter()
+            _naive_pairs(ld.enemies, 0, 1e9)
+            naive += time.perf_counter() - t0
+            t0 = time.perf_counter()
+            sap.pairs(0, 1e9)
+            sweep += time.perf_counter() - t0
+        k = frames // 4
+        print(f"{n:<9}{naive * 1000 / k:>14.2f}{sweep * 1000 / k:>10.2f}{sap.tests / k:>13.0f}{sap.swaps / k:>13.1f}")
+    times = []
+    for ENEMY_CONTACTS in (False, True):
+        _corridor_crowd(game, count)
+        t0 = time.perf_counter()
+        for _ in range(frames):
+            game.update_game()
+        times.append((time.perf_counter() - t0) * 1000 / frames)
+    print(f"update_game with {count} enemies: no contacts {times[0]:.2f} ms/frame, contacts {times[1]:.2f} ms/frame")
+
+
+def _play_state(game):
+    """Everything StateCodec records, copied out for a field-by-field comparison"""
+    import copy
+    p, ld = game.player, game.level_data
+    state = {'game.' + k: getattr(game, k)
+             for k in ('cam_x', 'frame_count', 'death_timer', 'level_timer', 'timer_tick', 'clear_timer')}
+    state.update(('player.' + k, copy.deepcopy(v)) for k, v in vars(p).items())
+    state['tiles'] = [bytes(row) for row in ld.tiles]
+    state['blocks'] = dict(ld.blocks)
+    state.update((f'enemies[{i}]', dict(e)) for i, e in enumerate(ld.enemies))
+    if ld.bowser:
+        state['bowser'] = copy.deepcopy(ld.bowser)
+    return state
+
+
+def _autoplay(game, frames, smash=()):
+    """Run right as fire Mario, jumping and throwing fireballs, recording every frame.
+
+    Pits are filled so the run doesn't end in a respawn, and the blocks in
+    smash are hit on the fifth frame. Returns the state after each frame.
+    """
+    states = []
+    for i in range(frames):
+        p = game.player
+        p.vx = max(p.vx, PLAYER_MAX_WALK)
+        if p.on_ground and i % 40 == 0:
+            p.vy, p.on_ground = JUMP_FORCE, False
+        if p.fire and i % 25 == 0:
+            game.fireball()
+        if i == 5:
+            for x, y in smash:
+                game.hit_block(x, y)
+        game.frame_count += 1
+        game.update_game()
+        if game.state != 'playing': # Level cleared
+            break
+        game.record_frame()
+        states.append(_play_state(game))
+    return states
+
+
+def _rewind_level(game, world, level):
+    game.state = 'playing'
+    ld = _load(game, world, level)
+    gy = LEVEL_HEIGHT_TILES - 2
+    for x in range(LEVEL_WIDTH_TILES):
+        if ld.tiles[-1][x] == 0:
+            for y in range(gy, LEVEL_HEIGHT_TILES):
+                ld.tiles[y][x] = 1
+    game.chunk_cache = ChunkCache(ld)
+    p = game.player
+    p.big = p.fire = True
+    p.y -= TILE
+    p.invincible = 10 ** 6
+    if ld.bowser: # Start a screen short of the bridge so Bowser and his fire are in play
+        p.x = ld.bowser['x'] - SCREEN_W
+        game.cam_x = p.x - SCREEN_W // 3
+    return ld
+
+
+def _check_rewind(game, states):
+    """Step back through states newest first, comparing every recorded field"""
+    for i in range(len(states) - 1, -1, -1):
+        assert game.rewind_frame(), i
+        got = _play_state(game)
+        for field, want in states[i].items():
+            assert got[field] == want, (i, field, got[field], want)
+
+
+def selftest_rewind():
+    """Rewinding restores every recorded field exactly, across keyframes, resumed play and a wrapped ring"""
+    global CHUNK_CACHE
+    game = _headless_game()
+    for world, level in ((1, 1), (1, 4)):
+        game.rewind = RewindBuffer(size=1000)
+        ld = _rewind_level(game, world, level)
+        smash = [(x, y) for x in range(SCREEN_W // TILE) for y in range(LEVEL_HEIGHT_TILES) if ld.tiles[y][x] in (2, 3)]
+        states = _autoplay(game, 900, smash)
+        last = states[-1]
+        assert len(states) == len(game.rewind) and len(states) > 200, len(states)
+        assert last['tiles'] != states[0]['tiles'] or not smash
+        assert any(not e['alive'] for e in ld.enemies) or ld.bowser
+        if ld.bowser:
+            assert any(s['bowser']['fireballs'] for s in states)
+            assert last['player.reached_flag'] and not last['bowser']['alive']
+        # Rewind halfway, play on, then rewind through the new frames and the old ones
+        half = len(states) // 2
+        _check_rewind(game, states[half:])
+        resumed = _autoplay(game, 120)
+        _check_rewind(game, resumed)
+        _check_rewind(game, states[:half])
+        assert not game.rewind_frame() and not len(game.rewind)
+        assert game.rewind.keyframes and game.rewind.deltas > game.rewind.keyframes
+        # Tiles put back by the rewind must reach the chunk cache
+        if not ld.bowser:
+            game.cam_x = 0
+            shots = []
+            for CHUNK_CACHE in (True, False):
+                game.draw_game()
+                shots.append(pygame.image.tostring(game.screen, 'RGB'))
+            CHUNK_CACHE = True
+            assert shots[0] == shots[1]
+    # A small ring keeps only its newest frames
+    game.rewind = RewindBuffer(size=64, keyframe=10)
+    _rewind_level(game, 1, 1)
+    states = _autoplay(game, 200)
+    assert len(game.rewind) == 64
+    _check_rewind(game, states[-64:])
+    assert not game.rewind_frame()
+    # A new level starts with an empty history
+    game.record_frame()
+    _load(game, 1, 2)
+    assert not len(game.rewind)
+    print("rewind ok")
+
+
+def benchmark_rewind(frames=600):
+    """Per-frame snapshot cost and rewind memory over scripted play in an overworld and a castle"""
+    import time
+    game = _headless_game()
+    print(f"{'level':<7}{'bytes/snap':>11}{'capture ms':>12}{'push ms':>9}{'restore ms':>12}{'ring KB':>9}")
+    for world, level in ((1, 1), (1, 4), (8, 1)):
+        game.rewind = RewindBuffer(size=frames)
+        _rewind_level(game, world, level)
+        codec, ring = game.codec, game.rewind
+        capture = push = 0
+        for i in range(frames):
+            p = game.player
+            p.vx = max(p.vx, PLAYER_MAX_WALK)
+            if p.on_ground and i % 40 == 0:
+                p.vy, p.on_ground = JUMP_FORCE, False
+            game.update_game()
+            t0 = time.perf_counter()
+            data = codec.capture(game)
+            t1 = time.perf_counter()
+            ring.push(data)
+            t2 = time.perf_counter()
+            capture += t1 - t0
+            push += t2 - t1
+        count = len(ring)
+        kb = ring.size_bytes() / 1024
+        t0 = time.perf_counter()
+        while game.rewind_frame():
+            pass
+        restore = time.perf_counter() - t0
+        print(f"{world}-{level:<5}{len(data):>11}{capture * 1000 / frames:>12.3f}{push * 1000 / frames:>9.3f}"
+              f"{restore * 1000 / count:>12.3f}{kb:>9.1f}")
+    print(f"budget: capture + push under 0.5 ms/frame; "
+          f"ring of {frames} frames ({frames / FPS:.0f} s) vs {frames * len(data) / 1024:.0f} KB of full snapshots")
+
+
+if __name__ == '__main__':
+    if '--selftest' in sys.argv:
+        selftest_chunks()
+        selftest_sprites()
+        selftest_particles()
+        selftest_level_pack()
+        selftest_enemy_contacts()
+        selftest_rewind()
+    elif '--compile-levels' in sys.argv:
+        size = LevelPack.compile(LEVEL_PACK_PATH)
+        print(f"wrote {len(LevelPack.LEVELS)} levels to {LEVEL_PACK_PATH} ({size} bytes)")
+    elif '--bench' in sys.argv:
+        benchmark_chunks()
+        benchmark_sprites()
+        benchmark_particles()
+        benchmark_level_pack()
+        benchmark_enemy_contacts()
+        benchmark_rewind()
+    else:
+        game = Game()
+        game.run()